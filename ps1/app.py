@@ -5,18 +5,29 @@ Stage 1: XGBoost classifier with threshold 0.3
 Stage 2: Ensemble of 7 models + Logistic Regression meta-model with threshold 0.05
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
 import joblib
 import logging
-from typing import Dict, Any, List, Optional
+import asyncio
+import json
+from typing import Dict, Any, List, Optional, Tuple
 import os
+import time
 from datetime import datetime
 
+from arrow_io import ARROW_STREAM_MEDIA_TYPE, arrow_available, read_table, write_results
+from bundle import check_pair
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, PipelineMetrics
+from startup import import_timings
 from preprocessing import DataPreprocessor
 from prediction import TwoStagePredictor
+from profiling import RequestProfiler
+from serving import InferenceQueue, MicroBatcher, PredictionCache, QueueFullError, iter_ndjson
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -31,6 +42,43 @@ app = FastAPI(
     description="API for fraud detection using a two-stage machine learning pipeline",
     version="1.0.0"
 )
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that records request handling and JSON body decoding time
+
+    The body is decoded here first; Starlette caches the result on the
+    request, so FastAPI's own request.json() call reuses it. Streaming
+    responses are not timed, as they are still running when the handler
+    returns.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def timed_handler(request: Request) -> Response:
+            if metrics is None:
+                return await handler(request)
+
+            start = time.perf_counter()
+            content_type = request.headers.get("content-type", "")
+            if self.body_field is not None and (not content_type or "json" in content_type):
+                try:
+                    await request.json()
+                    metrics.parse_seconds.observe(time.perf_counter() - start, route)
+                except ValueError:
+                    # Left to FastAPI, which reports the invalid body
+                    pass
+
+            response = await handler(request)
+            if not isinstance(response, StreamingResponse):
+                metrics.request_seconds.observe(time.perf_counter() - start, route)
+            return response
+
+        return timed_handler
+
+app.router.route_class = TimedRoute
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Or specify ["http://localhost:5173"]
@@ -40,9 +88,64 @@ app.add_middleware(
 )
 
 
+# Serving configuration
+MODEL_DIR = os.environ.get("PS1_MODEL_DIR", "models")
+# Load memory-mapped models.bundle/preprocessors.bundle instead of the library files
+MODEL_BUNDLE = os.environ.get("PS1_MODEL_BUNDLE", "0") == "1"
+# Inference floating point type: "float64" or "float32"
+INFERENCE_DTYPE = os.environ.get("PS1_INFERENCE_DTYPE", "float64")
+# Stage 2 base model executor: "" (sequential), "thread" or "process"
+STAGE2_EXECUTOR = os.environ.get("PS1_STAGE2_EXECUTOR", "")
+STAGE2_WORKERS = int(os.environ.get("PS1_STAGE2_WORKERS", "0")) or None
+# Stop evaluating Stage 2 base models once the decision is settled
+STAGE2_EARLY_EXIT = os.environ.get("PS1_STAGE2_EARLY_EXIT", "0") == "1"
+# Stage 2 scoring: "full" ensemble or "fast" distilled student
+STAGE2_SCORING_MODE = os.environ.get("PS1_STAGE2_SCORING_MODE", "full")
+# Inference worker threads, requests allowed to wait for one, and the
+# Retry-After seconds sent when the queue is full
+INFERENCE_WORKERS = int(os.environ.get("PS1_INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_DEPTH = int(os.environ.get("PS1_INFERENCE_QUEUE_DEPTH", "64"))
+RETRY_AFTER_SECONDS = int(os.environ.get("PS1_RETRY_AFTER_SECONDS", "1"))
+# Micro-batching of concurrent /predict calls; a wait of 0 disables it
+MICROBATCH_WAIT_MS = float(os.environ.get("PS1_MICROBATCH_WAIT_MS", "0"))
+MICROBATCH_MAX_SIZE = int(os.environ.get("PS1_MICROBATCH_MAX_SIZE", "64"))
+# Records scored per internal batch of /predict_stream, and the longest
+# NDJSON line accepted
+STREAM_BATCH_SIZE = int(os.environ.get("PS1_STREAM_BATCH_SIZE", "1024"))
+STREAM_MAX_LINE_BYTES = int(os.environ.get("PS1_STREAM_MAX_LINE_BYTES", str(1 << 20)))
+# Input column echoed back by /predict_arrow
+ID_COLUMN = os.environ.get("PS1_ID_COLUMN", "UNIQUE_ID")
+# Per-stage latency histograms and counters served on /metrics
+METRICS_ENABLED = os.environ.get("PS1_METRICS", "1") == "1"
+# Per-request profiling of /predict and /predict_batch: requests carrying
+# "X-Profile: 1" (when the header is enabled) or picked at the sample rate
+# are profiled into PS1_PROFILE_DIR, at most PS1_PROFILE_MAX_PER_MINUTE a
+# minute and one at a time
+PROFILE_HEADER = "X-Profile"
+PROFILE_HEADER_ENABLED = os.environ.get("PS1_PROFILE_HEADER", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PS1_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.environ.get("PS1_PROFILE_MODE", "sample")
+PROFILE_DIR = os.environ.get("PS1_PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("PS1_PROFILE_INTERVAL_MS", "1"))
+PROFILE_MAX_PER_MINUTE = int(os.environ.get("PS1_PROFILE_MAX_PER_MINUTE", "6"))
+PROFILE_MAX_FILES = int(os.environ.get("PS1_PROFILE_MAX_FILES", "200"))
+# Prediction result cache; a size of 0 disables it
+CACHE_SIZE = int(os.environ.get("PS1_CACHE_SIZE", "0"))
+CACHE_TTL_SECONDS = float(os.environ.get("PS1_CACHE_TTL_SECONDS", "300"))
+
 # Initialize components
 preprocessor = DataPreprocessor()
 predictor = TwoStagePredictor()
+inference_queue = InferenceQueue(max_workers=INFERENCE_WORKERS, max_queue_depth=INFERENCE_QUEUE_DEPTH)
+micro_batcher = None
+prediction_cache = PredictionCache(CACHE_SIZE, CACHE_TTL_SECONDS) if CACHE_SIZE > 0 else None
+metrics = PipelineMetrics() if METRICS_ENABLED else None
+request_profiler = RequestProfiler(
+    PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE, allow_header=PROFILE_HEADER_ENABLED, mode=PROFILE_MODE,
+    interval_ms=PROFILE_INTERVAL_MS, max_per_minute=PROFILE_MAX_PER_MINUTE, max_files=PROFILE_MAX_FILES
+) if PROFILE_HEADER_ENABLED or PROFILE_SAMPLE_RATE > 0 else None
+preprocessor.metrics = metrics
+predictor.metrics = metrics
 
 class PredictionRequest(BaseModel):
     """Request model for prediction endpoint"""
@@ -72,21 +175,219 @@ class PredictionResponse(BaseModel):
     prediction: int
     stage1_probability: float
     stage2_probability: Optional[float] = None 
+    stage2_models_skipped: Optional[int] = None
     stage_used: str
+    cached: bool = False
     processing_time_ms: float
+    queue_time_ms: float
+    compute_time_ms: float
     timestamp: str
 
+# Cold start breakdown reported on /health
+startup_timings = {}
+
+def load_components(model_dir: str = MODEL_DIR, bundle: bool = MODEL_BUNDLE):
+    """Load and prepare the preprocessors and models"""
+    start = time.perf_counter()
+    predictor.load_models(model_dir, bundle=bundle)
+    preprocessor.load_preprocessors(model_dir, bundle=bundle)
+    if bundle:
+        check_pair(preprocessor.bundle, predictor.bundle)
+    predictor.set_inference_dtype(INFERENCE_DTYPE)
+    preprocessor.set_inference_dtype(INFERENCE_DTYPE)
+    preprocessor.compile()
+
+    startup_timings.update({
+        "load_total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "imports_ms": {name: round(t * 1000, 1) for name, t in import_timings().items()},
+        "artifacts_ms": {name: round(t * 1000, 1) for name, t in
+                         {**predictor.load_timings, **preprocessor.load_timings}.items()}
+    })
+    logger.info(f"Components loaded in {startup_timings['load_total_ms']} ms")
+
 @app.on_event("startup")
 async def startup_event():
     """Load models on startup"""
     try:
-        predictor.load_models()
-        preprocessor.load_preprocessors()
+        # Pre-forked workers inherit models already loaded by serve.py
+        if predictor.stage1_model is None:
+            load_components()
+        if STAGE2_EXECUTOR:
+            predictor.set_stage2_executor(STAGE2_EXECUTOR, STAGE2_WORKERS)
+        predictor.stage2_early_exit = STAGE2_EARLY_EXIT
+        predictor.set_stage2_scoring_mode(STAGE2_SCORING_MODE)
         logger.info("Models loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load models: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers on shutdown"""
+    inference_queue.shutdown()
+    predictor.shutdown_stage2_executor()
+
+def get_micro_batcher() -> Optional[MicroBatcher]:
+    """Micro-batcher for /predict, created on first use when enabled"""
+    global micro_batcher
+    if micro_batcher is None and MICROBATCH_WAIT_MS > 0:
+        micro_batcher = MicroBatcher(score_records, inference_queue,
+                                     max_wait_ms=MICROBATCH_WAIT_MS,
+                                     max_batch_size=MICROBATCH_MAX_SIZE)
+    return micro_batcher
+
+def score_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Preprocess and score records; runs on an inference worker thread"""
+    if not records:
+        return []
+
+    # Preprocess all records in a single call
+    processed_data = preprocessor.preprocess(records)
+
+    # Score all records through the vectorized cascade; results
+    # come back in the same order as the records
+    return predictor.predict_batch(processed_data)
+
+def should_profile(http_request: Request) -> bool:
+    """Whether to profile this request (see RequestProfiler.should_profile())"""
+    return request_profiler is not None and request_profiler.should_profile(http_request.headers.get(PROFILE_HEADER))
+
+async def score_profiled(records: List[Dict[str, Any]], label: str,
+                         response: Response) -> Tuple[List[Dict[str, Any]], float, float]:
+    """
+    Score records under the profiler, bypassing the cache and micro-batcher
+    so the profile covers exactly this request's work
+
+    The profile's file name is returned in the X-Profile-File header.
+    """
+    (results, path), queue_time, compute_time = await inference_queue.run(
+        lambda: request_profiler.profile(score_records, records, label=label)
+    )
+    if path is not None:
+        response.headers["X-Profile-File"] = os.path.basename(path)
+    return results, queue_time, compute_time
+
+def cache_generation() -> Tuple:
+    """
+    Everything a cached result depends on besides the record: the loaded
+    artifacts and the scoring settings that can change at runtime
+    """
+    return (predictor.load_generation, preprocessor.load_generation, predictor.stage2_scoring_mode,
+            predictor.stage2_early_exit, predictor.inference_dtype.str,
+            predictor.stage1_threshold, predictor.stage2_threshold)
+
+def cache_lookup(records: List[Dict[str, Any]]) -> Tuple[List[Optional[str]], List[Optional[Dict[str, Any]]]]:
+    """Cache keys and cached results (None on a miss) for each record"""
+    if prediction_cache is None or preprocessor.expected_columns is None:
+        return [None] * len(records), [None] * len(records)
+
+    generation = cache_generation()
+    keys = [prediction_cache.make_key(record, preprocessor.expected_columns, preprocessor.label_encoders)
+            for record in records]
+    return keys, [prediction_cache.get(key, generation) for key in keys]
+
+def cache_store(keys: List[Optional[str]], results: List[Dict[str, Any]]):
+    """Cache freshly scored results"""
+    if prediction_cache is None:
+        return
+
+    generation = cache_generation()
+    for key, result in zip(keys, results):
+        if key is not None:
+            prediction_cache.put(key, result, generation)
+
+async def score_with_cache(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float, float, int]:
+    """
+    Score records on the inference queue, reusing cached results
+
+    Returns:
+        Tuple of (results, queue seconds, compute seconds, cache hits)
+    """
+    keys, results = cache_lookup(records)
+
+    # Score only the records missing from the cache
+    missing = [i for i, result in enumerate(results) if result is None]
+    scored, queue_time, compute_time = await inference_queue.run(
+        score_records, [records[i] for i in missing]
+    )
+    for i, result in zip(missing, scored):
+        results[i] = result
+    cache_store([keys[i] for i in missing], scored)
+
+    return results, queue_time, compute_time, len(records) - len(missing)
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for bodies generated while the request is still arriving
+
+    StreamingResponse listens for client disconnects by reading receive()
+    concurrently, which would swallow the request body chunks the
+    generator is consuming. A disconnect instead surfaces through
+    request.stream() inside the generator.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def score_stream_batch(batch: List[Tuple[int, Any]]) -> str:
+    """
+    Score one /predict_stream batch and render its NDJSON result lines
+
+    batch holds (line number, record or error message) in input order.
+    A full queue is waited out rather than failing the upload mid-stream.
+    """
+    records = [item for _, item in batch if isinstance(item, dict)]
+    try:
+        while True:
+            try:
+                results = iter((await score_with_cache(records))[0])
+                break
+            except QueueFullError:
+                await asyncio.sleep(0.05)
+        error = None
+    except Exception as e:
+        logger.error(f"Stream batch prediction error: {e}")
+        error = f"Prediction failed: {e}"
+
+    lines = []
+    for line_number, item in batch:
+        if not isinstance(item, dict):
+            output = {"line": line_number, "error": item}
+        elif error is not None:
+            output = {"line": line_number, "error": error}
+        else:
+            output = {"line": line_number, **next(results)}
+        lines.append(json.dumps(output) + "\n")
+    return "".join(lines)
+
+def score_table(body: bytes, content_type: Optional[str]) -> bytes:
+    """Decode, score and re-encode one Arrow/Parquet body; runs on an inference worker thread"""
+    start = time.perf_counter()
+    # Only a body that cannot be read or matched is the client's fault;
+    # errors while scoring it are the server's
+    try:
+        df = read_table(body, content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if metrics is not None:
+        metrics.parse_seconds.observe(time.perf_counter() - start, "/predict_arrow")
+    if not set(df.columns) & set(preprocessor.expected_columns or []):
+        raise HTTPException(status_code=400, detail="No columns match the expected feature columns")
+
+    processed_data = preprocessor.preprocess(df)
+    arrays = predictor.predict_arrays(processed_data)
+    return write_results(arrays, df[ID_COLUMN] if ID_COLUMN in df.columns else None)
+
+def queue_full_error() -> HTTPException:
+    """503 response telling the client when to retry"""
+    return HTTPException(
+        status_code=503,
+        detail="Inference queue is full, retry later",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -105,88 +406,200 @@ async def health_check():
         "stage2_models_loaded": len(predictor.stage2_models) > 0,
         "meta_model_loaded": predictor.meta_model is not None,
         "preprocessors_loaded": preprocessor.is_loaded(),
+        "inference_queue": inference_queue.stats(),
+        "micro_batching": micro_batcher.stats() if micro_batcher else None,
+        "startup": startup_timings,
+        "profiling": request_profiler.stats() if request_profiler else None,
         "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest, http_request: Request, response: Response):
     """
     Make fraud prediction using two-stage model
 
     Returns:
     - prediction: 0 (not fraud) or 1 (fraud)
     - stage1_probability: probability from stage 1 model
-    - stage2_probability: probability from stage 2 model (if used)
+    - stage2_probability: probability from stage 2 model (if used; None
+      when early exit settled the decision before every base model ran)
+    - stage2_models_skipped: base models skipped by early exit (if enabled)
     - stage_used: "stage1" or "stage2"
+    - cached: whether the result came from the prediction cache
     - processing_time_ms: time taken for prediction
+    - queue_time_ms: part of processing_time_ms spent waiting for a worker
+    - compute_time_ms: part of processing_time_ms spent preprocessing and scoring
     """
-    start_time = datetime.now()
+    start_time = time.perf_counter()
 
     try:
-        # Convert request data to DataFrame
-        df = pd.DataFrame([request.data])
-
-        # Preprocess the data
-        processed_data = preprocessor.preprocess(df)
-
-        # Make prediction using two-stage model
-        result = predictor.predict(processed_data)
+        keys, cached_results = cache_lookup([request.data])
+        result = cached_results[0]
+        queue_time = compute_time = 0.0
+
+        if should_profile(http_request):
+            cached_results = [None]
+            results, queue_time, compute_time = await score_profiled([request.data], "predict", response)
+            result = results[0]
+        elif result is None:
+            batcher = get_micro_batcher()
+            if batcher is not None:
+                # Scored together with other /predict calls arriving in the same window
+                result, queue_time, compute_time = await batcher.submit(request.data)
+            else:
+                results, queue_time, compute_time = await inference_queue.run(score_records, [request.data])
+                result = results[0]
+            cache_store(keys, [result])
 
         # Calculate processing time
-        processing_time = (datetime.now() - start_time).total_seconds() * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
 
         return PredictionResponse(
             prediction=result["prediction"],
             stage1_probability=result["stage1_probability"],
             stage2_probability=result.get("stage2_probability"),
+            stage2_models_skipped=result.get("stage2_models_skipped"),
             stage_used=result["stage_used"],
+            cached=cached_results[0] is not None,
             processing_time_ms=round(processing_time, 2),
+            queue_time_ms=round(queue_time * 1000, 2),
+            compute_time_ms=round(compute_time * 1000, 2),
             timestamp=datetime.now().isoformat()
         )
 
+    except QueueFullError:
+        raise queue_full_error()
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 @app.post("/predict_batch")
-async def predict_batch(requests: List[PredictionRequest]):
+async def predict_batch(requests: List[PredictionRequest], http_request: Request, response: Response):
     """
     Make batch predictions for multiple records
     """
-    start_time = datetime.now()
+    start_time = time.perf_counter()
 
     try:
-        results = []
-
-        for req in requests:
-            # Convert request data to DataFrame
-            df = pd.DataFrame([req.data])
+        records = [req.data for req in requests]
+        if should_profile(http_request):
+            results, queue_time, compute_time = await score_profiled(records, "predict_batch", response)
+            cache_hits = 0
+        else:
+            results, queue_time, compute_time, cache_hits = await score_with_cache(records)
 
-            # Preprocess the data
-            processed_data = preprocessor.preprocess(df)
-
-            # Make prediction
-            result = predictor.predict(processed_data)
-            results.append(result)
-
-        processing_time = (datetime.now() - start_time).total_seconds() * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
 
         return {
             "predictions": results,
             "total_processing_time_ms": round(processing_time, 2),
+            "queue_time_ms": round(queue_time * 1000, 2),
+            "compute_time_ms": round(compute_time * 1000, 2),
             "records_processed": len(requests),
+            "cache_hits": cache_hits,
             "timestamp": datetime.now().isoformat()
         }
 
+    except QueueFullError:
+        raise queue_full_error()
     except Exception as e:
         logger.error(f"Batch prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
+@app.post("/predict_stream")
+async def predict_stream(request: Request):
+    """
+    Score an NDJSON upload and stream NDJSON results back
+
+    Each request line is one record, either bare or as {"data": record}.
+    Records are parsed as the body arrives and scored in batches of
+    STREAM_BATCH_SIZE, so only one batch is held in memory however large
+    the upload. Every result line carries the input line number; lines
+    that cannot be parsed or scored get an "error" field instead of a
+    prediction.
+
+    Results start flowing before the upload ends, so clients must read the
+    response while still sending (e.g. curl -N -T records.ndjson); a
+    client that only reads after sending everything stalls once the
+    socket buffers fill.
+    """
+    async def generate():
+        batch = []
+        try:
+            async for line_number, value in iter_ndjson(request.stream(), STREAM_MAX_LINE_BYTES):
+                if isinstance(value, dict) and list(value) == ["data"] and isinstance(value["data"], dict):
+                    value = value["data"]
+                if isinstance(value, ValueError):
+                    value = str(value)
+                elif not isinstance(value, dict):
+                    value = "Record must be a JSON object"
+                batch.append((line_number, value))
+
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield await score_stream_batch(batch)
+                    batch = []
+
+            if batch:
+                yield await score_stream_batch(batch)
+        except ValueError as e:
+            # Oversized line; the rest of the stream cannot be split reliably
+            if batch:
+                yield await score_stream_batch(batch)
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return UploadStreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.post("/predict_arrow")
+async def predict_arrow(request: Request):
+    """
+    Score an Arrow IPC stream or Parquet file in one vectorized pass
+
+    Send the table as the raw body with Content-Type
+    application/vnd.apache.arrow.stream or application/vnd.apache.parquet;
+    its columns should match expected_columns (missing ones are treated
+    as missing values). The response is an Arrow IPC stream with
+    prediction, stage1_probability, stage2_probability (null unless Stage 2
+    was used) and stage_used, preceded by the ID column when the input has one.
+    """
+    if not arrow_available():
+        raise HTTPException(status_code=501, detail="pyarrow is not installed on this server")
+
+    start_time = time.perf_counter()
+    body = await request.body()
+
+    try:
+        result, queue_time, compute_time = await inference_queue.run(
+            score_table, body, request.headers.get("content-type")
+        )
+    except QueueFullError:
+        raise queue_full_error()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Arrow prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Arrow prediction failed: {str(e)}")
+
+    processing_time = (time.perf_counter() - start_time) * 1000
+    return Response(content=result, media_type=ARROW_STREAM_MEDIA_TYPE, headers={
+        "X-Processing-Time-Ms": str(round(processing_time, 2)),
+        "X-Queue-Time-Ms": str(round(queue_time * 1000, 2)),
+        "X-Compute-Time-Ms": str(round(compute_time * 1000, 2))
+    })
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: per-stage latency histograms, batch sizes and Stage 2 escalations"""
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (PS1_METRICS=0)")
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/model_info")
 async def get_model_info():
     """Get information about loaded models"""
     try:
-        return predictor.get_model_info()
+        info = predictor.get_model_info()
+        info["prediction_cache"] = prediction_cache.stats() if prediction_cache else None
+        return info
     except Exception as e:
         logger.error(f"Error getting model info: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
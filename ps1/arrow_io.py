@@ -0,0 +1,82 @@
+"""
+Arrow and Parquet I/O for Bulk Scoring
+Reads columnar request bodies into DataFrames and writes cascade results
+as an Arrow IPC stream; pyarrow is imported on first use
+"""
+
+import io
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from startup import lazy_import
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPES = ("application/vnd.apache.parquet", "application/x-parquet")
+PARQUET_MAGIC = b"PAR1"
+
+
+def arrow_available() -> bool:
+    """
+    Check whether pyarrow can be imported
+    """
+    try:
+        lazy_import("pyarrow")
+    except ImportError:
+        return False
+    return True
+
+
+def read_table(body: bytes, content_type: Optional[str] = None) -> pd.DataFrame:
+    """
+    Decode an Arrow IPC stream or Parquet file into a DataFrame
+
+    The format comes from the content type, falling back to the Parquet
+    magic bytes. Numeric columns convert without per-row objects.
+    """
+    pa = lazy_import("pyarrow")
+    media_type = (content_type or "").split(";")[0].strip().lower()
+
+    try:
+        if media_type in PARQUET_MEDIA_TYPES or (media_type != ARROW_STREAM_MEDIA_TYPE and
+                                                 body[:4] == PARQUET_MAGIC):
+            table = lazy_import("pyarrow.parquet").read_table(io.BytesIO(body))
+        else:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowException as e:
+        raise ValueError(f"Could not read Arrow/Parquet body: {e}")
+
+    return table.to_pandas()
+
+
+def write_results(arrays: Dict[str, np.ndarray], ids: Optional[pd.Series] = None) -> bytes:
+    """
+    Encode predict_arrays() output as an Arrow IPC stream
+
+    stage2_probability is null where Stage 2 was not used; the input id
+    column is echoed first when given.
+    """
+    pa = lazy_import("pyarrow")
+
+    escalated = arrays["stage1_prediction"] == 1
+    stage2 = arrays["stage2_probability"]
+    columns = {
+        "prediction": pa.array(arrays["prediction"], type=pa.int8()),
+        "stage1_probability": pa.array(arrays["stage1_probability"], type=pa.float64()),
+        "stage2_probability": pa.array(stage2, type=pa.float64(), mask=np.isnan(stage2)),
+        "stage_used": pa.DictionaryArray.from_arrays(
+            pa.array(escalated.astype(np.int8)), pa.array(["stage1", "stage2"])
+        )
+    }
+    if ids is not None:
+        columns = {ids.name: pa.array(ids), **columns}
+
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
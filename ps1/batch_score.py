@@ -0,0 +1,315 @@
+"""
+Offline Batch Scoring for the Two-Stage Fraud Detection Model
+Reads a CSV or Parquet file in chunks, scores the chunks on a pool of
+worker processes that each hold the loaded models, and writes one part
+file per chunk keyed by the ID column. Finished parts are skipped when the
+same job is started again, so an interrupted run resumes where it stopped.
+
+Usage:
+    python batch_score.py HACKATHON_PREDICTION_DATA.csv --output-dir scores \
+        --workers 4 --chunk-size 50000 --output predictions.csv
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+JOB_FILE = "_job.json"
+
+# Preprocessor and predictor held by each worker process
+_worker_components = None
+
+
+def _init_worker(model_dir: str, bundle: bool, dtype: str, n_threads: int):
+    """
+    Load the preprocessors and models once per worker process
+    """
+    global _worker_components
+    from threadpoolctl import threadpool_limits
+
+    from prediction import TwoStagePredictor
+    from preprocessing import DataPreprocessor
+
+    # Workers share the cores, so each keeps its BLAS/OpenMP pools small
+    threadpool_limits(limits=n_threads)
+
+    predictor = TwoStagePredictor()
+    predictor.load_models(model_dir, bundle=bundle)
+    predictor.set_thread_count(n_threads)
+    predictor.set_inference_dtype(dtype)
+
+    preprocessor = DataPreprocessor()
+    preprocessor.load_preprocessors(model_dir, bundle=bundle)
+    preprocessor.set_inference_dtype(dtype)
+    preprocessor.compile()
+
+    _worker_components = (preprocessor, predictor)
+
+
+def score_frame(df: pd.DataFrame, id_column: str, first_row: int = 0) -> pd.DataFrame:
+    """
+    Score one chunk with the worker's components
+
+    Rows are keyed by id_column, or by their row number in the input when
+    the file has no such column.
+    """
+    preprocessor, predictor = _worker_components
+
+    if id_column in df.columns:
+        ids = df[id_column].to_numpy()
+        features = df.drop(columns=[id_column])
+    else:
+        ids = np.arange(first_row, first_row + len(df))
+        features = df
+
+    arrays = predictor.predict_arrays(preprocessor.preprocess(features))
+    return pd.DataFrame({
+        id_column: ids,
+        "prediction": arrays["prediction"],
+        "stage1_probability": arrays["stage1_probability"],
+        "stage2_probability": arrays["stage2_probability"],
+        "stage_used": np.where(arrays["stage1_prediction"] == 1, "stage2", "stage1")
+    })
+
+
+def part_path(output_dir: str, index: int, output_format: str) -> str:
+    return os.path.join(output_dir, f"part-{index:06d}.{output_format}")
+
+
+def write_frame(df: pd.DataFrame, path: str, output_format: str):
+    """
+    Write a frame atomically so a crash never leaves a partial part file
+    """
+    tmp_path = f"{path}.tmp"
+    if output_format == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def score_chunk(index: int, df: pd.DataFrame, first_row: int, output_dir: str,
+                output_format: str, id_column: str) -> Tuple[int, int, float]:
+    """
+    Score a chunk and write its part file; runs in a worker process
+
+    Returns:
+        Tuple of (chunk index, rows scored, seconds spent)
+    """
+    start = time.perf_counter()
+    result = score_frame(df, id_column, first_row)
+    write_frame(result, part_path(output_dir, index, output_format), output_format)
+    return index, len(df), time.perf_counter() - start
+
+
+def iter_chunks(input_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or Parquet file chunk by chunk
+    """
+    if input_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size, low_memory=False)
+
+
+def check_job(output_dir: str, job: Dict[str, Any], overwrite: bool):
+    """
+    Record the job in output_dir, refusing to mix parts from a different job
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    job_path = os.path.join(output_dir, JOB_FILE)
+
+    if os.path.exists(job_path) and not overwrite:
+        with open(job_path) as f:
+            previous = json.load(f)
+        if previous != job:
+            raise ValueError(f"{output_dir} holds parts of a different job ({previous}); "
+                             f"use --overwrite or another --output-dir")
+        return
+
+    for name in os.listdir(output_dir):
+        if name.startswith("part-"):
+            os.remove(os.path.join(output_dir, name))
+    with open(job_path, "w") as f:
+        json.dump(job, f, indent=2)
+
+
+def merge_parts(output_dir: str, output_format: str, output_path: str) -> int:
+    """
+    Concatenate the part files in chunk order into one output file
+
+    Returns:
+        Number of rows written
+    """
+    parts = sorted(name for name in os.listdir(output_dir)
+                   if name.startswith("part-") and name.endswith(f".{output_format}"))
+    rows = 0
+    tmp_path = f"{output_path}.tmp"
+
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = None
+        for name in parts:
+            table = pq.read_table(os.path.join(output_dir, name))
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+        if writer is not None:
+            writer.close()
+    else:
+        with open(tmp_path, "w") as out:
+            for i, name in enumerate(parts):
+                with open(os.path.join(output_dir, name)) as part:
+                    header = part.readline()
+                    if i == 0:
+                        out.write(header)
+                    for line in part:
+                        out.write(line)
+                        rows += 1
+
+    os.replace(tmp_path, output_path)
+    return rows
+
+
+def score_file(input_path: str, output_dir: str, model_dir: str = "models", chunk_size: int = 50000,
+               workers: int = 1, threads_per_worker: int = 1, output_format: str = "csv",
+               id_column: str = "UNIQUE_ID", bundle: bool = False, dtype: str = "float64",
+               output_path: Optional[str] = None, overwrite: bool = False) -> Dict[str, Any]:
+    """
+    Score a file chunk by chunk into output_dir
+
+    Args:
+        workers: Worker processes; 0 scores in this process
+        output_path: Merge the parts into this file when every chunk is done
+
+    Returns:
+        Summary with the chunk and row counts and the throughput
+    """
+    stat = os.stat(input_path)
+    job = {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "chunk_size": chunk_size,
+        "output_format": output_format,
+        "id_column": id_column
+    }
+    check_job(output_dir, job, overwrite)
+
+    init_args = (model_dir, bundle, dtype, threads_per_worker)
+    task_args = (output_dir, output_format, id_column)
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args)
+    else:
+        _init_worker(*init_args)
+
+    start = time.perf_counter()
+    chunks_done = chunks_skipped = rows_done = 0
+    pending = set()
+
+    def report(index: int, n_rows: int):
+        elapsed = time.perf_counter() - start
+        print(f"chunk {index}: {n_rows} rows | {chunks_done} chunks, {rows_done} rows scored, "
+              f"{rows_done / elapsed:.0f} rows/s", file=sys.stderr, flush=True)
+
+    def collect(done):
+        nonlocal chunks_done, rows_done
+        for future in done:
+            index, n_rows, _ = future.result()
+            chunks_done += 1
+            rows_done += n_rows
+            report(index, n_rows)
+
+    try:
+        first_row = 0
+        for index, chunk in enumerate(iter_chunks(input_path, chunk_size)):
+            n_rows = len(chunk)
+            if os.path.exists(part_path(output_dir, index, output_format)):
+                chunks_skipped += 1
+            elif executor is None:
+                score_chunk(index, chunk, first_row, *task_args)
+                chunks_done += 1
+                rows_done += n_rows
+                report(index, n_rows)
+            else:
+                # Keep at most two chunks per worker in flight to bound memory
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(executor.submit(score_chunk, index, chunk, first_row, *task_args))
+            first_row += n_rows
+
+        if pending:
+            done, pending = wait(pending)
+            collect(done)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "chunks_scored": chunks_done,
+        "chunks_skipped": chunks_skipped,
+        "rows_scored": rows_done,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(rows_done / elapsed, 1) if elapsed > 0 else None
+    }
+
+    if output_path:
+        summary["rows_merged"] = merge_parts(output_dir, output_format, output_path)
+        summary["output"] = output_path
+
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file offline")
+    parser.add_argument("input", help="CSV or .parquet file to score")
+    parser.add_argument("--output-dir", required=True, help="Directory for per-chunk part files")
+    parser.add_argument("--output", help="Merge the parts into this file when done")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--bundle", action="store_true", help="Load the memory-mapped model bundles")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (0 scores in this process)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", dest="output_format")
+    parser.add_argument("--id-column", default="UNIQUE_ID")
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Discard parts left in --output-dir by a different job")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    summary = score_file(args.input, args.output_dir, model_dir=args.model_dir,
+                         chunk_size=args.chunk_size, workers=args.workers,
+                         threads_per_worker=args.threads_per_worker,
+                         output_format=args.output_format, id_column=args.id_column,
+                         bundle=args.bundle, dtype=args.dtype, output_path=args.output,
+                         overwrite=args.overwrite)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""
+Micro-Benchmarks for the Two-Stage Scoring Pipeline
+Times DataPreprocessor.preprocess, TwoStagePredictor.predict and
+predict_batch, and the /predict and /predict_batch endpoints in process,
+over batch sizes sampled from target_balanced_20.csv with a fixed share of
+rows that Stage 1 escalates to Stage 2. Results are written as JSON so runs
+can be compared commit to commit.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --sizes 1 256 --escalation-rate 0.5 --compare bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZES = [1, 16, 256, 4096, 65536]
+BENCHMARKS = ["preprocess", "predict", "predict_batch", "endpoint_predict", "endpoint_predict_batch"]
+# Benchmarks that score one record per call whatever the batch size
+SINGLE_RECORD_BENCHMARKS = {"predict", "endpoint_predict"}
+
+
+def sample_rows(pool: pd.DataFrame, escalates: np.ndarray, n_rows: int, escalation_rate: float,
+                rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Draw n_rows from pool with round(n_rows * escalation_rate) rows that
+    Stage 1 escalates, in shuffled order
+
+    Args:
+        escalates: Per pool row, whether Stage 1 sends it to Stage 2
+    """
+    n_escalated = int(round(n_rows * escalation_rate))
+    escalating = np.flatnonzero(escalates)
+    staying = np.flatnonzero(~escalates)
+    if n_escalated and escalating.size == 0:
+        raise ValueError("No row in the pool is escalated by Stage 1")
+    if n_rows - n_escalated and staying.size == 0:
+        raise ValueError("Every row in the pool is escalated by Stage 1")
+
+    index = np.concatenate([rng.choice(escalating, n_escalated) if n_escalated else [],
+                            rng.choice(staying, n_rows - n_escalated) if n_rows - n_escalated else []])
+    rng.shuffle(index)
+    return pool.iloc[index.astype(int)].reset_index(drop=True)
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of this process in MB
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # ru_maxrss is the high-water mark (KB on Linux, bytes on macOS)
+        scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class RSSSampler:
+    """
+    Background thread recording the peak RSS while a benchmark runs
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.baseline = self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+def time_calls(call: Callable[[], Any], min_time: float, min_repeats: int, max_repeats: int) -> List[float]:
+    """
+    Call repeatedly after one warm-up call until both min_time seconds and
+    min_repeats calls are reached
+
+    Returns:
+        Seconds per call
+    """
+    call()
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < max_repeats and (len(timings) < min_repeats or time.perf_counter() - start < min_time):
+        t = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - t)
+    return timings
+
+
+class PipelineBenchmark:
+    """
+    Loaded components, sampled inputs and the benchmark cases
+    """
+
+    def __init__(self, model_dir: str, data_path: str, escalation_rate: float, seed: int, bundle: bool = False):
+        from prediction import TwoStagePredictor
+        from preprocessing import DataPreprocessor
+
+        self.model_dir = model_dir
+        self.bundle = bundle
+        self.escalation_rate = escalation_rate
+        self.seed = seed
+
+        self.preprocessor = DataPreprocessor()
+        self.preprocessor.load_preprocessors(model_dir, bundle=bundle)
+        self.preprocessor.compile()
+        self.predictor = TwoStagePredictor()
+        self.predictor.load_models(model_dir, bundle=bundle)
+
+        pool = pd.read_csv(data_path)
+        self.pool = pool.drop(columns=[c for c in ("TARGET", "UNIQUE_ID") if c in pool.columns])
+        stage1 = self.predictor.predict_arrays(self.preprocessor.preprocess(self.pool))
+        self.pool_escalates = stage1["stage1_prediction"] == 1
+        self.client = None
+
+    def records(self, n_rows: int) -> List[Dict[str, Any]]:
+        """
+        n_rows sampled records as the API receives them (NaN as None)
+        """
+        rng = np.random.default_rng(self.seed + n_rows)
+        df = sample_rows(self.pool, self.pool_escalates, n_rows, self.escalation_rate, rng)
+        return json.loads(df.to_json(orient="records"))
+
+    def app_client(self):
+        """
+        In-process client for the FastAPI app, started with these models
+        """
+        if self.client is None:
+            os.environ["PS1_MODEL_DIR"] = self.model_dir
+            os.environ["PS1_MODEL_BUNDLE"] = "1" if self.bundle else "0"
+            from fastapi.testclient import TestClient
+
+            import app
+            self.client = TestClient(app.app)
+            self.client.__enter__()
+        return self.client
+
+    def close(self):
+        if self.client is not None:
+            self.client.__exit__(None, None, None)
+            self.client = None
+
+    def case(self, benchmark: str, n_rows: int) -> Callable[[], Any]:
+        """
+        Zero-argument function running one call of a benchmark
+        """
+        records = self.records(n_rows)
+
+        if benchmark == "preprocess":
+            return lambda: self.preprocessor.preprocess(records)
+        if benchmark == "predict":
+            X = self.preprocessor.preprocess(records[:1])
+            return lambda: self.predictor.predict(X)
+        if benchmark == "predict_batch":
+            X = self.preprocessor.preprocess(records)
+            return lambda: self.predictor.predict_batch(X)
+
+        client = self.app_client()
+        headers = {"Content-Type": "application/json"}
+        if benchmark == "endpoint_predict":
+            body = json.dumps({"data": records[0]})
+            url = "/predict"
+        elif benchmark == "endpoint_predict_batch":
+            body = json.dumps([{"data": record} for record in records])
+            url = "/predict_batch"
+        else:
+            raise ValueError(f"Unknown benchmark: {benchmark}")
+
+        def call():
+            response = client.post(url, content=body, headers=headers)
+            response.raise_for_status()
+        return call
+
+    def run(self, benchmark: str, n_rows: int, min_time: float, min_repeats: int,
+            max_repeats: int) -> Dict[str, Any]:
+        """
+        Time one benchmark at one batch size
+        """
+        call = self.case(benchmark, n_rows)
+        rows_per_call = 1 if benchmark in SINGLE_RECORD_BENCHMARKS else n_rows
+
+        with RSSSampler() as rss:
+            timings = np.array(time_calls(call, min_time, min_repeats, max_repeats))
+
+        return {
+            "benchmark": benchmark,
+            "batch_size": rows_per_call,
+            "repeats": len(timings),
+            "rows_per_second": round(rows_per_call * len(timings) / timings.sum(), 1),
+            "mean_ms": round(float(timings.mean()) * 1000, 3),
+            "p50_ms": round(float(np.percentile(timings, 50)) * 1000, 3),
+            "p99_ms": round(float(np.percentile(timings, 99)) * 1000, 3),
+            "peak_rss_mb": round(rss.peak, 1),
+            "rss_growth_mb": round(rss.peak - rss.baseline, 1)
+        }
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Commit and platform details recorded with the results
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    """
+    Print the throughput change of each case against a previous results file
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["benchmark"], r["batch_size"]): r for r in json.load(f)["results"]}
+
+    print(f"{'benchmark':<24}{'batch':>7}{'rows/s':>14}{'baseline':>14}{'change':>9}{'p99 ms':>11}")
+    for result in results:
+        previous = baseline.get((result["benchmark"], result["batch_size"]))
+        rate = result["rows_per_second"]
+        if previous is None:
+            print(f"{result['benchmark']:<24}{result['batch_size']:>7}{rate:>14.1f}{'-':>14}{'-':>9}"
+                  f"{result['p99_ms']:>11.3f}")
+        else:
+            change = rate / previous["rows_per_second"] - 1
+            print(f"{result['benchmark']:<24}{result['batch_size']:>7}{rate:>14.1f}"
+                  f"{previous['rows_per_second']:>14.1f}{change:>+9.1%}{result['p99_ms']:>11.3f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the two-stage scoring pipeline")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--bundle", action="store_true", help="Load the memory-mapped model bundles")
+    parser.add_argument("--data", default="target_balanced_20.csv", help="Rows to sample batches from")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--escalation-rate", type=float, default=0.2,
+                        help="Share of sampled rows that Stage 1 escalates to Stage 2")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to time each case for")
+    parser.add_argument("--min-repeats", type=int, default=5)
+    parser.add_argument("--max-repeats", type=int, default=10000)
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    if not 0.0 <= args.escalation_rate <= 1.0:
+        raise ValueError("--escalation-rate must be between 0 and 1")
+
+    bench = PipelineBenchmark(args.model_dir, args.data, args.escalation_rate, args.seed, bundle=args.bundle)
+    results = []
+    try:
+        for benchmark in args.benchmarks:
+            # Single-record benchmarks run once, not once per batch size
+            sizes = [1] if benchmark in SINGLE_RECORD_BENCHMARKS else args.sizes
+            for n_rows in sizes:
+                result = bench.run(benchmark, n_rows, args.min_time, args.min_repeats, args.max_repeats)
+                print(f"{benchmark:<24} batch {n_rows:>6}: {result['rows_per_second']:>11.1f} rows/s  "
+                      f"p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms  "
+                      f"peak RSS {result['peak_rss_mb']} MB", file=sys.stderr, flush=True)
+                results.append(result)
+    finally:
+        bench.close()
+
+    report = {
+        "environment": environment(),
+        "config": {
+            "model_dir": args.model_dir,
+            "bundle": args.bundle,
+            "data": args.data,
+            "escalation_rate": args.escalation_rate,
+            "pool_escalated": int(bench.pool_escalates.sum()),
+            "pool_rows": len(bench.pool),
+            "seed": args.seed,
+            "min_time": args.min_time,
+            "min_repeats": args.min_repeats
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
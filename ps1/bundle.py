@@ -0,0 +1,311 @@
+"""
+Memory-Mapped Model Bundles
+One versioned file per component set: a JSON manifest followed by 64-byte
+aligned numeric arrays that the loader maps read-only, so processes share
+the pages and loading does no deserialization
+
+Layout:
+    MAGIC (8 bytes) | manifest length (uint64 LE) | manifest JSON |
+    padding to ALIGNMENT | data section (aligned arrays)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from tree_engine import FlatForest, export_forest, is_tree_model
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PS1BNDL\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+MODELS_BUNDLE = "models.bundle"
+PREPROCESSORS_BUNDLE = "preprocessors.bundle"
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class Bundle:
+    """
+    An opened bundle: its manifest and read-only memory-mapped arrays
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+
+    @property
+    def kind(self) -> str:
+        return self.manifest["kind"]
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return self.manifest["meta"]
+
+    @property
+    def checksum(self) -> str:
+        return self.manifest["data_checksum"]
+
+
+def write_bundle(path: str, kind: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any],
+                 paired_with: Optional[str] = None) -> str:
+    """
+    Write arrays and metadata as one bundle file
+
+    The file is written next to path and renamed into place, so readers
+    never map a partially written bundle.
+
+    Args:
+        path: Output file
+        kind: "models" or "preprocessors"
+        arrays: Array name -> numeric (or fixed-width string) array
+        meta: JSON-serializable metadata needed to rebuild the components
+        paired_with: Checksum of the bundle these components must be used with
+
+    Returns:
+        Checksum of the data section
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.kind == "O":
+            raise ValueError(f"Bundle array {name} has object dtype")
+        offset = _aligned(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    data_size = _aligned(offset)
+
+    data = bytearray(data_size)
+    for name, array in arrays.items():
+        raw = np.ascontiguousarray(array).tobytes()
+        start = layout[name]["offset"]
+        data[start:start + len(raw)] = raw
+
+    checksum = hashlib.blake2b(data, digest_size=16).hexdigest()
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "kind": kind,
+        "created_at": datetime.now().isoformat(),
+        "data_checksum": checksum,
+        "data_size": data_size,
+        "paired_with": paired_with,
+        "arrays": layout,
+        "meta": meta
+    }
+    header = json.dumps(manifest).encode()
+    prefix = MAGIC + struct.pack("<Q", len(header)) + header
+    padding = b"\x00" * (_aligned(len(prefix)) - len(prefix))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix + padding)
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Wrote {kind} bundle {path} ({len(arrays)} arrays, {data_size} bytes)")
+    return checksum
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """
+    Read only the manifest of a bundle
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model bundle")
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        manifest = json.loads(f.read(header_size))
+
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {manifest['format_version']} in {path}")
+    manifest["_data_offset"] = _aligned(len(MAGIC) + 8 + header_size)
+    return manifest
+
+
+def read_bundle(path: str, kind: Optional[str] = None, verify: bool = True) -> Bundle:
+    """
+    Memory-map a bundle
+
+    Args:
+        path: Bundle file
+        kind: Expected bundle kind, checked when given
+        verify: Hash the data section and compare it with the manifest
+            checksum (reads every page once)
+    """
+    manifest = read_manifest(path)
+    if kind is not None and manifest["kind"] != kind:
+        raise ValueError(f"{path} is a {manifest['kind']} bundle, expected {kind}")
+
+    data = np.memmap(path, dtype=np.uint8, mode="r", offset=manifest["_data_offset"],
+                     shape=(manifest["data_size"],))
+    if verify:
+        checksum = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if checksum != manifest["data_checksum"]:
+            raise ValueError(f"Checksum mismatch in {path}")
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = spec["offset"]
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=start).reshape(spec["shape"])
+
+    return Bundle(path, manifest, arrays)
+
+
+def check_pair(preprocessors: Bundle, models: Bundle):
+    """
+    Raise ValueError unless the model bundle was saved with these preprocessors
+    """
+    paired_with = models.manifest.get("paired_with")
+    if paired_with is not None and paired_with != preprocessors.checksum:
+        raise ValueError(f"Model bundle {models.path} was built for preprocessors {paired_with}, "
+                         f"but {preprocessors.path} is {preprocessors.checksum}")
+
+
+class LinearModel:
+    """
+    Binary logistic regression scored from bundled coefficients
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positive = 1.0 / (1.0 + np.exp(-(X @ self.coef_[0] + self.intercept_[0])))
+        return np.column_stack([1.0 - positive, positive])
+
+
+class MLPModel:
+    """
+    Binary multi-layer perceptron scored from bundled weights
+    """
+
+    ACTIVATIONS = {
+        "relu": lambda z: np.maximum(z, 0.0),
+        "tanh": np.tanh,
+        "logistic": lambda z: 1.0 / (1.0 + np.exp(-z)),
+        "identity": lambda z: z
+    }
+
+    def __init__(self, coefs: list, intercepts: list, activation: str):
+        if activation not in self.ACTIVATIONS:
+            raise ValueError(f"Unsupported MLP activation: {activation}")
+        self.coefs_ = coefs
+        self.intercepts_ = intercepts
+        self.activation = activation
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        hidden = self.ACTIVATIONS[self.activation]
+        output = X
+        for i, (W, b) in enumerate(zip(self.coefs_, self.intercepts_)):
+            output = output @ W + b
+            if i < len(self.coefs_) - 1:
+                output = hidden(output)
+        positive = 1.0 / (1.0 + np.exp(-output[:, 0]))
+        return np.column_stack([1.0 - positive, positive])
+
+
+def pack_model(prefix: str, model, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    Add a model's arrays to arrays under prefix and return its metadata
+
+    Tree ensembles are stored as flat forests, logistic regressions as
+    coefficients and MLPs as layer weights.
+    """
+    if is_tree_model(model):
+        model = export_forest(model)
+
+    if isinstance(model, FlatForest):
+        for name, array in model.to_arrays().items():
+            arrays[f"{prefix}/{name}"] = array
+        return {"type": "forest", "params": model.get_params()}
+
+    if hasattr(model, "coefs_"):
+        if getattr(model, "out_activation_", "logistic") != "logistic":
+            raise ValueError(f"Unsupported MLP output activation for {prefix}")
+        for i, (W, b) in enumerate(zip(model.coefs_, model.intercepts_)):
+            arrays[f"{prefix}/W{i}"] = np.asarray(W, dtype=np.float64)
+            arrays[f"{prefix}/b{i}"] = np.asarray(b, dtype=np.float64)
+        return {"type": "mlp", "n_layers": len(model.coefs_), "activation": model.activation}
+
+    if hasattr(model, "coef_"):
+        if np.asarray(model.coef_).shape[0] != 1:
+            raise ValueError(f"Only binary linear models can be bundled ({prefix})")
+        arrays[f"{prefix}/coef"] = np.asarray(model.coef_, dtype=np.float64)
+        arrays[f"{prefix}/intercept"] = np.asarray(model.intercept_, dtype=np.float64)
+        return {"type": "linear"}
+
+    raise ValueError(f"Cannot bundle {prefix} model of type {type(model).__name__}")
+
+
+def unpack_model(prefix: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Rebuild a model packed by pack_model() on top of the mapped arrays
+    """
+    if meta["type"] == "forest":
+        names = ["feature", "threshold", "left", "right", "nan_left", "value", "roots", "children"]
+        return FlatForest(**{name: arrays[f"{prefix}/{name}"] for name in names}, **meta["params"])
+    if meta["type"] == "mlp":
+        n_layers = meta["n_layers"]
+        return MLPModel([arrays[f"{prefix}/W{i}"] for i in range(n_layers)],
+                        [arrays[f"{prefix}/b{i}"] for i in range(n_layers)],
+                        meta["activation"])
+    if meta["type"] == "linear":
+        return LinearModel(arrays[f"{prefix}/coef"], arrays[f"{prefix}/intercept"])
+
+    raise ValueError(f"Unknown bundled model type: {meta['type']}")
+
+
+class ImputerState:
+    """
+    Median imputer rebuilt from bundled statistics
+    """
+
+    def __init__(self, statistics: np.ndarray, feature_names: list):
+        self.statistics_ = statistics
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+
+    def transform(self, X) -> np.ndarray:
+        keep = ~np.isnan(self.statistics_)
+        X = np.array(X, dtype=np.float64)[:, keep]
+        np.copyto(X, np.broadcast_to(self.statistics_[keep], X.shape), where=np.isnan(X))
+        return X
+
+
+class ScalerState:
+    """
+    Standard scaler rebuilt from bundled mean and scale
+    """
+
+    with_mean = True
+    with_std = True
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class LabelEncoderState:
+    """
+    Label encoder rebuilt from bundled classes
+    """
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = classes
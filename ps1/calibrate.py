@@ -0,0 +1,351 @@
+"""
+Cascade Threshold Calibration for the Two-Stage Fraud Detection Model
+Scores held-out records once, caching the Stage 1 and Stage 2
+probabilities, then sweeps every pair of candidate thresholds with
+cumulative counts over a 2D histogram. Each pair gets recall, precision
+and the Stage 2 escalation rate. The chosen pair is written to
+thresholds.pkl.
+
+The held-out records are either a separate validation file or the records
+train_models.py did not train on, rebuilt from its splits of the training
+data.
+
+Usage:
+    python calibrate.py --data HACKATHON_TRAINING_DATA.csv --min-recall 0.9
+    python calibrate.py --validation-data validation.csv --max-escalation 0.1 --dry-run
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from bundle import MODELS_BUNDLE
+from prediction import TwoStagePredictor
+from preprocessing import DataPreprocessor
+
+logger = logging.getLogger(__name__)
+
+GRID_SIZE = 500
+
+
+def holdout_weights(df: pd.DataFrame, stage1_probs: np.ndarray) -> np.ndarray:
+    """
+    Weights that make the records train_models.py held out stand for its
+    whole Stage 1 test split
+
+    Stage 1 test records escalated at training time were split again, and
+    only the Stage 2 test share of them is held out. Those records are
+    up-weighted by the inverse of that share; records either stage trained
+    on get weight 0.
+    """
+    from sklearn.model_selection import train_test_split
+
+    from train_models import SPLIT_RANDOM_STATE, TEST_SIZE
+
+    # Only the record count, labels and seed decide a split, so splitting
+    # positions reproduces the splits train_models.py made
+    y = df["TARGET"].to_numpy()
+    _, test1 = train_test_split(np.arange(len(df)), stratify=y, test_size=TEST_SIZE,
+                                random_state=SPLIT_RANDOM_STATE)
+
+    weights = np.zeros(len(df))
+    weights[test1] = 1.0
+
+    # Stage 2 was trained on test records escalated at the default threshold
+    escalated = test1[stage1_probs[test1] > TwoStagePredictor().stage1_threshold]
+    if escalated.size == 0:
+        return weights
+    train2, test2 = train_test_split(escalated, stratify=y[escalated], test_size=TEST_SIZE,
+                                     random_state=SPLIT_RANDOM_STATE)
+    weights[train2] = 0.0
+    weights[test2] = len(escalated) / len(test2)
+    return weights
+
+
+def score_records(model_dir: str, df: pd.DataFrame, scoring_mode: str = "full") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stage 1 and Stage 2 probabilities of every record, as the service
+    computes them
+
+    Stage 2 scores all records, not only the escalated ones, so any Stage 1
+    threshold can be evaluated afterwards.
+    """
+    preprocessor = DataPreprocessor()
+    preprocessor.load_preprocessors(model_dir)
+    preprocessor.compile()
+    predictor = TwoStagePredictor()
+    predictor.load_models(model_dir)
+
+    X = preprocessor.preprocess(df.drop(columns=[c for c in ("TARGET", "UNIQUE_ID") if c in df.columns]))
+    stage1_probs = predictor._predict_model_proba("Stage1", predictor.stage1_model, X)
+    if scoring_mode == "fast":
+        if predictor.stage2_student is None:
+            raise ValueError("Stage 2 student not loaded")
+        stage2_probs = predictor._predict_model_proba("Stage2Student", predictor.stage2_student, X)
+    else:
+        stage2_probs = predictor._predict_stage2_proba(X)
+    return np.asarray(stage1_probs, dtype=np.float64), np.asarray(stage2_probs, dtype=np.float64)
+
+
+def cache_key(model_dir: str, data_path: str, holdout: bool, scoring_mode: str) -> str:
+    """
+    Fingerprint of the model files, data file and scoring options
+    """
+    entries = []
+    for path in [data_path] + sorted(os.path.join(model_dir, name) for name in os.listdir(model_dir)
+                                     if name.endswith((".pkl", ".json", ".cbm")) and name != "thresholds.pkl"):
+        stat = os.stat(path)
+        entries.append([os.path.abspath(path), stat.st_size, stat.st_mtime])
+    entries.append([holdout, scoring_mode])
+    return hashlib.blake2b(json.dumps(entries).encode(), digest_size=16).hexdigest()
+
+
+def load_scores(model_dir: str, data_path: str, holdout: bool, scoring_mode: str,
+                cache_path: Optional[str]) -> Dict[str, np.ndarray]:
+    """
+    Probabilities, labels and weights of the calibration records, from the
+    cache when it matches the models and data
+    """
+    key = cache_key(model_dir, data_path, holdout, scoring_mode)
+    if cache_path and os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if str(cached["key"]) == key:
+            logger.info(f"Using cached scores from {cache_path}")
+            return {name: cached[name] for name in ("stage1_probs", "stage2_probs", "y", "weights")}
+
+    df = pd.read_csv(data_path)
+    if "TARGET" not in df.columns:
+        raise ValueError(f"{data_path} has no TARGET column")
+
+    stage1_probs, stage2_probs = score_records(model_dir, df, scoring_mode)
+    weights = holdout_weights(df, stage1_probs) if holdout else np.ones(len(df))
+    keep = weights > 0
+    scores = {
+        "stage1_probs": stage1_probs[keep],
+        "stage2_probs": stage2_probs[keep],
+        "y": df["TARGET"].to_numpy()[keep].astype(np.int8),
+        "weights": weights[keep]
+    }
+    if cache_path:
+        np.savez(cache_path, key=key, **scores)
+        logger.info(f"Cached scores of {int(keep.sum())} records in {cache_path}")
+    return scores
+
+
+def candidate_thresholds(probs: np.ndarray, grid_size: int, *always: float) -> np.ndarray:
+    """
+    Sorted candidate thresholds: quantiles of the probabilities plus the
+    given values
+    """
+    quantiles = np.quantile(probs, np.linspace(0.0, 1.0, grid_size)) if grid_size else np.unique(probs)
+    return np.unique(np.concatenate([quantiles, np.asarray(always, dtype=np.float64)]))
+
+
+def sweep_thresholds(stage1_probs: np.ndarray, stage2_probs: np.ndarray, y: np.ndarray,
+                     stage1_grid: np.ndarray, stage2_grid: np.ndarray,
+                     weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Cascade metrics for every (stage1_grid[i], stage2_grid[j]) pair
+
+    A record is flagged when stage1_prob > t1 and stage2_prob > t2, as in
+    TwoStagePredictor. Each record is placed in the 2D histogram cell of
+    how many candidates each probability exceeds (a binary search per
+    record). Reverse cumulative sums over both axes then give, for every
+    pair at once, the weighted count of records flagged, in O(n log G + G^2).
+
+    Returns:
+        Dictionary of (len(stage1_grid), len(stage2_grid)) arrays: recall,
+        precision and flagged; and escalation_rate per stage1_grid entry
+    """
+    weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+    n1, n2 = len(stage1_grid) + 1, len(stage2_grid) + 1
+
+    # Number of candidates strictly below each probability
+    cell = np.searchsorted(stage1_grid, stage1_probs, side="left") * n2 + \
+        np.searchsorted(stage2_grid, stage2_probs, side="left")
+
+    def passing(w: np.ndarray) -> np.ndarray:
+        counts = np.bincount(cell, weights=w, minlength=n1 * n2).reshape(n1, n2)
+        at_least = counts[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+        # Cell (a, b) exceeds candidates i < a and j < b
+        return at_least[1:, 1:]
+
+    flagged = passing(weights)
+    true_positives = passing(weights * y)
+    # Stage 1 escalation does not depend on t2
+    escalated = np.bincount(np.searchsorted(stage1_grid, stage1_probs, side="left"), weights=weights,
+                            minlength=n1)[::-1].cumsum()[::-1][1:]
+
+    total = weights.sum()
+    positives = (weights * y).sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(flagged > 0, true_positives / flagged, np.nan)
+    return {
+        "recall": true_positives / positives if positives > 0 else np.zeros_like(flagged),
+        "precision": precision,
+        "flagged": flagged / total,
+        "escalation_rate": escalated / total
+    }
+
+
+def choose_thresholds(stage1_grid: np.ndarray, stage2_grid: np.ndarray, results: Dict[str, np.ndarray],
+                      min_recall: float, min_precision: float = 0.0,
+                      max_escalation: float = 1.0) -> Tuple[int, int]:
+    """
+    Grid indices of the pair with the lowest escalation rate among those
+    meeting the recall, precision and escalation limits; ties go to higher
+    precision, then higher recall
+    """
+    escalation = np.broadcast_to(results["escalation_rate"][:, None], results["recall"].shape)
+    precision = np.nan_to_num(results["precision"], nan=0.0)
+    feasible = ((results["recall"] >= min_recall - 1e-12) & (precision >= min_precision)
+                & (escalation <= max_escalation))
+    if not feasible.any():
+        raise ValueError(f"No threshold pair reaches recall {min_recall}, precision {min_precision} "
+                         f"and escalation rate {max_escalation}")
+
+    i, j = np.nonzero(feasible)
+    best = np.lexsort((-results["recall"][i, j], -precision[i, j], escalation[i, j]))[0]
+    return int(i[best]), int(j[best])
+
+
+def pair_metrics(results: Dict[str, np.ndarray], stage1_grid: np.ndarray, stage2_grid: np.ndarray,
+                 i: int, j: int) -> Dict[str, Any]:
+    precision = results["precision"][i, j]
+    return {
+        "stage1_threshold": float(stage1_grid[i]),
+        "stage2_threshold": float(stage2_grid[j]),
+        "recall": round(float(results["recall"][i, j]), 4),
+        "precision": None if np.isnan(precision) else round(float(precision), 4),
+        "escalation_rate": round(float(results["escalation_rate"][i]), 4),
+        "flagged_rate": round(float(results["flagged"][i, j]), 4)
+    }
+
+
+def write_thresholds(model_dir: str, stage1_threshold: float, stage2_threshold: float):
+    """
+    Store the thresholds in thresholds.pkl, and in models.bundle if present
+    """
+    path = os.path.join(model_dir, "thresholds.pkl")
+    thresholds = joblib.load(path) if os.path.exists(path) else {}
+    thresholds.update({"stage1_threshold": float(stage1_threshold), "stage2_threshold": float(stage2_threshold)})
+    joblib.dump(thresholds, path)
+
+    if os.path.exists(os.path.join(model_dir, MODELS_BUNDLE)):
+        # The bundle carries its own copy of the thresholds
+        predictor = TwoStagePredictor()
+        predictor.load_models(model_dir)
+        predictor.save_bundle(model_dir)
+
+
+def calibrate(model_dir: str, data_path: str, holdout: bool = True, scoring_mode: str = "full",
+              cache_path: Optional[str] = None, grid_size: int = GRID_SIZE, min_recall: Optional[float] = None,
+              min_precision: float = 0.0, max_escalation: float = 1.0, write: bool = True) -> Dict[str, Any]:
+    """
+    Sweep the threshold pairs and optionally write the chosen one
+
+    min_recall defaults to the recall of the current thresholds, so the
+    chosen pair escalates as few records as possible without losing recall.
+
+    Returns:
+        Report with the current and chosen pairs and the best alternatives
+    """
+    scores = load_scores(model_dir, data_path, holdout, scoring_mode, cache_path)
+    current = joblib.load(os.path.join(model_dir, "thresholds.pkl"))
+
+    stage1_grid = candidate_thresholds(scores["stage1_probs"], grid_size, current["stage1_threshold"])
+    stage2_grid = candidate_thresholds(scores["stage2_probs"], grid_size, current["stage2_threshold"])
+    results = sweep_thresholds(scores["stage1_probs"], scores["stage2_probs"], scores["y"],
+                               stage1_grid, stage2_grid, scores["weights"])
+
+    i_cur = int(np.searchsorted(stage1_grid, current["stage1_threshold"]))
+    j_cur = int(np.searchsorted(stage2_grid, current["stage2_threshold"]))
+    current_pair = pair_metrics(results, stage1_grid, stage2_grid, i_cur, j_cur)
+    if min_recall is None:
+        # Unrounded, so the current pair always meets it
+        min_recall = float(results["recall"][i_cur, j_cur])
+    i, j = choose_thresholds(stage1_grid, stage2_grid, results, min_recall, min_precision, max_escalation)
+    chosen = pair_metrics(results, stage1_grid, stage2_grid, i, j)
+
+    # Lowest-escalation pair for each recall level reached, best first
+    escalation = np.broadcast_to(results["escalation_rate"][:, None], results["recall"].shape)
+    order = np.lexsort((escalation.ravel(), -np.round(results["recall"].ravel(), 4)))
+    frontier, seen = [], set()
+    for flat in order:
+        recall = round(float(results["recall"].flat[flat]), 4)
+        if recall not in seen:
+            seen.add(recall)
+            frontier.append(pair_metrics(results, stage1_grid, stage2_grid, *np.unravel_index(flat, escalation.shape)))
+
+    report = {
+        "records": int(len(scores["y"])),
+        "weighted_records": round(float(scores["weights"].sum()), 1),
+        "scoring_mode": scoring_mode,
+        "pairs_evaluated": int(results["recall"].size),
+        "constraints": {"min_recall": round(min_recall, 4), "min_precision": min_precision, "max_escalation": max_escalation},
+        "current": current_pair,
+        "chosen": chosen,
+        "frontier": frontier[:50],
+        "written": write
+    }
+
+    if write:
+        write_thresholds(model_dir, chosen["stage1_threshold"], chosen["stage2_threshold"])
+        logger.info(f"Wrote thresholds {chosen['stage1_threshold']:.6g}/{chosen['stage2_threshold']:.6g} "
+                    f"to {model_dir}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Calibrate the Stage 1 and Stage 2 thresholds")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="Training CSV; the records train_models.py held out are used")
+    source.add_argument("--validation-data", help="Separate labelled CSV; every record is used")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--scoring-mode", choices=["full", "fast"], default="full",
+                        help="Calibrate the Stage 2 ensemble or the distilled student")
+    parser.add_argument("--cache", help="Probability cache (.npz); default: calibration_scores.npz in --model-dir")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE,
+                        help="Candidate thresholds per stage (0: every distinct probability)")
+    parser.add_argument("--min-recall", type=float, help="Default: recall of the current thresholds")
+    parser.add_argument("--min-precision", type=float, default=0.0)
+    parser.add_argument("--max-escalation", type=float, default=1.0)
+    parser.add_argument("--report", help="Write the report JSON here")
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing thresholds.pkl")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    report = calibrate(args.model_dir, args.data or args.validation_data, holdout=args.data is not None,
+                       scoring_mode=args.scoring_mode,
+                       cache_path=args.cache or os.path.join(args.model_dir, "calibration_scores.npz"),
+                       grid_size=args.grid_size, min_recall=args.min_recall, min_precision=args.min_precision,
+                       max_escalation=args.max_escalation, write=not args.dry_run)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"Evaluated {report['pairs_evaluated']} threshold pairs on {report['records']} records")
+    for name in ("current", "chosen"):
+        pair = report[name]
+        print(f"{name:>8}: stage1 {pair['stage1_threshold']:.6g}  stage2 {pair['stage2_threshold']:.6g}  "
+              f"recall {pair['recall']}  precision {pair['precision']}  escalation {pair['escalation_rate']}")
+    if not report["written"]:
+        print("Dry run: thresholds.pkl not changed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
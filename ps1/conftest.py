@@ -0,0 +1,60 @@
+"""
+Shared fixtures: the FastAPI app serving a small synthetic model set
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_api_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic frame whose categoricals include missing values"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "LIMIT": rng.normal(0, 1, n_rows),
+        "AGE": rng.normal(0, 1, n_rows),
+        "SI_FLG": rng.choice(["Y", "N", np.nan], n_rows),
+        "TIME_PERIOD": rng.choice(["DEC24", "JAN25", np.nan], n_rows)
+    })
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """
+    Test client of the app, started on models trained here
+
+    Stage 1's threshold is 0, so every record reaches Stage 2.
+    """
+    from fastapi.testclient import TestClient
+
+    from prediction import TwoStagePredictor
+    from preprocessing import DataPreprocessor
+
+    df = make_api_frame(200)
+    y = (df["LIMIT"] + (df["SI_FLG"] == "Y") - df["TIME_PERIOD"].isna() > 0.5).astype(int)
+
+    model_dir = str(tmp_path_factory.mktemp("api_models"))
+    preprocessor = DataPreprocessor()
+    preprocessor.fit_stage1(df, y)
+    preprocessor.fit_stage2(df, y)
+    preprocessor.save_preprocessors(model_dir)
+
+    predictor = TwoStagePredictor()
+    predictor.create_stage2_models()
+    predictor.stage2_models["CatBoost"].set_params(iterations=20, allow_writing_files=False)
+    X = preprocessor.preprocess(df)
+    predictor.train_stage1(X, y)
+    predictor.train_stage2(X, y)
+    predictor.stage1_threshold = 0.0
+    predictor.save_models(model_dir)
+
+    os.environ["PS1_MODEL_DIR"] = model_dir
+    import app
+    if app.MODEL_DIR != model_dir:
+        pytest.skip("app was imported with another model directory")
+    with TestClient(app.app) as client:
+        yield client
@@ -1,13 +1,43 @@
-import pandas as pd
-import requests
-import numpy as np
+"""
+Concurrent CSV Client for the /predict_batch Endpoint
+Streams the CSV in chunks and posts them over a pooled async HTTP client
+with a bounded number of requests in flight. Failed requests are retried
+with exponential backoff, and every finished chunk is checkpointed as a
+part file, so an interrupted run resumes where it stopped.
+
+Usage:
+    python csv_to_api.py HACKATHON_PREDICTION_DATA.csv --concurrency 8 --chunk-size 1000
+"""
+
+import argparse
+import asyncio
 import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from batch_score import check_job, merge_parts, part_path, write_frame
 
 # =======================
 # Configuration - Change as needed
 # =======================
 API_URL = "http://localhost:8000/predict_batch"  # URL of your FastAPI batch predict endpoint
 CSV_FILE = "HACKATHON_PREDICTION_DATA.csv"                        # Your CSV filename/path
+OUTPUT_CSV = "predictions_output.csv"
+PARTS_DIR = "predictions_parts"      # Checkpointed per-chunk results
+ID_COLUMN = "UNIQUE_ID"
+CHUNK_SIZE = 1000                    # Records per request
+CONCURRENCY = 4                      # Requests in flight
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.5                # First retry delay, doubled on each attempt
+REQUEST_TIMEOUT = 120.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
 EXPECTED_FEATURE_COLUMNS = [
     'ACCT_AGE', 'LIMIT', 'OUTS', 'ACCT_RESIDUAL_TENURE', 'LOAN_TENURE', 'INSTALAMT', 'SI_FLG',
@@ -34,94 +64,225 @@ EXPECTED_FEATURE_COLUMNS = [
     'AVERAGE_ACCT_AGE1', 'CREDIT_HISTORY_LENGTH1', 'NO_OF_INQUIRIES1', 'INCOME_BAND1', 'AGREG_GROUP', 'PRODUCT_TYPE',
     'LATEST_CR_DAYS', 'LATEST_DR_DAYS', 'TIME_PERIOD'
 ]
-medians_df = pd.read_csv('feature_medians.csv', index_col=0)
+medians_df = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_medians.csv'),
+                         index_col=0)
 feature_medians = medians_df.iloc[:, 0]
-def load_and_prepare_data(csv_file):
+
+
+def prepare_chunk(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
-    Load CSV and prepare data payload for the API:
+    Prepare one CSV chunk as the API payload:
+    - Fills infinities and missing values with the training medians;
     - Filters and reorders expected features;
     - Converts each row into {"data": {...}} dictionary.
     """
-    df = pd.read_csv(csv_file)
-
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
-    for col in feature_medians.index:
-        if col in df.columns:
-            median_value = feature_medians.loc[col]
-            df[col].fillna(median_value, inplace=True)
+    df = df.replace([np.inf, -np.inf], np.nan)
+    medians = feature_medians[feature_medians.index.isin(df.columns)]
+    df = df.fillna(medians.to_dict())
 
     missing_columns = set(EXPECTED_FEATURE_COLUMNS) - set(df.columns)
     if missing_columns:
         raise ValueError(f"CSV is missing expected columns: {missing_columns}")
 
-    # Filter and reorder columns exactly as expected
-    df = df[EXPECTED_FEATURE_COLUMNS]
+    records = df[EXPECTED_FEATURE_COLUMNS].to_dict(orient="records")
+    return [{"data": record} for record in records]
 
-    # Convert each row to dict {"data": {...}} for API input
-    records = df.to_dict(orient="records")
-    api_payload = [{"data": record} for record in records]
 
-    return api_payload
+def iter_chunks(csv_file: str, chunk_size: int, id_column: str) -> Iterator[Tuple[int, np.ndarray, pd.DataFrame]]:
+    """
+    Read the CSV chunk by chunk
+
+    Yields:
+        Tuple of (chunk index, row ids, chunk); ids are row numbers when the
+        file has no id_column
+    """
+    first_row = 0
+    for index, chunk in enumerate(pd.read_csv(csv_file, chunksize=chunk_size, low_memory=False)):
+        if id_column in chunk.columns:
+            ids = chunk[id_column].to_numpy()
+        else:
+            ids = np.arange(first_row, first_row + len(chunk))
+        first_row += len(chunk)
+        yield index, ids, chunk
 
 
-def send_batch_prediction_request(payload):
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
     """
-    Sends a POST request to the /predict_batch endpoint with given payload.
+    Seconds to wait before the next attempt
+
+    A Retry-After header from the server wins; otherwise the delay doubles
+    per attempt with full jitter so retrying clients do not synchronize.
     """
-    headers = {"Content-Type": "application/json"}
+    if response is not None:
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0, BACKOFF_SECONDS * 2 ** attempt)
 
-    try:
-        response = requests.post(API_URL, json=payload, headers=headers)
-        response.raise_for_status()  # Raise HTTPError for bad codes
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error communicating with API: {e}")
-        return None
+
+async def send_batch_prediction_request(client: httpx.AsyncClient, url: str, payload: List[Dict[str, Any]],
+                                        stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    POST one chunk to the /predict_batch endpoint, retrying transient failures
+
+    Connection errors, timeouts and RETRY_STATUS_CODES are retried up to
+    MAX_RETRIES times; other errors are raised at once.
+
+    Returns:
+        The per-record predictions
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        response = None
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json=payload)
+            if response.status_code not in RETRY_STATUS_CODES:
+                response.raise_for_status()
+                stats["latencies"].append(time.perf_counter() - start)
+                return response.json()["predictions"]
+            error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if attempt == MAX_RETRIES:
+            raise RuntimeError(f"Request failed after {MAX_RETRIES + 1} attempts ({error})")
+        stats["retries"] += 1
+        delay = retry_delay(attempt, response)
+        print(f"Retrying in {delay:.2f}s after {error}", file=sys.stderr)
+        await asyncio.sleep(delay)
+
+
+async def score_chunk(client: httpx.AsyncClient, url: str, index: int, ids: np.ndarray,
+                      chunk: pd.DataFrame, parts_dir: str, id_column: str, stats: Dict[str, Any]):
+    """
+    Score one chunk and checkpoint its predictions as a part file
+    """
+    predictions = await send_batch_prediction_request(client, url, prepare_chunk(chunk), stats)
+    if len(predictions) != len(ids):
+        raise RuntimeError(f"Chunk {index}: sent {len(ids)} records, got {len(predictions)} predictions")
+
+    result = pd.DataFrame({
+        id_column: ids,
+        "prediction": [item["prediction"] for item in predictions],
+        "stage1_probability": [item["stage1_probability"] for item in predictions],
+        "stage2_probability": [item["stage2_probability"] for item in predictions],
+        "stage_used": [item["stage_used"] for item in predictions]
+    })
+    write_frame(result, part_path(parts_dir, index, "csv"), "csv")
+
+    stats["chunks_sent"] += 1
+    stats["records_sent"] += len(ids)
+    elapsed = time.perf_counter() - stats["start"]
+    print(f"chunk {index}: {len(ids)} records | {stats['records_sent']} sent, "
+          f"{stats['records_sent'] / elapsed:.0f} records/s", file=sys.stderr, flush=True)
+
+
+async def run(csv_file: str, url: str = API_URL, parts_dir: str = PARTS_DIR, output_csv: Optional[str] = OUTPUT_CSV,
+              chunk_size: int = CHUNK_SIZE, concurrency: int = CONCURRENCY, id_column: str = ID_COLUMN,
+              overwrite: bool = False, transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict[str, Any]:
+    """
+    Send the CSV to the API chunk by chunk
+
+    At most `concurrency` chunks are read and in flight at once, so memory
+    stays bounded however large the file. Chunks that already have a part
+    file in parts_dir are skipped.
+
+    Returns:
+        Summary with chunk and record counts, throughput and request latency
+        percentiles
+    """
+    stat = os.stat(csv_file)
+    check_job(parts_dir, {
+        "input": os.path.abspath(csv_file),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "chunk_size": chunk_size,
+        "id_column": id_column
+    }, overwrite)
+
+    stats = {"start": time.perf_counter(), "latencies": [], "retries": 0, "chunks_sent": 0, "records_sent": 0}
+    chunks_skipped = 0
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def guarded(*args):
+        try:
+            await score_chunk(*args)
+        finally:
+            slots.release()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT, transport=transport) as client:
+        try:
+            for index, ids, chunk in iter_chunks(csv_file, chunk_size, id_column):
+                if os.path.exists(part_path(parts_dir, index, "csv")):
+                    chunks_skipped += 1
+                    continue
+                # Wait for a free slot before reading further ahead
+                await slots.acquire()
+                task = asyncio.create_task(guarded(client, url, index, ids, chunk, parts_dir, id_column, stats))
+                tasks.add(task)
+                # Drop finished tasks, stopping as soon as a chunk has failed for good
+                for done in [t for t in tasks if t.done()]:
+                    tasks.discard(done)
+                    done.result()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    elapsed = time.perf_counter() - stats["start"]
+    latencies = np.array(stats["latencies"]) * 1000
+    summary = {
+        "chunks_sent": stats["chunks_sent"],
+        "chunks_skipped": chunks_skipped,
+        "records_sent": stats["records_sent"],
+        "retries": stats["retries"],
+        "seconds": round(elapsed, 2),
+        "records_per_second": round(stats["records_sent"] / elapsed, 1) if elapsed > 0 else None,
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)), 1) if len(latencies) else None
+    }
+
+    if output_csv:
+        summary["records_merged"] = merge_parts(parts_dir, "csv", output_csv)
+        summary["output"] = output_csv
+
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Send a CSV to the /predict_batch endpoint")
+    parser.add_argument("csv_file", nargs="?", default=CSV_FILE)
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--output", default=OUTPUT_CSV, help="Merged predictions file")
+    parser.add_argument("--parts-dir", default=PARTS_DIR, help="Directory for checkpointed chunk results")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Records per request")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--id-column", default=ID_COLUMN)
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Discard checkpoints left in --parts-dir by a different run")
+    return parser.parse_args()
 
 
 def main():
-    print(f"Loading data from {CSV_FILE}...")
+    args = parse_args()
+    print(f"Sending {args.csv_file} to {args.url} in chunks of {args.chunk_size} "
+          f"({args.concurrency} in flight)...")
     try:
-        batch_data = load_and_prepare_data(CSV_FILE)
-        print(f"Loaded {len(batch_data)} records from CSV.")
-
-        print(f"Sending batch prediction request to {API_URL} ...")
-        results = send_batch_prediction_request(batch_data)
-
-        if results is not None:
-            # Try to extract 0/1 predictions from the API response
-            # Assume response is a list of dicts with a key like 'prediction' or similar
-            # Try to handle both list of dicts and list of values
-            predictions = []
-            if isinstance(results, list):
-                for item in results:
-                    if isinstance(item, dict):
-                        # Try common keys
-                        for key in ['prediction', 'pred', 'output', 'label', 'result']:
-                            if key in item:
-                                predictions.append(item[key])
-                                break
-                        else:
-                            # If no known key, try to use the first value
-                            if len(item) > 0:
-                                predictions.append(list(item.values())[0])
-                    else:
-                        predictions.append(item)
-            else:
-                print("Unexpected API response format.")
-                return
-
-            # Save predictions to CSV
-            output_df = pd.DataFrame({'prediction': predictions})
-            output_csv = 'predictions_output.csv'
-            output_df.to_csv(output_csv, index=False)
-            print(f"Predictions saved to {output_csv}")
-        else:
-            print("Failed to get predictions from the API.")
-
+        summary = asyncio.run(run(args.csv_file, url=args.url, parts_dir=args.parts_dir, output_csv=args.output,
+                                  chunk_size=args.chunk_size, concurrency=args.concurrency,
+                                  id_column=args.id_column, overwrite=args.overwrite))
     except Exception as e:
         print(f"An error occurred: {e}")
+        print(f"Finished chunks are kept in {args.parts_dir}; rerun to resume.")
+        return 1
+
+    print(json.dumps(summary, indent=2))
+    print(f"Predictions saved to {summary['output']}")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Load Generator for the Two-Stage Fraud Detection API
+Drives /predict (or /predict_batch) either in process through the ASGI app
+or against a running server, at open-loop arrival rates or fixed
+concurrency levels, and reports a latency-vs-throughput curve. Each
+request's latency is split into the server's inference queue wait, its
+service (preprocess and score) time and the remainder (HTTP, validation,
+client scheduling).
+
+Open-loop latency is measured from each request's scheduled send time, so
+a saturated server shows up as growing latency rather than as a client
+that quietly slows down. In-process runs share the CPU with the load
+generator; use --url against a separately started server to keep them apart.
+Everything runs offline.
+
+Usage:
+    python loadtest.py --rates 50 100 200 400 --duration 10
+    python loadtest.py --url http://localhost:8000 --concurrency 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 60.0
+# An open-loop level counts as sustained while it completes this share of
+# the offered rate without rejections and within the p99 latency SLO
+SUSTAINED_FRACTION = 0.95
+
+
+def load_payloads(csv_paths: List[str], endpoint: str, batch_size: int) -> List[bytes]:
+    """
+    Encoded request bodies built from the rows of the feature CSVs
+
+    /predict bodies hold one record; /predict_batch bodies hold batch_size.
+    """
+    df = pd.concat([pd.read_csv(path) for path in csv_paths], ignore_index=True)
+    df = df.drop(columns=[c for c in ("TARGET", "UNIQUE_ID") if c in df.columns])
+    records = [{"data": record} for record in json.loads(df.to_json(orient="records"))]
+
+    if endpoint == "/predict":
+        return [json.dumps(record).encode() for record in records]
+    return [json.dumps([records[(i + j) % len(records)] for j in range(batch_size)]).encode()
+            for i in range(0, len(records), batch_size)]
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, body: bytes, scheduled: float) -> Dict[str, Any]:
+    """
+    Send one request and time it from its scheduled send time
+    """
+    started = time.perf_counter()
+    try:
+        response = await client.post(endpoint, content=body, headers={"Content-Type": "application/json"})
+        status = response.status_code
+        timings = response.json() if status == 200 else {}
+    except httpx.HTTPError:
+        status, timings = None, {}
+    finished = time.perf_counter()
+    return {
+        "status": status,
+        "scheduled": scheduled,
+        "finished": finished,
+        "latency_ms": (finished - scheduled) * 1000,
+        "client_delay_ms": (started - scheduled) * 1000,
+        "queue_ms": timings.get("queue_time_ms"),
+        "service_ms": timings.get("compute_time_ms")
+    }
+
+
+async def open_loop(client: httpx.AsyncClient, endpoint: str, payloads: List[bytes], rate: float,
+                    duration: float, poisson: bool, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    """
+    Send requests at scheduled arrival times whether or not earlier ones
+    have finished
+    """
+    n_requests = max(1, int(rate * duration))
+    gaps = rng.exponential(1.0 / rate, n_requests) if poisson else np.full(n_requests, 1.0 / rate)
+    offsets = np.cumsum(gaps) - gaps[0]
+
+    start = time.perf_counter()
+    tasks = []
+    for i, offset in enumerate(offsets):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, endpoint, payloads[i % len(payloads)], start + offset)))
+    return await asyncio.gather(*tasks)
+
+
+async def closed_loop(client: httpx.AsyncClient, endpoint: str, payloads: List[bytes], concurrency: int,
+                      duration: float) -> List[Dict[str, Any]]:
+    """
+    Keep `concurrency` requests in flight, each user sending its next
+    request as soon as the previous one returns
+    """
+    deadline = time.perf_counter() + duration
+    results = []
+
+    async def user(index: int):
+        i = index
+        while time.perf_counter() < deadline:
+            results.append(await send(client, endpoint, payloads[i % len(payloads)], time.perf_counter()))
+            i += concurrency
+
+    await asyncio.gather(*[user(k) for k in range(concurrency)])
+    return results
+
+
+def percentiles(values: List[Optional[float]]) -> Optional[Dict[str, float]]:
+    values = np.array([v for v in values if v is not None], dtype=float)
+    if values.size == 0:
+        return None
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+    return {"p50": round(p50, 2), "p90": round(p90, 2), "p99": round(p99, 2), "max": round(float(values.max()), 2)}
+
+
+def summarize(mode: str, level: float, results: List[Dict[str, Any]], started: float,
+              rows_per_request: int, slo_p99_ms: float) -> Dict[str, Any]:
+    """
+    Throughput and latency breakdown of one load level
+    """
+    ok = [r for r in results if r["status"] == 200]
+    elapsed = max(r["finished"] for r in results) - started if results else 0.0
+    achieved = len(ok) / elapsed if elapsed > 0 else 0.0
+
+    summary = {
+        "mode": mode,
+        "level": level,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected": sum(r["status"] == 503 for r in results),
+        "errors": sum(r["status"] not in (200, 503) for r in results),
+        "seconds": round(elapsed, 2),
+        "achieved_rps": round(achieved, 2),
+        "rows_per_second": round(achieved * rows_per_request, 1),
+        "latency_ms": percentiles([r["latency_ms"] for r in ok]),
+        "queue_ms": percentiles([r["queue_ms"] for r in ok]),
+        "service_ms": percentiles([r["service_ms"] for r in ok]),
+        "other_ms": percentiles([r["latency_ms"] - r["queue_ms"] - r["service_ms"] for r in ok
+                                 if r["queue_ms"] is not None and r["service_ms"] is not None]),
+        "client_delay_ms": percentiles([r["client_delay_ms"] for r in results])
+    }
+    if mode == "open":
+        # Poisson arrivals only approximate the nominal rate over a short run
+        span = max(r["scheduled"] for r in results) - min(r["scheduled"] for r in results)
+        offered = (len(results) - 1) / span if span > 0 else float(level)
+        summary["offered_rps"] = round(offered, 2)
+        summary["sustained"] = (achieved >= SUSTAINED_FRACTION * offered and not summary["rejected"]
+                                and not summary["errors"] and summary["latency_ms"] is not None
+                                and summary["latency_ms"]["p99"] <= slo_p99_ms)
+    return summary
+
+
+def print_level(summary: Dict[str, Any]):
+    def p(name, key):
+        values = summary[name]
+        return f"{values[key]:>9.1f}" if values else f"{'-':>9}"
+
+    print(f"{summary['mode']:<6}{summary['level']:>8g}{summary['achieved_rps']:>10.1f}{summary['ok']:>7}"
+          f"{summary['rejected'] + summary['errors']:>6}{p('latency_ms', 'p50')}{p('latency_ms', 'p99')}"
+          f"{p('queue_ms', 'p50')}{p('queue_ms', 'p99')}{p('service_ms', 'p50')}{p('service_ms', 'p99')}",
+          file=sys.stderr, flush=True)
+
+
+class InProcessApp:
+    """
+    The FastAPI app started in this process, reached through ASGITransport
+    """
+
+    def __init__(self, model_dir: str):
+        os.environ["PS1_MODEL_DIR"] = model_dir
+        import app
+        self.module = app
+
+    async def __aenter__(self) -> httpx.AsyncBaseTransport:
+        # ASGITransport does not run lifespan events, so start the app directly
+        await self.module.startup_event()
+        return httpx.ASGITransport(app=self.module.app)
+
+    async def __aexit__(self, *exc):
+        await self.module.shutdown_event()
+
+
+async def run(args) -> Dict[str, Any]:
+    payloads = load_payloads(args.data, args.endpoint, args.batch_size)
+    rows_per_request = 1 if args.endpoint == "/predict" else args.batch_size
+    rng = np.random.default_rng(args.seed)
+
+    app_context = InProcessApp(args.model_dir) if args.url is None else None
+    transport = await app_context.__aenter__() if app_context else None
+    base_url = args.url or "http://loadtest"
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+
+    levels = []
+    try:
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits,
+                                     timeout=REQUEST_TIMEOUT) as client:
+            # Warm caches, lazy imports and connections before measuring
+            for i in range(args.warmup):
+                await send(client, args.endpoint, payloads[i % len(payloads)], time.perf_counter())
+
+            print(f"{'mode':<6}{'level':>8}{'rps':>10}{'ok':>7}{'fail':>6}{'lat p50':>9}{'lat p99':>9}"
+                  f"{'que p50':>9}{'que p99':>9}{'svc p50':>9}{'svc p99':>9}", file=sys.stderr)
+            for rate in args.rates or []:
+                started = time.perf_counter()
+                results = await open_loop(client, args.endpoint, payloads, rate, args.duration,
+                                          not args.uniform, rng)
+                levels.append(summarize("open", rate, results, started, rows_per_request, args.slo_p99_ms))
+                print_level(levels[-1])
+            for concurrency in args.concurrency or []:
+                started = time.perf_counter()
+                results = await closed_loop(client, args.endpoint, payloads, concurrency, args.duration)
+                levels.append(summarize("closed", concurrency, results, started, rows_per_request,
+                                        args.slo_p99_ms))
+                print_level(levels[-1])
+    finally:
+        if app_context:
+            await app_context.__aexit__(None, None, None)
+
+    sustained = [level["level"] for level in levels if level.get("sustained")]
+    return {
+        "target": args.url or f"in-process ({args.model_dir})",
+        "endpoint": args.endpoint,
+        "rows_per_request": rows_per_request,
+        "duration": args.duration,
+        "arrivals": "uniform" if args.uniform else "poisson",
+        "slo_p99_ms": args.slo_p99_ms,
+        "max_sustained_rps": max(sustained) if sustained else None,
+        "levels": levels
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the fraud detection API")
+    parser.add_argument("--url", help="Server to test (default: the app in process)")
+    parser.add_argument("--model-dir", default="models", help="Models for the in-process app")
+    parser.add_argument("--endpoint", choices=["/predict", "/predict_batch"], default="/predict")
+    parser.add_argument("--batch-size", type=int, default=64, help="Records per /predict_batch request")
+    parser.add_argument("--data", nargs="+", default=["target_balanced_20.csv"],
+                        help="Feature CSVs to take request payloads from")
+    parser.add_argument("--rates", type=float, nargs="+", help="Open-loop arrival rates (requests/s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", help="Closed-loop concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    parser.add_argument("--uniform", action="store_true", help="Evenly spaced instead of Poisson arrivals")
+    parser.add_argument("--slo-p99-ms", type=float, default=250.0,
+                        help="p99 latency an open-loop level must stay within to count as sustained")
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the curve JSON here")
+    args = parser.parse_args()
+    if not args.rates and not args.concurrency:
+        parser.error("give --rates and/or --concurrency")
+    return args
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    print(f"Max sustained open-loop rate: {report['max_sustained_rps']} requests/s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
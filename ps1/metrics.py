@@ -0,0 +1,181 @@
+"""
+Prometheus Metrics for the Two-Stage Fraud Detection Service
+Lock-protected histograms and counters rendered in the Prometheus text
+exposition format, plus the pipeline's own metric set. Observing a value is
+a bisect and two additions, so the metrics can stay on in production.
+"""
+
+import bisect
+import logging
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Starlette appends "; charset=utf-8" to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds, from 50 µs (one small native-engine call) to 10 s (a huge batch)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096, 16384, 65536)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    Monotonically increasing count, optionally per label combination
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labelvalues: str):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed bucket upper bounds
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return sum(series[0]) if series is not None else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labelvalues, list(counts), total) for labelvalues, (counts, total)
+                        in sorted(self._series.items())]
+
+        for labelvalues, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named collection of metrics rendered together
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class PipelineMetrics(MetricsRegistry):
+    """
+    Metrics of the serving pipeline
+
+    The preprocessor and predictor report into this through their metrics
+    attribute; all durations are measured with time.perf_counter(). Values
+    are per process, so each pre-forked worker exposes its own.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.request_seconds = self.histogram(
+            "ps1_request_seconds", "Request handling time by route", ["route"])
+        self.parse_seconds = self.histogram(
+            "ps1_parse_seconds", "Request body decoding time by route", ["route"])
+        self.preprocess_seconds = self.histogram(
+            "ps1_preprocess_seconds",
+            "Preprocessing time by step (ensure_columns, encoding, imputation, scaling) and stage",
+            ["step", "stage"])
+        self.model_seconds = self.histogram(
+            "ps1_model_seconds", "Scoring time per model call (Stage1, each Stage 2 model, Meta)", ["model"])
+        self.batch_rows = self.histogram(
+            "ps1_batch_rows", "Rows per cascade call, and per Stage 2 block", ["stage"], BATCH_SIZE_BUCKETS)
+        self.rows_total = self.counter(
+            "ps1_rows_total", "Rows scored by Stage 1")
+        self.escalated_rows_total = self.counter(
+            "ps1_stage2_escalated_rows_total", "Rows escalated to Stage 2; divide by ps1_rows_total for the rate")
+
+    def observe_step(self, step: str, stage: str, seconds: float):
+        self.preprocess_seconds.observe(seconds, step, stage)
+
+    def observe_model(self, model: str, seconds: float):
+        self.model_seconds.observe(seconds, model)
+
+    def observe_cascade(self, n_rows: int, n_escalated: int):
+        self.batch_rows.observe(n_rows, "stage1")
+        self.rows_total.inc(n_rows)
+        if n_escalated:
+            self.batch_rows.observe(n_escalated, "stage2")
+            self.escalated_rows_total.inc(n_escalated)
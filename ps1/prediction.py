@@ -3,23 +3,144 @@
 Two-Stage Prediction Module
 Stage 1: XGBoost with threshold 0.3
 Stage 2: Ensemble of 7 models + LogisticRegression meta-model with threshold 0.05
+         (optionally a distilled single-model student in "fast" mode)
 """
 
 import pandas as pd
 import numpy as np
 import joblib
 import logging
-from typing import Dict, List, Any
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 import os
-from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.neural_network import MLPClassifier
-import xgboost as xgb
-from lightgbm import LGBMClassifier
-from catboost import CatBoostClassifier
+
+from bundle import MODELS_BUNDLE, PREPROCESSORS_BUNDLE, pack_model, read_bundle, read_manifest, unpack_model, write_bundle
+from startup import lazy_import, load_artifacts
+from tree_engine import FlatForest, export_forest, is_tree_model
 
 logger = logging.getLogger(__name__)
 
+# Library each model artifact needs; imported (and timed) only when the
+# artifact exists, before the artifacts are loaded concurrently
+ARTIFACT_LIBRARIES = {
+    "stage1_xgboost.json": "xgboost",
+    "stage2_xgboost.json": "xgboost",
+    "stage2_lightgbm.pkl": "lightgbm",
+    "stage2_catboost.cbm": "catboost",
+    "stage2_extratrees.pkl": "sklearn.ensemble",
+    "stage2_mlp.pkl": "sklearn.neural_network",
+    "stage2_logisticregression.pkl": "sklearn.linear_model",
+    "stage2_randomforest.pkl": "sklearn.ensemble",
+    "meta_model.pkl": "sklearn.linear_model",
+    "stage2_student.json": "xgboost",
+    "thresholds.pkl": None
+}
+
+# Predictor held by each Stage 2 process-pool worker
+_worker_predictor = None
+
+
+def _init_stage2_worker(model_dir: str, native_engine: bool, native_max_rows: int, bundle: bool = False):
+    """
+    Load the models once per Stage 2 process-pool worker
+    """
+    global _worker_predictor
+    _worker_predictor = TwoStagePredictor()
+    _worker_predictor.native_max_rows = native_max_rows
+    _worker_predictor.load_models(model_dir, bundle=bundle)
+    if native_engine:
+        _worker_predictor.compile_forests()
+
+
+def _worker_stage2_model_proba(name: str, X: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Score one Stage 2 base model inside a process-pool worker
+
+    Returns:
+        Tuple of (probabilities, seconds spent scoring)
+    """
+    start = time.perf_counter()
+    model = _worker_predictor.stage2_models[name]
+    probs = _worker_predictor._predict_model_proba(name, model, X)
+    return probs, time.perf_counter() - start
+
+
+# max_tasks_per_child needs Python 3.11; older pools reuse a worker process
+# for several fits
+ONE_FIT_PER_WORKER = sys.version_info >= (3, 11)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """
+    High-water mark of this process's resident set size in MB, or None
+    where the resource module is unavailable (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _set_fit_threads(model, n_threads: Optional[int]):
+    """
+    Set the threads a model may use while fitting
+
+    Returns:
+        The previous setting, to restore with another call
+    """
+    if type(model).__module__.startswith("catboost"):
+        previous = model.get_params().get("thread_count", -1)
+        model.set_params(thread_count=n_threads)
+    elif "n_jobs" in model.get_params():
+        previous = model.get_params()["n_jobs"]
+        model.set_params(n_jobs=n_threads)
+    else:
+        # MLP and LogisticRegression: BLAS threads are limited by the caller
+        previous = None
+    return previous
+
+
+def _fit_stage2_model(model, X: np.ndarray, y: np.ndarray, n_threads: Optional[int],
+                      own_process: bool = False) -> Tuple[Any, np.ndarray, Dict[str, Any]]:
+    """
+    Fit one Stage 2 base model, in a training worker process or in place
+
+    The model and its BLAS calls are held to n_threads; the model's own
+    thread setting is restored before it is returned, so the saved model
+    does not carry the training budget. Peak RSS is reported only when the
+    fit ran in a process of its own; otherwise the process-wide high-water
+    mark also covers earlier fits, and None is reported.
+
+    Returns:
+        Tuple of (fitted model, its training-set probabilities, fit stats)
+    """
+    threadpoolctl = lazy_import("threadpoolctl")
+    previous = _set_fit_threads(model, n_threads) if n_threads else None
+
+    with threadpoolctl.threadpool_limits(limits=n_threads):
+        start = time.perf_counter()
+        model.fit(X, y)
+        fit_seconds = time.perf_counter() - start
+        probs = model.predict_proba(X)[:, 1]
+
+    # A fitted CatBoost model rejects parameter changes; its thread_count is
+    # not kept in the saved .cbm file
+    if n_threads and not type(model).__module__.startswith("catboost"):
+        _set_fit_threads(model, previous)
+    peak_rss = _peak_rss_mb() if own_process else None
+    return model, probs, {
+        "fit_seconds": round(fit_seconds, 3),
+        "peak_rss_mb": None if peak_rss is None else round(peak_rss, 1),
+        "threads": n_threads
+    }
+
+
 class TwoStagePredictor:
     """Two-stage fraud detection predictor"""
 
@@ -39,10 +160,66 @@ class TwoStagePredictor:
             'MLP', 'LogisticRegression', 'RandomForest'
         ]
 
+        # Native tree engine (see compile_forests())
+        self.native_engine = False
+        self.native_forests = {}
+        self.native_max_rows = 64
+
+        # Stage 2 base model executor (see set_stage2_executor())
+        self.stage2_executor_mode = None
+        self.stage2_executor_workers = None
+        self._stage2_executor = None
+        self.model_dir = None
+
+        # Early-exit Stage 2 (see _predict_stage2_early_exit()): base models
+        # run from cheapest to most expensive until the decision is settled
+        self.stage2_early_exit = False
+        self.stage2_cost_order = [
+            'LogisticRegression', 'MLP', 'XGBoost', 'CatBoost',
+            'LightGBM', 'RandomForest', 'ExtraTrees'
+        ]
+
+        # Stage 2 base models from slowest to fastest to fit, the order
+        # parallel training submits them in (see train_stage2())
+        self.stage2_fit_order = [
+            'CatBoost', 'MLP', 'RandomForest', 'XGBoost',
+            'LightGBM', 'ExtraTrees', 'LogisticRegression'
+        ]
+
+        # Distilled Stage 2 student (see train_stage2_student()); the "fast"
+        # scoring mode replaces the ensemble and meta-model with it
+        self.stage2_student = None
+        self.stage2_scoring_mode = "full"
+
+        # Incremented on every load_models() so caches can detect reloads
+        self.load_generation = 0
+
+        # Threads each model may use per call (None lets libraries use all cores)
+        self.thread_count = None
+
+        # Floating point type of model inputs, Stage 2 meta-features and
+        # probability buffers (see set_inference_dtype())
+        self.inference_dtype = np.dtype(np.float64)
+
+        # Seconds spent loading each artifact in the last load_models()
+        self.load_timings = {}
+
+        # Memory-mapped bundle the models were loaded from, if any
+        self.bundle = None
+
+        # Per-model timings and batch sizes are reported here when set
+        # (see metrics.PipelineMetrics)
+        self.metrics = None
+
+        # Fit time, peak RSS and thread budget of each Stage 2 base model in
+        # the last train_stage2(); workers is 0 when fitted in this process
+        self.stage2_fit_report = {}
+
     def create_stage1_model(self, scale_pos_weight: float = None):
         """
         Create Stage 1 XGBoost model
         """
+        xgb = lazy_import("xgboost")
         self.stage1_model = xgb.XGBClassifier(
             use_label_encoder=False,
             eval_metric='logloss',
@@ -61,6 +238,14 @@ class TwoStagePredictor:
         """
         Create Stage 2 ensemble models
         """
+        xgb = lazy_import("xgboost")
+        LGBMClassifier = lazy_import("lightgbm").LGBMClassifier
+        CatBoostClassifier = lazy_import("catboost").CatBoostClassifier
+        ensemble = lazy_import("sklearn.ensemble")
+        ExtraTreesClassifier, RandomForestClassifier = ensemble.ExtraTreesClassifier, ensemble.RandomForestClassifier
+        LogisticRegression = lazy_import("sklearn.linear_model").LogisticRegression
+        MLPClassifier = lazy_import("sklearn.neural_network").MLPClassifier
+
         self.stage2_models = {
             'XGBoost': xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42),
             'LightGBM': LGBMClassifier(random_state=42, verbose=-1),
@@ -93,9 +278,19 @@ class TwoStagePredictor:
         self.stage1_model.fit(X_train, y_train)
         logger.info("Stage 1 model trained successfully")
 
-    def train_stage2(self, X_train: np.ndarray, y_train: np.ndarray):
+    def train_stage2(self, X_train: np.ndarray, y_train: np.ndarray, n_jobs: Optional[int] = None,
+                     thread_budgets: Optional[Dict[str, int]] = None):
         """
         Train Stage 2 ensemble models and meta-model
+
+        Args:
+            X_train: Stage 2 features
+            y_train: Stage 2 labels
+            n_jobs: Worker processes fitting the base models concurrently
+                (-1 for one per core). None or 1 fits them one after
+                another in this process.
+            thread_budgets: Threads per base model in parallel mode; models
+                not listed share the cores evenly across the workers
         """
         logger.info("Training Stage 2 models...")
 
@@ -103,14 +298,29 @@ class TwoStagePredictor:
         if not self.stage2_models:
             self.create_stage2_models()
 
+        start = time.perf_counter()
+        if n_jobs is not None and n_jobs != 1:
+            workers = min((os.cpu_count() or 1) if n_jobs < 0 else n_jobs, len(self.stage2_models))
+            results = self._fit_stage2_parallel(X_train, y_train, workers, thread_budgets or {})
+        else:
+            workers = 0
+            results = {}
+            for name, model in self.stage2_models.items():
+                logger.info(f"Training {name}...")
+                results[name] = _fit_stage2_model(model, X_train, y_train, None)
+
         # Train base models and collect predictions
         base_predictions = []
+        fit_stats = {}
 
-        for name, model in self.stage2_models.items():
-            logger.info(f"Training {name}...")
-            model.fit(X_train, y_train)
-            probs = model.predict_proba(X_train)[:, 1]
+        for name in self.stage2_models:
+            model, probs, stats = results[name]
+            self.stage2_models[name] = model
             base_predictions.append(probs)
+            fit_stats[name] = stats
+            peak_rss = f", peak RSS {stats['peak_rss_mb']} MB" if stats["peak_rss_mb"] is not None else ""
+            logger.info(f"{name} fitted in {stats['fit_seconds']:.2f}s "
+                        f"(threads: {stats['threads'] or 'default'}{peak_rss})")
 
         # Prepare meta-features (predictions from base models)
         meta_features = np.column_stack(base_predictions)
@@ -119,7 +329,174 @@ class TwoStagePredictor:
         logger.info("Training meta-model...")
         self.meta_model.fit(meta_features, y_train)
 
-        logger.info("Stage 2 models trained successfully")
+        self.stage2_fit_report = {
+            "workers": workers,
+            "wall_seconds": round(time.perf_counter() - start, 3),
+            "sum_fit_seconds": round(sum(stats["fit_seconds"] for stats in fit_stats.values()), 3),
+            "models": fit_stats
+        }
+        logger.info(f"Stage 2 models trained successfully in {self.stage2_fit_report['wall_seconds']:.2f}s")
+
+    def _fit_stage2_parallel(self, X_train: np.ndarray, y_train: np.ndarray, workers: int,
+                             thread_budgets: Dict[str, int]) -> Dict[str, Tuple[Any, np.ndarray, Dict[str, Any]]]:
+        """
+        Fit the base models across a pool of worker processes
+
+        Each worker fits one model and exits, so its peak RSS is that
+        model's, and the memory of a large fit is returned to the system.
+        Before Python 3.11 workers are reused and no peak RSS is reported.
+        Fits are submitted from the slowest to the fastest so the long ones
+        do not start last.
+        """
+        default_threads = max(1, (os.cpu_count() or 1) // workers)
+
+        order = [name for name in self.stage2_fit_order if name in self.stage2_models]
+        order += [name for name in self.stage2_models if name not in order]
+
+        logger.info(f"Fitting {len(order)} Stage 2 models in {workers} processes, "
+                    f"{default_threads} threads each unless budgeted")
+        # Spawned workers avoid inheriting OpenMP state from this process
+        pool_options = {"max_tasks_per_child": 1} if ONE_FIT_PER_WORKER else {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 **pool_options) as executor:
+            futures = {
+                name: executor.submit(_fit_stage2_model, self.stage2_models[name], X_train, y_train,
+                                      thread_budgets.get(name, default_threads), ONE_FIT_PER_WORKER)
+                for name in order
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    def create_stage2_student(self):
+        """
+        Create the compact Stage 2 student model
+        """
+        xgb = lazy_import("xgboost")
+        self.stage2_student = xgb.XGBRegressor(
+            objective='reg:logistic',
+            max_depth=4,
+            learning_rate=0.1,
+            n_estimators=200,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            random_state=42
+        )
+        return self.stage2_student
+
+    def stage2_out_of_fold_proba(self, X: np.ndarray, y: np.ndarray, n_splits: int = 5,
+                                 n_jobs: Optional[int] = None) -> np.ndarray:
+        """
+        Ensemble probabilities for rows the ensemble was not trained on
+
+        Unfitted copies of the base models and meta-model are trained on
+        all but one stratified fold, exactly as train_stage2() trains them,
+        and score the held-out fold. Unlike the fitted ensemble's scores on
+        its own training rows, these match what the ensemble outputs in
+        serving, so they are the student's distillation targets.
+
+        Args:
+            n_jobs: Passed to train_stage2() for each fold
+        """
+        if not self.stage2_models or self.meta_model is None:
+            raise ValueError("Stage 2 models not created")
+        model_selection = lazy_import("sklearn.model_selection")
+        clone = lazy_import("sklearn.base").clone
+
+        y = np.asarray(y)
+        n_splits = min(n_splits, int(np.bincount(y).min()))
+        if n_splits < 2:
+            raise ValueError("Out-of-fold scoring needs at least two records of each class")
+
+        probs = np.empty(len(y), dtype=np.float64)
+        folds = model_selection.StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+        for k, (train_index, test_index) in enumerate(folds.split(X, y)):
+            logger.info(f"Out-of-fold Stage 2 scoring: fold {k + 1}/{n_splits}")
+            fold = TwoStagePredictor()
+            fold.stage2_models = {name: clone(model) for name, model in self.stage2_models.items()}
+            fold.meta_model = clone(self.meta_model)
+            fold.train_stage2(X[train_index], y[train_index], n_jobs=n_jobs)
+            probs[test_index] = fold._predict_stage2_proba(X[test_index])
+        return probs
+
+    def train_stage2_student(self, X_train: np.ndarray, soft_targets: Optional[np.ndarray] = None):
+        """
+        Distill the Stage 2 ensemble into a single gradient-boosted model
+
+        The student regresses on the meta-model's probabilities with a
+        logistic objective, so it learns the ensemble's soft outputs rather
+        than the hard labels.
+
+        Args:
+            X_train: Stage 2 features
+            soft_targets: Ensemble probabilities for X_train, preferably
+                out of fold (see stage2_out_of_fold_proba()); scored with
+                the loaded ensemble when not given, which overstates its
+                confidence on rows it was trained on
+        """
+        logger.info("Training Stage 2 student...")
+
+        if soft_targets is None:
+            soft_targets = self._predict_stage2_proba(X_train)
+
+        if self.stage2_student is None:
+            self.create_stage2_student()
+
+        self.stage2_student.fit(X_train, soft_targets)
+        logger.info("Stage 2 student trained successfully")
+
+    def evaluate_stage2_student(self, X: np.ndarray) -> Dict[str, Any]:
+        """
+        Compare the student against the full Stage 2 ensemble on X
+
+        Returns:
+            Agreement report: decision agreement, precision and recall of
+            the student's decisions against the ensemble's, probability
+            error, and per-row latency of both scoring paths
+        """
+        if self.stage2_student is None:
+            raise ValueError("Stage 2 student not loaded")
+
+        start = time.perf_counter()
+        ensemble_probs = self._predict_stage2_proba(X)
+        ensemble_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        student_probs = self._predict_model_proba("Stage2Student", self.stage2_student, X)
+        student_time = time.perf_counter() - start
+
+        ensemble_pred = ensemble_probs > self.stage2_threshold
+        student_pred = student_probs > self.stage2_threshold
+        both_positive = int(np.sum(ensemble_pred & student_pred))
+        abs_error = np.abs(student_probs - ensemble_probs)
+        n_rows = max(len(X), 1)
+
+        return {
+            "rows": int(len(X)),
+            "stage2_threshold": self.stage2_threshold,
+            "decision_agreement": float(np.mean(ensemble_pred == student_pred)) if len(X) else 1.0,
+            "ensemble_positive_rate": float(np.mean(ensemble_pred)) if len(X) else 0.0,
+            "student_positive_rate": float(np.mean(student_pred)) if len(X) else 0.0,
+            "precision_vs_ensemble": both_positive / max(int(student_pred.sum()), 1),
+            "recall_vs_ensemble": both_positive / max(int(ensemble_pred.sum()), 1),
+            "probability_mae": float(abs_error.mean()) if len(X) else 0.0,
+            "probability_max_abs_error": float(abs_error.max()) if len(X) else 0.0,
+            "ensemble_ms_per_row": ensemble_time * 1000 / n_rows,
+            "student_ms_per_row": student_time * 1000 / n_rows,
+            "speedup": ensemble_time / student_time if student_time > 0 else None
+        }
+
+    def set_stage2_scoring_mode(self, mode: str):
+        """
+        Select how escalated records are scored
+
+        Args:
+            mode: "full" (seven base models and the meta-model) or "fast"
+                (the distilled student)
+        """
+        if mode not in ("full", "fast"):
+            raise ValueError(f"Unknown Stage 2 scoring mode: {mode}")
+        if mode == "fast" and self.stage2_student is None:
+            raise ValueError("Stage 2 student not loaded")
+        self.stage2_scoring_mode = mode
 
     def predict(self, X: np.ndarray) -> Dict[str, Any]:
         """
@@ -131,72 +508,377 @@ class TwoStagePredictor:
         Returns:
             Dictionary containing prediction results
         """
+        return self.predict_batch(X[:1])[0]
+
+    def predict_arrays(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Run the two-stage cascade over a whole matrix
+
+        Stage 1 scores every row once; the rows above stage1_threshold are
+        gathered into one contiguous block and each Stage 2 model and the
+        meta-model score that block once.
+
+        Returns:
+            Dictionary of per-row arrays: stage1_probability,
+            stage1_prediction, stage2_probability (NaN where Stage 2
+            was not used or exited early), stage2_models_skipped and
+            prediction
+        """
         if self.stage1_model is None:
             raise ValueError("Stage 1 model not loaded")
 
+        X = np.asarray(X, dtype=self.inference_dtype)
+        n_rows = X.shape[0]
+        stage2_probs = np.full(n_rows, np.nan, dtype=self.inference_dtype)
+        stage2_skipped = np.zeros(n_rows, dtype=int)
+
+        if n_rows == 0:
+            empty = np.zeros(0, dtype=int)
+            return {
+                "stage1_probability": np.zeros(0),
+                "stage1_prediction": empty,
+                "stage2_probability": stage2_probs,
+                "stage2_models_skipped": stage2_skipped,
+                "prediction": empty
+            }
+
         # Stage 1 prediction
-        stage1_probs = self.stage1_model.predict_proba(X)[:, 1]
+        stage1_probs = self._predict_model_proba("Stage1", self.stage1_model, X)
         stage1_pred = (stage1_probs > self.stage1_threshold).astype(int)
+        predictions = stage1_pred.copy()
 
-        result = {
-            "stage1_probability": float(stage1_probs[0]),
-            "stage1_prediction": int(stage1_pred[0])
+        # Rows predicted as fraud by Stage 1 proceed to Stage 2
+        escalated = np.flatnonzero(stage1_pred)
+        if self.metrics is not None:
+            self.metrics.observe_cascade(n_rows, escalated.size)
+        if escalated.size > 0:
+            X_stage2 = np.ascontiguousarray(X[escalated])
+            if self.stage2_scoring_mode == "fast":
+                stage2_probs[escalated] = self._predict_model_proba("Stage2Student", self.stage2_student, X_stage2)
+                predictions[escalated] = (stage2_probs[escalated] > self.stage2_threshold).astype(int)
+            elif self.stage2_early_exit:
+                probs, preds, skipped = self._predict_stage2_early_exit(X_stage2)
+                stage2_probs[escalated] = probs
+                predictions[escalated] = preds
+                stage2_skipped[escalated] = skipped
+            else:
+                stage2_probs[escalated] = self._predict_stage2_proba(X_stage2)
+                predictions[escalated] = (stage2_probs[escalated] > self.stage2_threshold).astype(int)
+
+        return {
+            "stage1_probability": stage1_probs,
+            "stage1_prediction": stage1_pred,
+            "stage2_probability": stage2_probs,
+            "stage2_models_skipped": stage2_skipped,
+            "prediction": predictions
         }
 
-        # If Stage 1 predicts 0 (not fraud), return immediately
-        if stage1_pred[0] == 0:
-            result.update({
-                "prediction": 0,
-                "stage_used": "stage1",
-                "stage2_probability": None
-            })
-            return result
+    def predict_batch(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Make batch predictions
+        """
+        arrays = self.predict_arrays(X)
+
+        results = []
+        for stage1_prob, stage1_pred, stage2_prob, skipped, pred in zip(
+            arrays["stage1_probability"].tolist(),
+            arrays["stage1_prediction"].tolist(),
+            arrays["stage2_probability"].tolist(),
+            arrays["stage2_models_skipped"].tolist(),
+            arrays["prediction"].tolist()
+        ):
+            escalated = stage1_pred == 1
+            result = {
+                "stage1_probability": stage1_prob,
+                "stage1_prediction": stage1_pred,
+                "prediction": pred,
+                "stage_used": "stage2" if escalated else "stage1",
+                "stage2_probability": stage2_prob if escalated and not np.isnan(stage2_prob) else None
+            }
+            if self.stage2_early_exit and escalated:
+                result["stage2_models_skipped"] = skipped
+            results.append(result)
+        return results
 
-        # If Stage 1 predicts 1 (fraud), proceed to Stage 2
+    def _predict_stage2_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Score a block of escalated rows with the Stage 2 ensemble
+        """
         if not self.stage2_models or self.meta_model is None:
             raise ValueError("Stage 2 models not loaded")
 
-        # Get predictions from all Stage 2 base models
-        base_predictions = []
-        loaded_models = []
-        for name in self.stage2_model_names:
-            if name in self.stage2_models:
-                model = self.stage2_models[name]
-                probs = model.predict_proba(X)[:, 1]
-                base_predictions.append(probs[0])
-                loaded_models.append(name)
+        loaded_models = [name for name in self.stage2_model_names if name in self.stage2_models]
+
+        # Get predictions from all Stage 2 base models, concurrently when an
+        # executor is configured
+        if self.stage2_executor_mode == "process":
+            futures = [self._stage2_executor.submit(_worker_stage2_model_proba, name, X)
+                       for name in loaded_models]
+            base_predictions = []
+            for name, future in zip(loaded_models, futures):
+                probs, seconds = future.result()
+                if self.metrics is not None:
+                    self.metrics.observe_model(name, seconds)
+                base_predictions.append(probs)
+        elif self.stage2_executor_mode == "thread":
+            futures = [self._stage2_executor.submit(self._predict_model_proba, name, self.stage2_models[name], X)
+                       for name in loaded_models]
+            base_predictions = [future.result() for future in futures]
+        else:
+            base_predictions = [self._predict_model_proba(name, self.stage2_models[name], X)
+                                for name in loaded_models]
 
         logger.info(f"Stage 2 models used: {loaded_models} (total: {len(loaded_models)})")
-        
+
         if len(base_predictions) != 7:
             logger.warning(f"Expected 7 models but only {len(base_predictions)} models loaded: {loaded_models}")
 
         # Meta-model prediction
-        meta_features = np.array(base_predictions).reshape(1, -1)
-        stage2_probs = self.meta_model.predict_proba(meta_features)[:, 1]
-        stage2_pred = (stage2_probs > self.stage2_threshold).astype(int)
+        meta_features = np.empty((X.shape[0], len(base_predictions)), dtype=self.inference_dtype)
+        for i, probs in enumerate(base_predictions):
+            meta_features[:, i] = probs
+        return self._predict_meta_proba(meta_features)
+
+    def _predict_meta_proba(self, meta_features: np.ndarray) -> np.ndarray:
+        """
+        Positive-class probabilities from the meta-model
+        """
+        start = time.perf_counter()
+        probs = self.meta_model.predict_proba(meta_features)[:, 1]
+        if self.metrics is not None:
+            self.metrics.observe_model("Meta", time.perf_counter() - start)
+        return probs
 
-        result.update({
-            "prediction": int(stage2_pred[0]),
-            "stage_used": "stage2",
-            "stage2_probability": float(stage2_probs[0])
-        })
+    def _predict_stage2_early_exit(self, X: np.ndarray):
+        """
+        Score escalated rows, stopping once each row's decision is settled
 
-        return result
+        The meta-model is a logistic regression over base-model
+        probabilities in [0, 1], so after some base models have run the
+        remaining ones can move the meta logit by at most the sum of their
+        positive coefficients and at least the sum of their negative ones.
+        Base models run in stage2_cost_order and a row leaves the active set
+        as soon as both bounds fall on the same side of the threshold.
+        Decisions are identical to the full ensemble; the exact probability
+        is only available for rows that ran every base model.
 
-    def predict_batch(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        Returns:
+            Tuple of (probabilities, NaN for rows that exited early;
+            predictions; number of base models skipped per row)
         """
-        Make batch predictions
+        if not self.stage2_models or self.meta_model is None:
+            raise ValueError("Stage 2 models not loaded")
+
+        loaded_models = [name for name in self.stage2_model_names if name in self.stage2_models]
+        coef = np.asarray(getattr(self.meta_model, "coef_", np.empty((0, 0))), dtype=np.float64)
+        if coef.shape != (1, len(loaded_models)):
+            # Bounds need one linear coefficient per base model
+            probs = self._predict_stage2_proba(X)
+            return probs, (probs > self.stage2_threshold).astype(int), np.zeros(len(probs), dtype=int)
+        coef = coef[0]
+
+        # Margin keeps bound decisions clear of rounding in the sigmoid
+        threshold_logit = np.log(self.stage2_threshold / (1.0 - self.stage2_threshold))
+        margin = 1e-9 * max(1.0, abs(threshold_logit))
+
+        order = sorted(range(len(loaded_models)),
+                       key=lambda i: (self.stage2_cost_order.index(loaded_models[i])
+                                      if loaded_models[i] in self.stage2_cost_order
+                                      else len(self.stage2_cost_order)))
+
+        n_rows = X.shape[0]
+        meta_features = np.full((n_rows, len(loaded_models)), np.nan, dtype=self.inference_dtype)
+        logit = np.full(n_rows, float(self.meta_model.intercept_[0]))
+        remaining_min = np.minimum(coef, 0.0).sum()
+        remaining_max = np.maximum(coef, 0.0).sum()
+
+        predictions = np.zeros(n_rows, dtype=int)
+        evaluated = np.zeros(n_rows, dtype=int)
+        active = np.arange(n_rows)
+
+        for i in order:
+            if active.size == 0:
+                break
+
+            name = loaded_models[i]
+            probs = self._predict_model_proba(name, self.stage2_models[name], X[active])
+            meta_features[active, i] = probs
+            logit[active] += coef[i] * probs
+            evaluated[active] += 1
+            remaining_min -= min(coef[i], 0.0)
+            remaining_max -= max(coef[i], 0.0)
+
+            settled_one = logit[active] + remaining_min > threshold_logit + margin
+            settled_zero = logit[active] + remaining_max < threshold_logit - margin
+            predictions[active[settled_one]] = 1
+            active = active[~(settled_one | settled_zero)]
+
+        # Rows that ran every base model get the exact meta-model output
+        stage2_probs = np.full(n_rows, np.nan, dtype=self.inference_dtype)
+        complete = np.flatnonzero(evaluated == len(loaded_models))
+        if complete.size > 0:
+            stage2_probs[complete] = self._predict_meta_proba(meta_features[complete])
+            predictions[complete] = (stage2_probs[complete] > self.stage2_threshold).astype(int)
+
+        return stage2_probs, predictions, len(loaded_models) - evaluated
+
+    def _predict_model_proba(self, name: str, model, X: np.ndarray) -> np.ndarray:
         """
-        results = []
-        for i in range(X.shape[0]):
-            result = self.predict(X[i:i+1])
-            results.append(result)
-        return results
+        Positive-class probabilities from one model
+
+        Tree models exported by compile_forests() are scored by the native
+        engine for batches of up to native_max_rows rows, where library
+        per-call overhead dominates, and always once the library model has
+        been released.
+        """
+        start = time.perf_counter()
+        forest = self.native_forests.get(name)
+        if forest is not None and (forest is model or X.shape[0] <= self.native_max_rows):
+            probs = forest.predict_proba(X)[:, 1]
+        elif self.thread_count and type(model).__module__.startswith("catboost"):
+            # CatBoost takes its prediction thread count per call
+            probs = model.predict_proba(X, thread_count=self.thread_count)[:, 1]
+        elif not hasattr(model, "predict_proba"):
+            # Logistic regressors (the Stage 2 student) predict probabilities
+            probs = model.predict(X)
+        else:
+            probs = model.predict_proba(X)[:, 1]
+
+        if self.metrics is not None:
+            self.metrics.observe_model(name, time.perf_counter() - start)
+        return probs
+
+    def set_inference_dtype(self, dtype):
+        """
+        Select float32 or float64 inference
+
+        float32 halves the memory traffic of large batches. XGBoost and the
+        sklearn forests already compare features in float32; the other
+        models see inputs rounded to float32, so probabilities drift by
+        about 1e-6 and decisions can only change for rows that close to a
+        threshold.
+        """
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported inference dtype: {dtype}")
+        self.inference_dtype = dtype
+
+    def set_stage2_executor(self, mode: Optional[str], max_workers: Optional[int] = None):
+        """
+        Configure concurrent execution of the Stage 2 base models
+
+        Args:
+            mode: None to run the base models one after another, "thread" for
+                a persistent thread pool (the model libraries release the GIL
+                in native code), or "process" for a persistent pool of worker
+                processes that each load the models from model_dir once
+            max_workers: Pool size, defaults to the number of Stage 2 models
+        """
+        if mode not in (None, "thread", "process"):
+            raise ValueError("Stage 2 executor mode must be None, 'thread' or 'process'")
+
+        self.shutdown_stage2_executor()
+        workers = max_workers or len(self.stage2_model_names)
+
+        if mode == "thread":
+            self._stage2_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage2")
+        elif mode == "process":
+            if self.model_dir is None:
+                raise ValueError("Process executor requires models loaded with load_models()")
+            # Spawned workers avoid inheriting OpenMP state from this process
+            self._stage2_executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_stage2_worker,
+                initargs=(self.model_dir, self.native_engine, self.native_max_rows, self.bundle is not None)
+            )
+
+        self.stage2_executor_mode = mode
+        self.stage2_executor_workers = workers if mode else None
+        logger.info(f"Stage 2 executor mode: {mode or 'sequential'}")
+
+    def shutdown_stage2_executor(self):
+        """
+        Stop the Stage 2 executor, if any, and fall back to sequential mode
+        """
+        if self._stage2_executor is not None:
+            self._stage2_executor.shutdown(wait=True)
+        self._stage2_executor = None
+        self.stage2_executor_mode = None
+        self.stage2_executor_workers = None
+
+    def set_thread_count(self, n_threads: int):
+        """
+        Limit the threads each loaded model uses for prediction
+
+        Used by forked or co-located workers so several processes do not
+        each spin up a full set of native threads. BLAS threads used by the
+        MLP and LogisticRegression models are limited separately with
+        threadpoolctl or the OMP/OPENBLAS/MKL_NUM_THREADS variables.
+        """
+        self.thread_count = n_threads
+
+        models = [self.stage1_model] + list(self.stage2_models.values())
+        for model in models:
+            if model is None:
+                continue
+            module = type(model).__module__
+            if module.startswith(("xgboost", "lightgbm")):
+                model.set_params(n_jobs=n_threads)
+            elif hasattr(model, "n_jobs"):
+                # sklearn forests
+                model.n_jobs = n_threads
+
+        logger.info(f"Model thread count set to {n_threads}")
+
+    def compile_forests(self, release_library_models: bool = False):
+        """
+        Export the tree ensembles into the native flat-array engine
+
+        Args:
+            release_library_models: Replace the library model objects with
+                their exported forests to free the memory they hold. The
+                native engine then scores every batch, and the released
+                models can no longer be saved with save_models().
+        """
+        models = {"Stage1": self.stage1_model}
+        models.update(self.stage2_models)
+        models["Stage2Student"] = self.stage2_student
+
+        self.native_forests = {}
+        for name, model in models.items():
+            if isinstance(model, FlatForest):
+                # Already flat (released or loaded from a bundle)
+                self.native_forests[name] = model
+                continue
+            if model is None or not is_tree_model(model):
+                continue
+            try:
+                forest = export_forest(model)
+            except ValueError as e:
+                logger.warning(f"Keeping library inference for {name}: {e}")
+                continue
+
+            self.native_forests[name] = forest
+            if release_library_models:
+                if name == "Stage1":
+                    self.stage1_model = forest
+                elif name == "Stage2Student":
+                    self.stage2_student = forest
+                else:
+                    self.stage2_models[name] = forest
+
+        self.native_engine = True
+        logger.info(f"Native tree engine compiled for {list(self.native_forests)}")
 
-    def save_models(self, model_dir: str = "models"):
+    def save_models(self, model_dir: str = "models", bundle: bool = False):
         """
         Save all models
+
+        Args:
+            model_dir: Output directory
+            bundle: Also write models.bundle, a memory-mappable copy with the
+                tree models flattened (see save_bundle())
         """
         os.makedirs(model_dir, exist_ok=True)
 
@@ -222,6 +904,10 @@ class TwoStagePredictor:
         if self.meta_model:
             joblib.dump(self.meta_model, os.path.join(model_dir, "meta_model.pkl"))
 
+        # Save distilled Stage 2 student
+        if self.stage2_student is not None:
+            self.stage2_student.save_model(os.path.join(model_dir, "stage2_student.json"))
+
         # Save thresholds
         thresholds = {
             'stage1_threshold': self.stage1_threshold,
@@ -229,58 +915,157 @@ class TwoStagePredictor:
         }
         joblib.dump(thresholds, os.path.join(model_dir, "thresholds.pkl"))
 
+        if bundle:
+            self.save_bundle(model_dir)
+
         logger.info(f"Models saved to {model_dir}")
 
-    def load_models(self, model_dir: str = "models"):
+    def save_bundle(self, model_dir: str = "models") -> str:
+        """
+        Write every model and the thresholds to one memory-mappable bundle
+
+        Tree models are stored as flat forests, linear models and the MLP
+        as weight arrays. If preprocessors.bundle exists in model_dir, its
+        checksum is recorded so the models cannot be loaded next to a
+        different set of preprocessors.
+
+        Returns:
+            Checksum of the bundle
+        """
+        if self.stage1_model is None:
+            raise ValueError("Stage 1 model not loaded")
+
+        arrays = {}
+        models = {"Stage1": pack_model("Stage1", self.stage1_model, arrays)}
+        for name in self.stage2_model_names:
+            if name in self.stage2_models:
+                models[name] = pack_model(name, self.stage2_models[name], arrays)
+        if self.meta_model is not None:
+            models["Meta"] = pack_model("Meta", self.meta_model, arrays)
+        if self.stage2_student is not None:
+            models["Stage2Student"] = pack_model("Stage2Student", self.stage2_student, arrays)
+
+        meta = {
+            "models": models,
+            "stage1_threshold": self.stage1_threshold,
+            "stage2_threshold": self.stage2_threshold
+        }
+
+        preprocessors_path = os.path.join(model_dir, PREPROCESSORS_BUNDLE)
+        paired_with = read_manifest(preprocessors_path)["data_checksum"] if os.path.exists(preprocessors_path) else None
+
+        return write_bundle(os.path.join(model_dir, MODELS_BUNDLE), "models", arrays, meta, paired_with)
+
+    def _load_bundle(self, model_dir: str):
+        """
+        Map models.bundle and rebuild the models on top of its arrays
+
+        Tree models become native flat forests; every array stays in the
+        shared read-only mapping.
+        """
+        start = time.perf_counter()
+        self.bundle = read_bundle(os.path.join(model_dir, MODELS_BUNDLE), kind="models")
+        models = {name: unpack_model(name, meta, self.bundle.arrays)
+                  for name, meta in self.bundle.meta["models"].items()}
+        self.load_timings = {MODELS_BUNDLE: time.perf_counter() - start}
+
+        self.stage1_model = models["Stage1"]
+        self.stage2_models = {name: models[name] for name in self.stage2_model_names if name in models}
+        self.meta_model = models.get("Meta")
+        self.stage2_student = models.get("Stage2Student")
+        self.stage1_threshold = self.bundle.meta["stage1_threshold"]
+        self.stage2_threshold = self.bundle.meta["stage2_threshold"]
+
+        self.native_forests = {name: model for name, model in models.items()
+                               if isinstance(model, FlatForest)}
+
+    def _load_model_files(self, model_dir: str, max_workers: Optional[int] = None):
+        """
+        Load the models from their per-library artifact files
+        """
+        artifacts = {name: os.path.join(model_dir, name) for name in ARTIFACT_LIBRARIES
+                     if os.path.exists(os.path.join(model_dir, name))}
+
+        # Imports run here, one at a time: they hold the GIL and
+        # concurrent imports of interdependent packages are fragile
+        for name in artifacts:
+            if ARTIFACT_LIBRARIES[name]:
+                lazy_import(ARTIFACT_LIBRARIES[name])
+
+        loaders = {name: self._artifact_loader(name, path) for name, path in artifacts.items()}
+        loaded, self.load_timings = load_artifacts(loaders, max_workers)
+
+        # Load Stage 1 model
+        if "stage1_xgboost.json" in loaded:
+            self.stage1_model = loaded["stage1_xgboost.json"]
+
+        # Load Stage 2 models
+        self.stage2_models = {}
+        stage2_files = {
+            'XGBoost': "stage2_xgboost.json",
+            'LightGBM': "stage2_lightgbm.pkl",
+            'CatBoost': "stage2_catboost.cbm",
+            'ExtraTrees': "stage2_extratrees.pkl",
+            'MLP': "stage2_mlp.pkl",
+            'LogisticRegression': "stage2_logisticregression.pkl",
+            'RandomForest': "stage2_randomforest.pkl"
+        }
+        for name, filename in stage2_files.items():
+            if filename in loaded:
+                self.stage2_models[name] = loaded[filename]
+
+        # Load meta-model
+        if "meta_model.pkl" in loaded:
+            self.meta_model = loaded["meta_model.pkl"]
+
+        # Load distilled Stage 2 student (optional)
+        self.stage2_student = loaded.get("stage2_student.json")
+
+        # Load thresholds
+        if "thresholds.pkl" in loaded:
+            thresholds = loaded["thresholds.pkl"]
+            self.stage1_threshold = thresholds['stage1_threshold']
+            self.stage2_threshold = thresholds['stage2_threshold']
+
+    def load_models(self, model_dir: str = "models", max_workers: Optional[int] = None,
+                    bundle: bool = False):
         """
         Load all models
+
+        Only the libraries of the artifacts present are imported, and the
+        artifacts are then read concurrently (see startup.load_artifacts()).
+        Per-artifact load times are kept in load_timings.
+
+        Args:
+            model_dir: Directory holding the saved models
+            max_workers: Threads used to read the artifacts
+            bundle: Map models.bundle instead of reading the library files
         """
         try:
-            # Load Stage 1 model
-            stage1_path = os.path.join(model_dir, "stage1_xgboost.json")
-            if os.path.exists(stage1_path):
-                self.stage1_model = xgb.XGBClassifier()
-                self.stage1_model.load_model(stage1_path)
-
-            # Load Stage 2 models
-            self.stage2_models = {}
-
-            # XGBoost
-            xgb_path = os.path.join(model_dir, "stage2_xgboost.json")
-            if os.path.exists(xgb_path):
-                xgb_model = xgb.XGBClassifier()
-                xgb_model.load_model(xgb_path)
-                self.stage2_models['XGBoost'] = xgb_model
-
-            # LightGBM
-            lgb_pkl_path = os.path.join(model_dir, "stage2_lightgbm.pkl")
-            if os.path.exists(lgb_pkl_path):
-                self.stage2_models['LightGBM'] = joblib.load(lgb_pkl_path)
-
-            # CatBoost
-            cb_path = os.path.join(model_dir, "stage2_catboost.cbm")
-            if os.path.exists(cb_path):
-                cb_model = CatBoostClassifier()
-                cb_model.load_model(cb_path)
-                self.stage2_models['CatBoost'] = cb_model
-
-            # Other sklearn models
-            for name in ['ExtraTrees', 'MLP', 'LogisticRegression', 'RandomForest']:
-                model_path = os.path.join(model_dir, f"stage2_{name.lower()}.pkl")
-                if os.path.exists(model_path):
-                    self.stage2_models[name] = joblib.load(model_path)
-
-            # Load meta-model
-            meta_path = os.path.join(model_dir, "meta_model.pkl")
-            if os.path.exists(meta_path):
-                self.meta_model = joblib.load(meta_path)
-
-            # Load thresholds
-            thresholds_path = os.path.join(model_dir, "thresholds.pkl")
-            if os.path.exists(thresholds_path):
-                thresholds = joblib.load(thresholds_path)
-                self.stage1_threshold = thresholds['stage1_threshold']
-                self.stage2_threshold = thresholds['stage2_threshold']
+            if bundle:
+                self._load_bundle(model_dir)
+            else:
+                self.bundle = None
+                self._load_model_files(model_dir, max_workers)
+
+            # Models saved without a student cannot serve fast mode
+            if self.stage2_student is None and self.stage2_scoring_mode == "fast":
+                logger.warning("Stage 2 student not found, falling back to full scoring")
+                self.stage2_scoring_mode = "full"
+
+            self.model_dir = model_dir
+            self.load_generation += 1
+
+            if self.thread_count:
+                self.set_thread_count(self.thread_count)
+
+            # Restart process workers so they pick up the new models
+            if self.stage2_executor_mode == "process":
+                self.set_stage2_executor("process", self.stage2_executor_workers)
+
+            # Re-export the native engine from the new models
+            if self.native_engine:
+                self.compile_forests()
 
             logger.info(f"Models loaded from {model_dir}")
 
@@ -288,6 +1073,29 @@ class TwoStagePredictor:
             logger.error(f"Error loading models: {e}")
             raise
 
+    @staticmethod
+    def _artifact_loader(name: str, path: str):
+        """
+        Zero-argument function that loads one model artifact
+        """
+        def load_xgboost(estimator: str):
+            model = getattr(lazy_import("xgboost"), estimator)()
+            model.load_model(path)
+            return model
+
+        def load_catboost():
+            model = lazy_import("catboost").CatBoostClassifier()
+            model.load_model(path)
+            return model
+
+        if name == "stage2_student.json":
+            return lambda: load_xgboost("XGBRegressor")
+        if name.endswith(".json"):
+            return lambda: load_xgboost("XGBClassifier")
+        if name.endswith(".cbm"):
+            return load_catboost
+        return lambda: joblib.load(path)
+
     def get_model_info(self) -> Dict[str, Any]:
         """
         Get information about loaded models
@@ -304,5 +1112,12 @@ class TwoStagePredictor:
             "stage2_expected_count": len(self.stage2_model_names),
             "meta_model_loaded": self.meta_model is not None,
             "stage2_threshold": self.stage2_threshold,
+            "native_tree_models": list(self.native_forests),
+            "stage2_executor": self.stage2_executor_mode or "sequential",
+            "stage2_early_exit": self.stage2_early_exit,
+            "stage2_student_loaded": self.stage2_student is not None,
+            "stage2_scoring_mode": self.stage2_scoring_mode,
+            "inference_dtype": self.inference_dtype.name,
+            "model_bundle": self.bundle.checksum if self.bundle is not None else None,
             "all_stage2_models_loaded": len(loaded_stage2_models) == len(self.stage2_model_names)
         }
@@ -6,15 +6,74 @@ Handles missing values, categorical encoding, and feature scaling
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.impute import SimpleImputer
 import joblib
 import logging
-from typing import Dict, List, Any
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple, Union
 import os
 
+from bundle import (PREPROCESSORS_BUNDLE, ImputerState, LabelEncoderState, ScalerState,
+                    read_bundle, write_bundle)
+from startup import lazy_import, load_artifacts
+
 logger = logging.getLogger(__name__)
 
+# Placeholder strings treated as missing values
+MISSING_PLACEHOLDERS = ["\\N", "NA", "NaN", "null", ""]
+
+
+def category_strings(values) -> np.ndarray:
+    """
+    Categorical values as the strings the fitted LabelEncoders saw
+
+    Each value is converted on its own, so its string never depends on the
+    other rows: None, NaN and the missing placeholders all become the 'nan'
+    token that missing cells of the training CSV were encoded as, and
+    integral floats their integer string (1.0 -> '1'), as the CSV spelled
+    them.
+    """
+    values = np.asarray(values)
+    strings = values.astype(str)
+
+    if values.dtype.kind == "f":
+        with np.errstate(invalid="ignore"):
+            integral = (np.abs(values) < 2 ** 53) & (np.mod(values, 1) == 0)
+        if integral.any():
+            strings = np.where(integral, np.where(integral, values, 0).astype(np.int64).astype(str), strings)
+    elif values.dtype.kind == "O":
+        # Only float elements print with a trailing ".0"
+        for i in np.flatnonzero(np.char.endswith(strings, ".0")):
+            value = values[i]
+            if isinstance(value, (float, np.floating)) and float(value).is_integer():
+                strings[i] = str(int(value))
+
+    missing = np.isin(strings, MISSING_PLACEHOLDERS)
+    if values.dtype.kind in "Of":
+        missing |= pd.isna(values)
+    # np.where widens the fixed-width string type to fit the token
+    return np.where(missing, "nan", strings) if missing.any() else strings
+
+
+def category_string(value: Any) -> str:
+    """
+    One categorical value as category_strings() converts it, without
+    building an array
+    """
+    if value is None:
+        return "nan"
+    if isinstance(value, (float, np.floating)):
+        if value != value:
+            return "nan"
+        if abs(value) < 2 ** 53 and float(value).is_integer():
+            return str(int(value))
+    string = str(value)
+    return "nan" if string in MISSING_PLACEHOLDERS else string
+
+
+# Rows preprocessed per float64 chunk when the output is float32
+PREPROCESS_CHUNK_ROWS = 65536
+
 class DataPreprocessor:
     """Handles all data preprocessing steps"""
 
@@ -26,6 +85,32 @@ class DataPreprocessor:
         self.stage2_imputer = None
         self.expected_columns = None
 
+        # Incremented on every load_preprocessors() so caches can detect reloads
+        self.load_generation = 0
+
+        # Seconds spent loading each file in the last load_preprocessors()
+        self.load_timings = {}
+
+        # Floating point type of preprocessed output (see set_inference_dtype())
+        self.inference_dtype = np.dtype(np.float64)
+
+        # Memory-mapped bundle the components were loaded from, if any
+        self.bundle = None
+
+        # Per-step timings are reported here when set (see metrics.PipelineMetrics)
+        self.metrics = None
+
+        # Compiled preprocessing plan (see compile())
+        self.compiled = False
+        self.compiled_plans = {}
+
+        # Categorical encoding: code used for values unseen at fit time
+        # (0 maps them to the first class of the fitted LabelEncoder)
+        self.unseen_category_code = 0
+        self.unseen_category_counts = {}
+        self._category_vocabularies = {}
+        self._unseen_lock = threading.Lock()
+
     def fit_stage1(self, X: pd.DataFrame, y: pd.Series = None):
         """
         Fit preprocessing components for Stage 1
@@ -39,14 +124,14 @@ class DataPreprocessor:
         X_processed = self._handle_missing_and_encode(X, fit=True)
 
         # Impute missing values
-        self.stage1_imputer = SimpleImputer(strategy='median')
+        self.stage1_imputer = lazy_import("sklearn.impute").SimpleImputer(strategy='median')
         X_imputed = pd.DataFrame(
             self.stage1_imputer.fit_transform(X_processed), 
             columns=X_processed.columns
         )
 
         # Scale features
-        self.stage1_scaler = StandardScaler()
+        self.stage1_scaler = lazy_import("sklearn.preprocessing").StandardScaler()
         self.stage1_scaler.fit(X_imputed)
 
         logger.info("Stage 1 preprocessors fitted successfully")
@@ -61,14 +146,14 @@ class DataPreprocessor:
         X_processed = self._handle_missing_and_encode(X, fit=False)  # Use existing encoders
 
         # Impute missing values
-        self.stage2_imputer = SimpleImputer(strategy='median')
+        self.stage2_imputer = lazy_import("sklearn.impute").SimpleImputer(strategy='median')
         X_imputed = pd.DataFrame(
             self.stage2_imputer.fit_transform(X_processed), 
             columns=X_processed.columns
         )
 
         # Scale features
-        self.stage2_scaler = StandardScaler()
+        self.stage2_scaler = lazy_import("sklearn.preprocessing").StandardScaler()
         self.stage2_scaler.fit(X_imputed)
 
         logger.info("Stage 2 preprocessors fitted successfully")
@@ -77,47 +162,58 @@ class DataPreprocessor:
         """
         Preprocess data for Stage 1 model
         """
-        # Ensure we have all expected columns
-        X = self._ensure_columns(X)
-
-        # Handle missing values and encode categoricals
-        X_processed = self._handle_missing_and_encode(X, fit=False)
-
-        # Impute missing values
-        X_imputed = pd.DataFrame(
-            self.stage1_imputer.transform(X_processed), 
-            columns=X_processed.columns
-        )
-
-        # Scale features
-        X_scaled = self.stage1_scaler.transform(X_imputed)
-
-        return X_scaled
+        if self.compiled:
+            return self._preprocess_compiled(X, "stage1")
+        return self._preprocess_fitted(X, "stage1", self.stage1_imputer, self.stage1_scaler)
 
     def preprocess_stage2(self, X: pd.DataFrame) -> np.ndarray:
         """
         Preprocess data for Stage 2 models
         """
+        if self.compiled:
+            return self._preprocess_compiled(X, "stage2")
+        return self._preprocess_fitted(X, "stage2", self.stage2_imputer, self.stage2_scaler)
+
+    def _preprocess_fitted(self, X: Union[pd.DataFrame, List[Dict[str, Any]]], stage: str,
+                           imputer, scaler) -> np.ndarray:
+        """
+        Preprocess data with the fitted components, timing each step
+        """
+        start = time.perf_counter()
+
         # Ensure we have all expected columns
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X)
         X = self._ensure_columns(X)
+        columns_done = time.perf_counter()
 
         # Handle missing values and encode categoricals
         X_processed = self._handle_missing_and_encode(X, fit=False)
+        encoding_done = time.perf_counter()
 
         # Impute missing values
         X_imputed = pd.DataFrame(
-            self.stage2_imputer.transform(X_processed), 
+            imputer.transform(X_processed), 
             columns=X_processed.columns
         )
+        imputation_done = time.perf_counter()
 
         # Scale features
-        X_scaled = self.stage2_scaler.transform(X_imputed)
+        X_scaled = scaler.transform(X_imputed)
+
+        if self.metrics is not None:
+            self.metrics.observe_step("ensure_columns", stage, columns_done - start)
+            self.metrics.observe_step("encoding", stage, encoding_done - columns_done)
+            self.metrics.observe_step("imputation", stage, imputation_done - encoding_done)
+            self.metrics.observe_step("scaling", stage, time.perf_counter() - imputation_done)
 
-        return X_scaled
+        return X_scaled.astype(self.inference_dtype, copy=False)
 
-    def preprocess(self, X: pd.DataFrame, stage: str = "stage1") -> np.ndarray:
+    def preprocess(self, X: Union[pd.DataFrame, List[Dict[str, Any]]], stage: str = "stage1") -> np.ndarray:
         """
         General preprocessing method
+
+        X may be a DataFrame or a list of record dicts keyed by column name
         """
         if stage == "stage1":
             return self.preprocess_stage1(X)
@@ -126,6 +222,200 @@ class DataPreprocessor:
         else:
             raise ValueError("Stage must be either 'stage1' or 'stage2'")
 
+    def compile(self):
+        """
+        Build the compiled preprocessing plan from the fitted components
+
+        The plan is a fixed column-index layout over expected_columns plus,
+        per stage, the imputer medians and scaler mean/scale as flat arrays.
+        Once compiled, preprocessing fills a preallocated float matrix column
+        by column and runs one NaN-fill and affine pass over it, without
+        building intermediate DataFrames.
+        """
+        if self.expected_columns is None:
+            raise ValueError("Preprocessors must be fitted or loaded before compiling")
+
+        columns = list(self.expected_columns)
+        self.compiled_plans = {}
+
+        for stage, imputer, scaler in [("stage1", self.stage1_imputer, self.stage1_scaler),
+                                       ("stage2", self.stage2_imputer, self.stage2_scaler)]:
+            if imputer is None or scaler is None:
+                continue
+
+            fitted_columns = getattr(imputer, "feature_names_in_", None)
+            if fitted_columns is not None and list(fitted_columns) != columns:
+                raise ValueError(f"{stage} imputer was fitted on a different column layout")
+
+            # SimpleImputer drops columns whose median could not be computed
+            statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+            keep = np.flatnonzero(~np.isnan(statistics))
+
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(len(keep))
+            scale = scaler.scale_ if scaler.with_std else np.ones(len(keep))
+
+            self.compiled_plans[stage] = {
+                "keep": None if len(keep) == len(columns) else keep,
+                "fill": statistics[keep].reshape(1, -1),
+                "mean": np.asarray(mean, dtype=np.float64).reshape(1, -1),
+                "scale": np.asarray(scale, dtype=np.float64).reshape(1, -1)
+            }
+
+        self.compiled = True
+        logger.info(f"Compiled preprocessing plan for {list(self.compiled_plans)}")
+
+    def set_inference_dtype(self, dtype):
+        """
+        Select float32 or float64 preprocessed output
+
+        The arithmetic always runs in float64 and is rounded once into the
+        output, so float32 output equals the float64 output cast to float32.
+        Computing the affine pass in float32 instead would move values by an
+        ulp, which flips splits whose thresholds sit exactly on training
+        values.
+        """
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported inference dtype: {dtype}")
+        self.inference_dtype = dtype
+
+    def _preprocess_compiled(self, X: Union[pd.DataFrame, List[Dict[str, Any]]], stage: str) -> np.ndarray:
+        """
+        Preprocess data with the compiled plan for the given stage
+        """
+        if stage not in self.compiled_plans:
+            raise ValueError(f"No compiled plan for {stage}")
+        plan = self.compiled_plans[stage]
+
+        if self.inference_dtype == np.float64:
+            return self._apply_plan(X, plan, stage)
+
+        # Narrower output: work through float64 row chunks so the full-size
+        # float64 matrix never exists
+        n_rows = len(X)
+        X_out = np.empty((n_rows, plan["fill"].shape[1]), dtype=self.inference_dtype)
+        for start in range(0, n_rows, PREPROCESS_CHUNK_ROWS):
+            stop = start + PREPROCESS_CHUNK_ROWS
+            chunk = X.iloc[start:stop] if isinstance(X, pd.DataFrame) else X[start:stop]
+            X_out[start:stop] = self._apply_plan(chunk, plan, stage)
+        return X_out
+
+    def _apply_plan(self, X: Union[pd.DataFrame, List[Dict[str, Any]]], plan: Dict[str, Any],
+                    stage: str = "stage1") -> np.ndarray:
+        """
+        Encode, fill and scale rows in float64 with one stage's plan
+
+        Laying out the columns takes the place of _ensure_columns() and is
+        reported under that step, separately from categorical encoding.
+        """
+        start = time.perf_counter()
+        X_out, encoding_time = self._build_feature_matrix(X)
+        if plan["keep"] is not None:
+            X_out = X_out[:, plan["keep"]]
+        matrix_done = time.perf_counter()
+
+        # Fused median fill and standard scaling
+        np.copyto(X_out, plan["fill"], where=np.isnan(X_out))
+        imputation_done = time.perf_counter()
+        X_out -= plan["mean"]
+        X_out /= plan["scale"]
+
+        if self.metrics is not None:
+            self.metrics.observe_step("ensure_columns", stage, matrix_done - start - encoding_time)
+            self.metrics.observe_step("encoding", stage, encoding_time)
+            self.metrics.observe_step("imputation", stage, imputation_done - matrix_done)
+            self.metrics.observe_step("scaling", stage, time.perf_counter() - imputation_done)
+
+        return X_out
+
+    def _build_feature_matrix(self, X: Union[pd.DataFrame, List[Dict[str, Any]]]) -> Tuple[np.ndarray, float]:
+        """
+        Fill a preallocated float matrix in expected_columns order
+
+        Categorical columns are label encoded, numeric columns are converted
+        to float with placeholders and missing columns left as NaN.
+
+        Returns:
+            Tuple of (matrix, seconds spent label encoding)
+        """
+        if isinstance(X, pd.DataFrame):
+            n_rows = len(X)
+            present = set(X.columns)
+
+            def column_values(col):
+                return X[col].to_numpy() if col in present else None
+        else:
+            n_rows = len(X)
+
+            def column_values(col):
+                values = [record.get(col) for record in X]
+                if all(value is None for value in values):
+                    return None
+                return np.array(values, dtype=object)
+
+        X_out = np.empty((n_rows, len(self.expected_columns)), dtype=np.float64)
+        encoding_time = 0.0
+
+        for j, col in enumerate(self.expected_columns):
+            values = column_values(col)
+
+            if col in self.label_encoders:
+                if values is None:
+                    values = np.full(n_rows, np.nan, dtype=object)
+                start = time.perf_counter()
+                X_out[:, j] = self._encode_column(col, values)
+                encoding_time += time.perf_counter() - start
+            elif values is None:
+                X_out[:, j] = np.nan
+            elif values.dtype.kind in "biuf":
+                X_out[:, j] = values
+            else:
+                try:
+                    X_out[:, j] = values.astype(np.float64)
+                except (TypeError, ValueError):
+                    # Placeholder strings such as "\\N" or "NA" become NaN
+                    X_out[:, j] = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+
+        return X_out, encoding_time
+
+    def _encode_column(self, col: str, values: np.ndarray) -> np.ndarray:
+        """
+        Label encode one categorical column in a single vectorized lookup
+
+        Values are looked up in a hash index built from the fitted encoder's
+        classes; missing values and placeholders map to the 'nan' token (see
+        category_strings()), and values unseen at fit time map to
+        unseen_category_code and are counted in unseen_category_counts. The
+        first unseen value of each column is logged.
+        """
+        vocabulary = self._category_vocabulary(col)
+        strings = category_strings(values)
+        codes = vocabulary.get_indexer(strings)
+
+        unseen = codes < 0
+        n_unseen = int(np.count_nonzero(unseen))
+        if n_unseen:
+            codes[unseen] = self.unseen_category_code
+            with self._unseen_lock:
+                first = col not in self.unseen_category_counts
+                self.unseen_category_counts[col] = self.unseen_category_counts.get(col, 0) + n_unseen
+            if first:
+                logger.warning(f"Unseen category {strings[unseen][0]!r} in {col}, "
+                               f"encoded as {self.unseen_category_code}")
+
+        return codes
+
+    def _category_vocabulary(self, col: str) -> pd.Index:
+        """
+        Hash index over the fitted classes of a column's LabelEncoder
+        """
+        encoder = self.label_encoders[col]
+        cached = self._category_vocabularies.get(col)
+        if cached is None or cached[0] is not encoder:
+            cached = (encoder, pd.Index(encoder.classes_))
+            self._category_vocabularies[col] = cached
+        return cached[1]
+
     def _handle_missing_and_encode(self, X: pd.DataFrame, fit: bool = False) -> pd.DataFrame:
         """
         Handle missing values and encode categorical variables
@@ -133,31 +423,28 @@ class DataPreprocessor:
         X = X.copy()
 
         # Replace placeholders with NaN
-        X.replace(["\\N", "NA", "NaN", "null", ""], np.nan, inplace=True)
+        X.replace(MISSING_PLACEHOLDERS, np.nan, inplace=True)
 
-        # Encode categorical variables
+        # Encode categorical variables; once fitted, every column with an
+        # encoder is encoded whatever its dtype in this batch (a column that
+        # is all null or absent here is float, not object)
         categorical_cols = X.select_dtypes(include=['object', 'category']).columns
+        if not fit:
+            categorical_cols = categorical_cols.union([col for col in self.label_encoders if col in X.columns],
+                                                      sort=False)
 
         for col in categorical_cols:
-            X[col] = X[col].astype(str)
+            X[col] = category_strings(X[col].to_numpy())
 
             if fit:
                 # Fit new encoder
-                self.label_encoders[col] = LabelEncoder()
+                self.label_encoders[col] = lazy_import("sklearn.preprocessing").LabelEncoder()
                 X[col] = self.label_encoders[col].fit_transform(X[col])
             else:
                 # Use existing encoder
                 if col in self.label_encoders:
-                    # Handle unseen categories
-                    unique_vals = X[col].unique()
-                    known_vals = self.label_encoders[col].classes_
-
-                    # Replace unseen values with the most common known value
-                    if len(known_vals) > 0:
-                        most_common = known_vals[0]  # Use first class as default
-                        X[col] = X[col].apply(lambda x: x if x in known_vals else most_common)
-
-                    X[col] = self.label_encoders[col].transform(X[col])
+                    # Unseen categories map to the configured fallback code
+                    X[col] = self._encode_column(col, X[col].to_numpy())
                 else:
                     # If encoder doesn't exist, use integer encoding
                     X[col] = pd.Categorical(X[col]).codes
@@ -183,9 +470,14 @@ class DataPreprocessor:
 
         return X
 
-    def save_preprocessors(self, model_dir: str = "models"):
+    def save_preprocessors(self, model_dir: str = "models", bundle: bool = False):
         """
         Save all preprocessing components
+
+        Args:
+            model_dir: Output directory
+            bundle: Also write preprocessors.bundle, a memory-mappable copy
+                (see save_bundle())
         """
         os.makedirs(model_dir, exist_ok=True)
 
@@ -209,40 +501,123 @@ class DataPreprocessor:
         if self.expected_columns:
             joblib.dump(self.expected_columns, os.path.join(model_dir, "expected_columns.pkl"))
 
+        if bundle:
+            self.save_bundle(model_dir)
+
         logger.info(f"Preprocessors saved to {model_dir}")
 
-    def load_preprocessors(self, model_dir: str = "models"):
+    def save_bundle(self, model_dir: str = "models") -> str:
+        """
+        Write the imputer, scaler and encoder state to one memory-mappable bundle
+
+        Returns:
+            Checksum of the bundle
+        """
+        if self.expected_columns is None:
+            raise ValueError("Preprocessors must be fitted or loaded before bundling")
+
+        arrays = {}
+        stages = []
+        for stage, imputer, scaler in [("stage1", self.stage1_imputer, self.stage1_scaler),
+                                       ("stage2", self.stage2_imputer, self.stage2_scaler)]:
+            if imputer is None or scaler is None:
+                continue
+            statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+            n_kept = int(np.count_nonzero(~np.isnan(statistics)))
+            arrays[f"{stage}/statistics"] = statistics
+            arrays[f"{stage}/mean"] = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(n_kept),
+                                                 dtype=np.float64)
+            arrays[f"{stage}/scale"] = np.asarray(scaler.scale_ if scaler.with_std else np.ones(n_kept),
+                                                  dtype=np.float64)
+            stages.append(stage)
+
+        for col, encoder in self.label_encoders.items():
+            arrays[f"classes/{col}"] = np.asarray(encoder.classes_).astype(str)
+
+        meta = {
+            "expected_columns": list(self.expected_columns),
+            "stages": stages,
+            "categorical_columns": list(self.label_encoders)
+        }
+        return write_bundle(os.path.join(model_dir, PREPROCESSORS_BUNDLE), "preprocessors", arrays, meta)
+
+    def _load_bundle(self, model_dir: str):
+        """
+        Map preprocessors.bundle and rebuild the components on its arrays
+        """
+        start = time.perf_counter()
+        self.bundle = read_bundle(os.path.join(model_dir, PREPROCESSORS_BUNDLE), kind="preprocessors")
+        arrays = self.bundle.arrays
+        self.expected_columns = list(self.bundle.meta["expected_columns"])
+
+        for stage in self.bundle.meta["stages"]:
+            imputer = ImputerState(arrays[f"{stage}/statistics"], self.expected_columns)
+            scaler = ScalerState(arrays[f"{stage}/mean"], arrays[f"{stage}/scale"])
+            setattr(self, f"{stage}_imputer", imputer)
+            setattr(self, f"{stage}_scaler", scaler)
+
+        self.label_encoders = {col: LabelEncoderState(arrays[f"classes/{col}"])
+                               for col in self.bundle.meta["categorical_columns"]}
+        self.load_timings = {PREPROCESSORS_BUNDLE: time.perf_counter() - start}
+
+    def _load_pickles(self, model_dir: str, max_workers: Optional[int] = None):
+        """
+        Load the components from their pickle files
+        """
+        artifacts = {
+            "stage1_scaler.pkl": "sklearn.preprocessing",
+            "stage2_scaler.pkl": "sklearn.preprocessing",
+            "stage1_imputer.pkl": "sklearn.impute",
+            "stage2_imputer.pkl": "sklearn.impute",
+            "label_encoders.pkl": "sklearn.preprocessing",
+            "expected_columns.pkl": None
+        }
+        paths = {name: os.path.join(model_dir, name) for name in artifacts
+                 if os.path.exists(os.path.join(model_dir, name))}
+
+        for name in paths:
+            if artifacts[name]:
+                lazy_import(artifacts[name])
+
+        loaded, self.load_timings = load_artifacts(
+            {name: (lambda path=path: joblib.load(path)) for name, path in paths.items()}, max_workers
+        )
+
+        # Load scalers
+        self.stage1_scaler = loaded.get("stage1_scaler.pkl", self.stage1_scaler)
+        self.stage2_scaler = loaded.get("stage2_scaler.pkl", self.stage2_scaler)
+
+        # Load imputers
+        self.stage1_imputer = loaded.get("stage1_imputer.pkl", self.stage1_imputer)
+        self.stage2_imputer = loaded.get("stage2_imputer.pkl", self.stage2_imputer)
+
+        # Load label encoders
+        self.label_encoders = loaded.get("label_encoders.pkl", self.label_encoders)
+
+        # Load expected columns
+        self.expected_columns = loaded.get("expected_columns.pkl", self.expected_columns)
+
+    def load_preprocessors(self, model_dir: str = "models", max_workers: Optional[int] = None,
+                           bundle: bool = False):
         """
         Load all preprocessing components
+
+        The pickles are read concurrently after importing the sklearn
+        modules they need; per-file load times are kept in load_timings.
+        With bundle set, preprocessors.bundle is memory-mapped instead.
         """
         try:
-            # Load scalers
-            stage1_scaler_path = os.path.join(model_dir, "stage1_scaler.pkl")
-            if os.path.exists(stage1_scaler_path):
-                self.stage1_scaler = joblib.load(stage1_scaler_path)
-
-            stage2_scaler_path = os.path.join(model_dir, "stage2_scaler.pkl")
-            if os.path.exists(stage2_scaler_path):
-                self.stage2_scaler = joblib.load(stage2_scaler_path)
-
-            # Load imputers
-            stage1_imputer_path = os.path.join(model_dir, "stage1_imputer.pkl")
-            if os.path.exists(stage1_imputer_path):
-                self.stage1_imputer = joblib.load(stage1_imputer_path)
-
-            stage2_imputer_path = os.path.join(model_dir, "stage2_imputer.pkl")
-            if os.path.exists(stage2_imputer_path):
-                self.stage2_imputer = joblib.load(stage2_imputer_path)
-
-            # Load label encoders
-            encoders_path = os.path.join(model_dir, "label_encoders.pkl")
-            if os.path.exists(encoders_path):
-                self.label_encoders = joblib.load(encoders_path)
-
-            # Load expected columns
-            columns_path = os.path.join(model_dir, "expected_columns.pkl")
-            if os.path.exists(columns_path):
-                self.expected_columns = joblib.load(columns_path)
+            if bundle:
+                self._load_bundle(model_dir)
+            else:
+                self.bundle = None
+                self._load_pickles(model_dir, max_workers)
+
+            self.load_generation += 1
+
+            # Rebuild the compiled plan against the new components
+            if self.compiled:
+                self.compile()
 
             logger.info(f"Preprocessors loaded from {model_dir}")
 
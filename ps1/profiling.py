@@ -0,0 +1,205 @@
+"""
+Per-Request Profiling for the Two-Stage Fraud Detection Service
+Profiles the preprocessing and scoring of selected requests and writes
+each profile to disk: sampled stacks in the folded format read by
+flamegraph.pl and speedscope, or a deterministic cProfile dump for
+snakeviz and flameprof. Profiling is rate limited, runs for at most one
+request at a time and keeps a bounded number of files, so it cannot
+degrade the whole service.
+"""
+
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sample", "cprofile")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Background thread sampling one thread's Python stack at a fixed interval
+
+    Samples are only taken when the sampler gets the GIL, so while the
+    profiled thread runs Python code the interpreter switch interval is
+    lowered to the sampling interval; it is restored afterwards. Stacks are
+    cut below the frame running root_code, when given.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001, max_samples: int = 10000, root_code=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.root_code = root_code
+        self.stacks = Counter()
+        self.n_samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval) and self.n_samples < self.max_samples:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and frame.f_code is not self.root_code:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if self._stop.is_set():
+                # The profiled call has returned; this is the sampler being stopped
+                break
+            self.stacks[";".join(reversed(stack))] += 1
+            self.n_samples += 1
+
+    def __enter__(self):
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def folded(self) -> str:
+        """
+        Samples as folded stacks: "root;...;leaf count" per line
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and profiles them
+
+    A request is profiled when it asks for it through the profiling header
+    (if allow_header) or is picked at sample_rate, and only while fewer than
+    max_per_minute profiles were taken in the last minute. At most one
+    profile runs at a time; a request selected while another is being
+    profiled is scored normally.
+    """
+
+    def __init__(self, output_dir: str = "profiles", sample_rate: float = 0.0, allow_header: bool = False,
+                 mode: str = "sample", interval_ms: float = 1.0, max_samples: int = 10000,
+                 max_per_minute: int = 6, max_files: int = 200):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Profile sample rate must be between 0 and 1")
+
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.allow_header = allow_header
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.max_samples = max_samples
+        self.max_per_minute = max_per_minute
+        self.max_files = max_files
+
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        self._sequence = 0
+        self.profiles_written = 0
+        self.profiles_skipped = 0
+
+    def should_profile(self, header_value: Optional[str] = None) -> bool:
+        """
+        Select a request for profiling, taking one slot of the per-minute budget
+        """
+        requested = self.allow_header and header_value is not None and header_value.lower() in ("1", "true", "yes")
+        if not requested and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_per_minute:
+                self.profiles_skipped += 1
+                return False
+            self._recent.append(now)
+        return True
+
+    def profile(self, func: Callable, *args, label: str = "request") -> Tuple[Any, Optional[str]]:
+        """
+        Run func(*args) on this thread under the profiler
+
+        Returns:
+            Tuple of (func's result, path of the written profile or None when
+            another profile was already running)
+        """
+        if not self._running.acquire(blocking=False):
+            with self._lock:
+                self.profiles_skipped += 1
+            return func(*args), None
+
+        try:
+            start = time.perf_counter()
+            if self.mode == "cprofile":
+                profiler = cProfile.Profile()
+                result = profiler.runcall(func, *args)
+                elapsed = time.perf_counter() - start
+                path = self._new_path(label, elapsed, "prof")
+                profiler.dump_stats(path)
+            else:
+                with StackSampler(threading.get_ident(), self.interval, self.max_samples,
+                                  root_code=RequestProfiler.profile.__code__) as sampler:
+                    result = func(*args)
+                elapsed = time.perf_counter() - start
+                path = self._new_path(label, elapsed, "folded")
+                with open(path, "w") as f:
+                    f.write(sampler.folded())
+        finally:
+            self._running.release()
+
+        self._prune()
+        with self._lock:
+            self.profiles_written += 1
+        logger.info(f"Profiled {label} in {elapsed * 1000:.1f} ms -> {path}")
+        return result, path
+
+    def _new_path(self, label: str, elapsed: float, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{sequence:05d}-{label}-{elapsed * 1000:.0f}ms.{extension}"
+        return os.path.join(self.output_dir, name)
+
+    def _prune(self):
+        """
+        Delete the oldest profiles beyond max_files
+        """
+        names = sorted(name for name in os.listdir(self.output_dir)
+                       if name.endswith((".folded", ".prof")))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "sample_rate": self.sample_rate,
+                "header_enabled": self.allow_header,
+                "profiles_written": self.profiles_written,
+                "profiles_skipped": self.profiles_skipped,
+                "output_dir": self.output_dir
+            }
@@ -0,0 +1,205 @@
+"""
+Pre-forking Server for the Two-Stage Fraud Detection API
+Loads the preprocessors and models once in a master process, then forks
+worker processes that share the model memory copy-on-write
+
+Usage:
+    python serve.py --workers 4 --threads-per-worker 2 --port 8000
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-forking server for the fraud detection API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of forked worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="Native threads each worker's models and BLAS may use")
+    parser.add_argument("--model-dir", default=os.environ.get("PS1_MODEL_DIR", "models"))
+    parser.add_argument("--max-restarts", type=int, default=10,
+                        help="Shut down after this many worker restarts within --restart-window")
+    parser.add_argument("--restart-window", type=float, default=60.0,
+                        help="Seconds over which worker restarts are counted")
+    return parser.parse_args()
+
+
+class RestartPolicy:
+    """
+    Restart delays per worker slot, and a limit on restarts across slots
+
+    A slot's delay doubles each time its worker dies within stable_seconds
+    of starting, and resets once a worker has run longer, so a worker that
+    crashes on startup is not forked in a tight loop.
+    """
+
+    def __init__(self, max_restarts: int, window_seconds: float, base_delay: float = 0.5,
+                 max_delay: float = 30.0, stable_seconds: float = 30.0):
+        self.max_restarts = max_restarts
+        self.window_seconds = window_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_seconds = stable_seconds
+        self._delays: Dict[int, float] = {}
+        self._restarts = deque()
+
+    def record_exit(self, slot: int, uptime: float, now: float) -> Optional[float]:
+        """
+        Seconds to wait before restarting the slot's worker, or None when
+        the restart limit is exceeded
+        """
+        self._restarts.append(now)
+        while now - self._restarts[0] > self.window_seconds:
+            self._restarts.popleft()
+        if len(self._restarts) > self.max_restarts:
+            return None
+
+        previous = self._delays.get(slot)
+        if previous is None or uptime >= self.stable_seconds:
+            delay = self.base_delay
+        else:
+            delay = min(previous * 2, self.max_delay)
+        self._delays[slot] = delay
+        return delay
+
+
+def limit_native_threads(n_threads: int):
+    """
+    Cap OpenMP/BLAS thread pools; must run before numpy and the model
+    libraries are imported so their pools start at the right size
+    """
+    for var in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"]:
+        os.environ[var] = str(n_threads)
+
+
+def run_worker(listen_socket: socket.socket, n_threads: int):
+    """
+    Serve requests from the shared listening socket in a forked worker
+    """
+    import uvicorn
+    from threadpoolctl import threadpool_limits
+
+    import app as app_module
+
+    threadpool_limits(limits=n_threads)
+
+    config = uvicorn.Config(app_module.app, fd=listen_socket.fileno(), log_level="info")
+    server = uvicorn.Server(config)
+    server.run()
+
+
+def main():
+    args = parse_args()
+    limit_native_threads(args.threads_per_worker)
+
+    import gc
+    import logging
+
+    import app as app_module
+
+    logger = logging.getLogger("serve")
+
+    # Load everything once; workers inherit it through fork(). No inference
+    # runs here, so no OpenMP thread pool exists in the master at fork time.
+    app_module.load_components(args.model_dir)
+    app_module.predictor.set_thread_count(args.threads_per_worker)
+
+    # Move loaded objects to the permanent generation so the collector in
+    # each worker does not write to (and un-share) the model pages
+    gc.collect()
+    gc.freeze()
+
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((args.host, args.port))
+    listen_socket.listen(2048)
+    listen_socket.set_inheritable(True)
+
+    workers = {}  # pid -> (slot, start time)
+    restarts_due = {}  # slot -> time its replacement worker is started
+    policy = RestartPolicy(args.max_restarts, args.restart_window)
+    shutting_down = False
+    exit_code = 0
+
+    def spawn_worker(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(listen_socket, args.threads_per_worker)
+            finally:
+                os._exit(0)
+        workers[pid] = (slot, time.monotonic())
+        logger.info(f"Started worker {pid}")
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for slot in range(args.workers):
+        spawn_worker(slot)
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers "
+                f"x {args.threads_per_worker} threads")
+
+    # Supervise workers, replacing any that die unexpectedly after a
+    # per-slot backoff
+    while workers or restarts_due:
+        if shutting_down:
+            restarts_due.clear()
+        for slot, due in list(restarts_due.items()):
+            if due <= time.monotonic():
+                del restarts_due[slot]
+                spawn_worker(slot)
+
+        try:
+            # Poll while restarts are waiting, so they start on time
+            pid, status = os.waitpid(-1, os.WNOHANG if restarts_due else 0)
+        except ChildProcessError:
+            if not restarts_due:
+                break
+            pid = 0
+        except InterruptedError:
+            continue
+        if pid == 0:
+            time.sleep(0.05)
+            continue
+
+        slot, started = workers.pop(pid, (None, None))
+        if slot is None or shutting_down:
+            continue
+        now = time.monotonic()
+        delay = policy.record_exit(slot, now - started, now)
+        if delay is None:
+            logger.error(f"More than {args.max_restarts} worker restarts within {args.restart_window:g}s, "
+                         f"shutting down")
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        logger.warning(f"Worker {pid} exited with status {status}, restarting in {delay:.1f}s")
+        restarts_due[slot] = now + delay
+
+    listen_socket.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
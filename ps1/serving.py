@@ -0,0 +1,357 @@
+"""
+Serving Utilities for the Two-Stage Fraud Detection API
+Runs CPU-bound preprocessing and inference off the event loop
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Collection, Dict, Hashable, List, Optional, Tuple
+
+from preprocessing import MISSING_PLACEHOLDERS, category_string
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue cannot accept more work"""
+
+
+class InferenceQueue:
+    """
+    Bounded pool of inference worker threads
+
+    At most max_workers jobs run at once and at most max_queue_depth more
+    wait for a worker; submissions beyond that are rejected immediately
+    with QueueFullError instead of piling up behind slow requests.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue_depth: int = 64):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue_depth
+
+    async def run(self, fn: Callable, *args) -> Tuple[Any, float, float]:
+        """
+        Run fn(*args) on a worker thread
+
+        Returns:
+            Tuple of (result, queue wait in seconds, compute time in seconds)
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                raise QueueFullError(f"Inference queue is full ({self._pending} pending)")
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(job)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the job itself is done, not until this
+        # coroutine stops waiting for it
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A job still waiting for a worker is dropped; one already
+            # running keeps its slot until it finishes
+            future.cancel()
+            raise
+
+    def _release(self, future=None):
+        """
+        Free the slot of a finished, failed or cancelled job
+        """
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Current queue occupancy
+        """
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "pending": self._pending,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        """
+        Stop the worker threads after running jobs finish
+        """
+        self._executor.shutdown(wait=True)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record requests into vectorized batches
+
+    Records submitted within max_wait_ms of the first pending record, up
+    to max_batch_size of them, are scored with one call of
+    score_fn(records) on the inference queue. score_fn must return one
+    result per record in the same order. The time a record waits for its
+    batch to close is reported as part of its queue time.
+    """
+
+    def __init__(self, score_fn: Callable[[List[Any]], List[Any]], queue: InferenceQueue,
+                 max_wait_ms: float = 2.0, max_batch_size: int = 64):
+        self.score_fn = score_fn
+        self.queue = queue
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self._batches = 0
+        self._records = 0
+
+    async def submit(self, record: Any) -> Tuple[Any, float, float]:
+        """
+        Score one record as part of the next batch
+
+        Returns:
+            Tuple of (result, queue wait in seconds, compute time in seconds)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """
+        Close the current batch and start scoring it
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        closed = time.perf_counter()
+
+        try:
+            results, queue_time, compute_time = await self.queue.run(
+                self.score_fn, [record for record, _, _ in batch]
+            )
+        except QueueFullError as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            if len(batch) > 1:
+                # Isolate the failing record by scoring the batch one by one
+                logger.warning(f"Micro-batch of {len(batch)} failed ({e}), retrying records individually")
+                await asyncio.gather(*[self._run_batch([item]) for item in batch])
+            elif not batch[0][1].done():
+                batch[0][1].set_exception(e)
+            return
+
+        self._batches += 1
+        self._records += len(batch)
+        for (_, future, submitted), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, closed - submitted + queue_time, compute_time))
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Batching counters
+        """
+        return {
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "batches": self._batches,
+            "records": self._records,
+            "mean_batch_size": self._records / self._batches if self._batches else 0.0
+        }
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes],
+                     max_line_bytes: int = 1 << 20) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse newline-delimited JSON incrementally from a byte stream
+
+    Only the current partial line is buffered. Blank lines are skipped.
+    A line that is not valid JSON yields a ValueError in place of its
+    value, so one bad line does not end the stream.
+
+    Yields:
+        Tuples of (1-based line number, parsed value or ValueError)
+    """
+    buffer = bytearray()
+    line_number = 0
+
+    def parse(line: bytes) -> Any:
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return ValueError(f"Invalid JSON: {e}")
+
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_number += 1
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                yield line_number, parse(line)
+        del buffer[:start]
+
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"Line {line_number + 1} exceeds {max_line_bytes} bytes")
+
+    line = bytes(buffer).strip()
+    if line:
+        yield line_number + 1, parse(line)
+
+
+def _canonical_value(value: Any, categorical: bool = False) -> Any:
+    """
+    Normalize one feature value so equivalent payloads hash the same
+
+    Categorical values are normalized as the encoder sees them, so only
+    values with the same code share a key (1 and 1.0 do, True does not);
+    numeric values are compared as floats.
+    """
+    if categorical:
+        return category_string(value)
+    if value is None:
+        return None
+    if isinstance(value, (bool, int, float)):
+        value = float(value)
+        return None if value != value else value
+    if isinstance(value, str) and value in MISSING_PLACEHOLDERS:
+        return None
+    return str(value)
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of prediction results with TTL expiry
+
+    Entries are keyed by a stable hash of the record's feature values in
+    expected_columns order. Every lookup carries a generation token for
+    the loaded models and scoring settings; when it changes (models or
+    preprocessors were reloaded, or thresholds or the scoring mode were
+    changed) the whole cache is dropped.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(record: Dict[str, Any], columns: List[str], categorical: Collection[str] = ()) -> str:
+        """
+        Hash of the canonicalized, column-ordered feature vector
+
+        Args:
+            categorical: Columns that are label encoded rather than read as numbers
+        """
+        vector = [_canonical_value(record.get(col), col in categorical) for col in columns]
+        payload = json.dumps(vector, separators=(",", ":")).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key: str, generation: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Cached result for key, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return dict(entry[1])
+
+    def put(self, key: str, result: Dict[str, Any], generation: Hashable):
+        """
+        Store a result, evicting the least recently used entries if full
+        """
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _check_generation(self, generation: Hashable):
+        if generation != self._generation:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and occupancy
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
@@ -0,0 +1,79 @@
+"""
+Cold Start Utilities for the Two-Stage Fraud Detection Service
+Defers heavy library imports until a model needs them and loads model
+artifacts concurrently, recording how long each step took
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent on each first import made through lazy_import()
+_import_timings = {}
+_import_lock = threading.Lock()
+
+
+def lazy_import(name: str):
+    """
+    Import a module on first use, timing the import
+
+    importlib.import_module() is used even for loaded modules so a caller
+    never sees a module another thread is still initializing.
+    """
+    already_loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_loaded:
+        elapsed = time.perf_counter() - start
+        with _import_lock:
+            _import_timings.setdefault(name, elapsed)
+        logger.info(f"Imported {name} in {elapsed * 1000:.1f} ms")
+    return module
+
+
+def import_timings() -> Dict[str, float]:
+    """
+    Seconds spent importing each module loaded through lazy_import()
+    """
+    with _import_lock:
+        return dict(_import_timings)
+
+
+def load_artifacts(loaders: Dict[str, Callable[[], Any]],
+                   max_workers: Optional[int] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run artifact loaders concurrently
+
+    Model files are parsed in native code that mostly releases the GIL, so
+    reading them on a thread pool overlaps the I/O and parsing. The first
+    loader error is re-raised after all loaders finish.
+
+    Args:
+        loaders: Artifact name -> zero-argument function returning the object
+        max_workers: Thread count (defaults to one per artifact, at most 8)
+
+    Returns:
+        Tuple of (artifact name -> loaded object, artifact name -> seconds)
+    """
+    if not loaders:
+        return {}, {}
+
+    def timed(loader: Callable[[], Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = loader()
+        return result, time.perf_counter() - start
+
+    workers = max_workers or min(len(loaders), 8)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact-loader") as executor:
+        futures = {name: executor.submit(timed, loader) for name, loader in loaders.items()}
+
+    results, timings = {}, {}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    return results, timings
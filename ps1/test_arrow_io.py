@@ -0,0 +1,97 @@
+"""
+Tests for the Arrow/Parquet bulk scoring I/O
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from arrow_io import read_table, write_results
+
+
+def test_read_table_accepts_arrow_stream_and_parquet():
+    df = pd.DataFrame({"LIMIT": [1.0, np.nan], "SI_FLG": ["Y", None]})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+
+    pd.testing.assert_frame_equal(read_table(sink.getvalue().to_pybytes(),
+                                             "application/vnd.apache.arrow.stream"), df)
+    # Parquet is recognized by its magic bytes without a content type
+    pd.testing.assert_frame_equal(read_table(parquet.getvalue()), df)
+
+    with pytest.raises(ValueError):
+        read_table(b"not a table")
+
+
+def test_write_results_nulls_stage2_for_stage1_rows():
+    arrays = {
+        "prediction": np.array([0, 1]),
+        "stage1_probability": np.array([0.1, 0.9]),
+        "stage1_prediction": np.array([0, 1]),
+        "stage2_probability": np.array([np.nan, 0.7])
+    }
+    body = write_results(arrays, pd.Series(["a", "b"], name="UNIQUE_ID"))
+    result = pa.ipc.open_stream(body).read_all().to_pydict()
+
+    assert result["UNIQUE_ID"] == ["a", "b"]
+    assert result["stage2_probability"] == [None, 0.7]
+    assert result["stage_used"] == ["stage1", "stage2"]
+
+
+
+def test_predict_arrow_null_categorical_matches_predict(api):
+    """Arrow nulls in categorical columns score as they do through /predict"""
+    records = [
+        {"LIMIT": 0.2, "AGE": 1.0, "SI_FLG": "Y", "TIME_PERIOD": "JAN25"},
+        {"LIMIT": 0.4, "AGE": -0.5, "SI_FLG": None, "TIME_PERIOD": None},
+        {"LIMIT": -1.0, "AGE": 0.3, "SI_FLG": "N", "TIME_PERIOD": "DEC24"}
+    ]
+    table = pa.Table.from_pylist(records)
+    assert table.column("SI_FLG").null_count == 1
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = api.post("/predict_arrow", content=sink.getvalue().to_pybytes(),
+                        headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all().to_pydict()
+
+    for i, record in enumerate(records):
+        single = api.post("/predict", json={"data": record}).json()
+        assert result["stage1_probability"][i] == pytest.approx(single["stage1_probability"], abs=1e-9)
+        assert result["stage2_probability"][i] == pytest.approx(single["stage2_probability"], abs=1e-9)
+        assert result["prediction"][i] == single["prediction"]
+
+
+def test_predict_arrow_separates_client_and_scoring_errors(api, monkeypatch):
+    """Unreadable bodies are 400s; a ValueError while scoring is a 500"""
+    import app
+
+    headers = {"Content-Type": "application/vnd.apache.arrow.stream"}
+    assert api.post("/predict_arrow", content=b"not arrow", headers=headers).status_code == 400
+
+    table = pa.Table.from_pylist([{"LIMIT": 0.2, "AGE": 1.0, "SI_FLG": "Y", "TIME_PERIOD": "JAN25"}])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    def mismatch(X):
+        raise ValueError("Feature shape mismatch")
+
+    monkeypatch.setattr(app.predictor, "predict_arrays", mismatch)
+    assert api.post("/predict_arrow", content=sink.getvalue().to_pybytes(), headers=headers).status_code == 500
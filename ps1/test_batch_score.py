@@ -0,0 +1,58 @@
+"""
+Tests for the offline chunked scorer
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from batch_score import score_file
+from prediction import TwoStagePredictor
+from preprocessing import DataPreprocessor
+
+
+def test_score_file_writes_parts_and_resumes(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "LIMIT": rng.normal(0, 1, 200),
+        "AGE": rng.normal(0, 1, 200),
+        "SI_FLG": rng.choice(["Y", "N"], 200)
+    })
+    y = (df["LIMIT"] + 0.3 * rng.standard_normal(200) > 0).astype(int)
+
+    model_dir = str(tmp_path / "models")
+    preprocessor = DataPreprocessor()
+    preprocessor.fit_stage1(df, y)
+    preprocessor.fit_stage2(df, y)
+    preprocessor.save_preprocessors(model_dir)
+
+    predictor = TwoStagePredictor()
+    predictor.create_stage2_models()
+    predictor.stage2_models["CatBoost"].set_params(iterations=20, allow_writing_files=False)
+    X = preprocessor.preprocess(df)
+    predictor.train_stage1(X, y)
+    predictor.train_stage2(X, y)
+    predictor.save_models(model_dir)
+
+    input_path = str(tmp_path / "input.csv")
+    df.assign(UNIQUE_ID=[f"id{i}" for i in range(len(df))]).to_csv(input_path, index=False)
+    output_dir = str(tmp_path / "parts")
+    output_path = str(tmp_path / "scores.csv")
+
+    summary = score_file(input_path, output_dir, model_dir=model_dir, chunk_size=64,
+                         workers=0, output_path=output_path)
+    assert (summary["chunks_scored"], summary["rows_merged"]) == (4, 200)
+
+    scores = pd.read_csv(output_path)
+    assert scores["UNIQUE_ID"].tolist() == [f"id{i}" for i in range(len(df))]
+    np.testing.assert_array_equal(scores["prediction"], predictor.predict_arrays(X)["prediction"])
+
+    # A rerun only scores the chunks whose part files are missing
+    os.remove(os.path.join(output_dir, "part-000002.csv"))
+    summary = score_file(input_path, output_dir, model_dir=model_dir, chunk_size=64,
+                         workers=0, output_path=output_path)
+    assert (summary["chunks_scored"], summary["chunks_skipped"]) == (1, 3)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path), scores)
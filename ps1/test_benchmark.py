@@ -0,0 +1,25 @@
+"""
+Tests for the benchmark input sampling
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import sample_rows
+
+
+def test_sample_rows_draws_the_requested_escalation_mix():
+    pool = pd.DataFrame({"row": range(6)})
+    escalates = np.array([True, False, False, True, False, False])
+
+    sample = sample_rows(pool, escalates, 1000, 0.25, np.random.default_rng(0))
+    assert len(sample) == 1000
+    assert sample["row"].isin([0, 3]).sum() == 250
+
+    with pytest.raises(ValueError):
+        sample_rows(pool, np.zeros(6, dtype=bool), 10, 0.5, np.random.default_rng(0))
@@ -0,0 +1,64 @@
+"""
+Tests for the cascade threshold sweep
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import joblib
+import numpy as np
+
+from calibrate import calibrate, cache_key, candidate_thresholds, choose_thresholds, sweep_thresholds
+
+
+def test_sweep_matches_brute_force():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 400)
+    stage1_probs = np.round(np.clip(0.3 * y + rng.random(400) * 0.7, 0, 1), 2)
+    stage2_probs = np.round(np.clip(0.4 * y + rng.random(400) * 0.6, 0, 1), 2)
+    weights = rng.choice([1.0, 2.5], 400)
+
+    stage1_grid = candidate_thresholds(stage1_probs, 20, 0.3)
+    stage2_grid = candidate_thresholds(stage2_probs, 0, 0.5)
+    results = sweep_thresholds(stage1_probs, stage2_probs, y, stage1_grid, stage2_grid, weights)
+
+    for i, t1 in enumerate(stage1_grid):
+        escalated = stage1_probs > t1
+        assert np.isclose(results["escalation_rate"][i], weights[escalated].sum() / weights.sum())
+        for j, t2 in enumerate(stage2_grid):
+            flagged = escalated & (stage2_probs > t2)
+            true_positives = weights[flagged & (y == 1)].sum()
+            assert np.isclose(results["recall"][i, j], true_positives / weights[y == 1].sum())
+            if flagged.any():
+                assert np.isclose(results["precision"][i, j], true_positives / weights[flagged].sum())
+            else:
+                assert np.isnan(results["precision"][i, j])
+
+    i, j = choose_thresholds(stage1_grid, stage2_grid, results, min_recall=0.8)
+    assert results["recall"][i, j] >= 0.8
+    feasible = results["recall"] >= 0.8
+    assert results["escalation_rate"][i] == results["escalation_rate"][np.nonzero(feasible)[0]].min()
+
+
+def test_default_min_recall_keeps_current_pair_feasible(tmp_path):
+    # Recall of the current pair is 0.87656, which the report rounds up
+    stage1_probs = np.array([0.9, 0.0, 0.5])
+    stage2_probs = np.array([0.9, 0.0, 0.5])
+    y = np.array([1, 1, 0], dtype=np.int8)
+    weights = np.array([0.87656, 0.12344, 1.0])
+
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    joblib.dump({"stage1_threshold": 0.5, "stage2_threshold": 0.5}, model_dir / "thresholds.pkl")
+    data_path = tmp_path / "validation.csv"
+    data_path.write_text("TARGET\n")
+    cache_path = str(tmp_path / "scores.npz")
+    np.savez(cache_path, key=cache_key(str(model_dir), str(data_path), False, "full"),
+             stage1_probs=stage1_probs, stage2_probs=stage2_probs, y=y, weights=weights)
+
+    report = calibrate(str(model_dir), str(data_path), holdout=False, cache_path=cache_path,
+                       grid_size=0, write=False)
+    assert report["current"]["recall"] == 0.8766
+    assert report["chosen"]["recall"] == report["current"]["recall"]
+    assert report["chosen"]["escalation_rate"] <= report["current"]["escalation_rate"]
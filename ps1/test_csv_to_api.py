@@ -0,0 +1,50 @@
+"""
+Tests for the concurrent CSV client
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import json
+
+import httpx
+import pandas as pd
+
+import csv_to_api
+
+
+def test_run_retries_checkpoints_and_resumes(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        records = json.loads(request.content)
+        return httpx.Response(200, json={"predictions": [
+            {"prediction": int(r["data"]["LIMIT"] > 0), "stage1_probability": 0.5,
+             "stage2_probability": None, "stage_used": "stage1"} for r in records
+        ]})
+
+    csv_file = str(tmp_path / "input.csv")
+    df = pd.DataFrame({col: [1.0] * 10 for col in csv_to_api.EXPECTED_FEATURE_COLUMNS})
+    df["LIMIT"] = [-1.0, 1.0] * 5
+    df.insert(0, "UNIQUE_ID", [f"id{i}" for i in range(10)])
+    df.to_csv(csv_file, index=False)
+
+    kwargs = dict(parts_dir=str(tmp_path / "parts"), output_csv=str(tmp_path / "out.csv"), chunk_size=3,
+                  concurrency=2, transport=httpx.MockTransport(handler))
+    summary = asyncio.run(csv_to_api.run(csv_file, **kwargs))
+    assert (summary["chunks_sent"], summary["records_merged"], summary["retries"]) == (4, 10, 1)
+
+    output = pd.read_csv(kwargs["output_csv"])
+    assert output["UNIQUE_ID"].tolist() == df["UNIQUE_ID"].tolist()
+    assert output["prediction"].tolist() == [0, 1] * 5
+
+    # Only the chunk without a checkpoint is sent again
+    os.remove(os.path.join(kwargs["parts_dir"], "part-000001.csv"))
+    summary = asyncio.run(csv_to_api.run(csv_file, **kwargs))
+    assert (summary["chunks_sent"], summary["chunks_skipped"]) == (1, 3)
+    pd.testing.assert_frame_equal(pd.read_csv(kwargs["output_csv"]), output)
@@ -0,0 +1,30 @@
+"""
+Tests for the load test report
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import summarize
+
+
+def result(scheduled, status=200, latency_ms=20.0, queue_ms=5.0, service_ms=10.0):
+    return {"status": status, "scheduled": scheduled, "finished": scheduled + latency_ms / 1000,
+            "latency_ms": latency_ms, "client_delay_ms": 0.5, "queue_ms": queue_ms, "service_ms": service_ms}
+
+
+def test_summarize_splits_latency_and_flags_sustained_levels():
+    results = [result(i * 0.1) for i in range(11)]
+    summary = summarize("open", 10, results, 0.0, 1, slo_p99_ms=100)
+    assert summary["offered_rps"] == 10
+    assert summary["sustained"]
+    assert summary["queue_ms"]["p50"] == 5.0
+    assert summary["other_ms"]["p50"] == 5.0
+
+    # Queueing past the SLO or rejected requests mean the rate is not sustained
+    slow = [result(i * 0.1, latency_ms=300.0, queue_ms=285.0) for i in range(11)]
+    assert not summarize("open", 10, slow, 0.0, 1, slo_p99_ms=100)["sustained"]
+    rejected = results[:10] + [result(1.0, status=503, queue_ms=None, service_ms=None)]
+    summary = summarize("open", 10, rejected, 0.0, 1, slo_p99_ms=100)
+    assert (summary["rejected"], summary["sustained"]) == (1, False)
@@ -0,0 +1,30 @@
+"""
+Tests for the Prometheus metrics
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import PipelineMetrics
+
+
+def test_pipeline_metrics_render_cumulative_histograms_and_counters():
+    metrics = PipelineMetrics()
+    metrics.observe_model("XGBoost", 0.0004)
+    metrics.observe_model("XGBoost", 0.003)
+    metrics.observe_model("XGBoost", 20.0)
+    metrics.observe_cascade(100, 7)
+    metrics.observe_cascade(50, 0)
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE ps1_model_seconds histogram" in lines
+    assert 'ps1_model_seconds_bucket{model="XGBoost",le="0.0005"} 1' in lines
+    assert 'ps1_model_seconds_bucket{model="XGBoost",le="0.005"} 2' in lines
+    assert 'ps1_model_seconds_bucket{model="XGBoost",le="10"} 2' in lines
+    assert 'ps1_model_seconds_bucket{model="XGBoost",le="+Inf"} 3' in lines
+    assert 'ps1_model_seconds_count{model="XGBoost"} 3' in lines
+    assert 'ps1_batch_rows_count{stage="stage1"} 2' in lines
+    assert 'ps1_batch_rows_count{stage="stage2"} 1' in lines
+    assert "ps1_rows_total 150" in lines
+    assert "ps1_stage2_escalated_rows_total 7" in lines
@@ -0,0 +1,282 @@
+"""
+Tests for the two-stage cascade on a small synthetic predictor
+"""
+
+import copy
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from prediction import TwoStagePredictor
+
+
+@pytest.fixture(scope="module")
+def fitted_predictor():
+    """Train a small predictor on synthetic data"""
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((300, 8))
+    y = (X[:, 0] + 0.5 * X[:, 1] + 0.3 * rng.standard_normal(300) > 0).astype(int)
+
+    predictor = TwoStagePredictor()
+    predictor.create_stage2_models()
+    predictor.stage2_models['CatBoost'].set_params(iterations=100, allow_writing_files=False)
+    predictor.train_stage1(X, y)
+    predictor.train_stage2(X, y)
+    return predictor, rng.standard_normal((120, 8))
+
+
+def reference_predict(predictor, x):
+    """The original one-row cascade, written out with the library models"""
+    stage1_probability = predictor.stage1_model.predict_proba(x)[0, 1]
+    if stage1_probability <= predictor.stage1_threshold:
+        return {"stage_used": "stage1", "prediction": 0, "stage1_probability": stage1_probability,
+                "stage2_probability": None}
+
+    base_predictions = [predictor.stage2_models[name].predict_proba(x)[0, 1]
+                        for name in predictor.stage2_model_names if name in predictor.stage2_models]
+    stage2_probability = predictor.meta_model.predict_proba(np.array(base_predictions).reshape(1, -1))[0, 1]
+    return {"stage_used": "stage2", "prediction": int(stage2_probability > predictor.stage2_threshold),
+            "stage1_probability": stage1_probability, "stage2_probability": stage2_probability}
+
+
+def test_predict_batch_matches_reference_cascade(fitted_predictor):
+    """The vectorized cascade must agree with the original per-row logic"""
+    predictor, X = fitted_predictor
+    predictor = copy.copy(predictor)
+
+    # Thresholds at the medians put rows on both sides of each of them
+    predictor.stage1_threshold = float(np.median(predictor.stage1_model.predict_proba(X)[:, 1]))
+    references = [reference_predict(predictor, X[i:i+1]) for i in range(X.shape[0])]
+    predictor.stage2_threshold = float(np.median([r["stage2_probability"] for r in references
+                                                  if r["stage2_probability"] is not None]))
+    references = [reference_predict(predictor, X[i:i+1]) for i in range(X.shape[0])]
+    assert {r["stage_used"] for r in references} == {"stage1", "stage2"}
+    assert {r["prediction"] for r in references if r["stage_used"] == "stage2"} == {0, 1}
+
+    batch_results = predictor.predict_batch(X)
+    assert len(batch_results) == X.shape[0]
+    for result, reference in zip(batch_results, references):
+        assert result["stage_used"] == reference["stage_used"]
+        assert result["prediction"] == reference["prediction"]
+        assert result["stage1_probability"] == pytest.approx(reference["stage1_probability"], abs=1e-6)
+        if reference["stage2_probability"] is None:
+            assert result["stage2_probability"] is None
+        else:
+            assert result["stage2_probability"] == pytest.approx(reference["stage2_probability"], abs=1e-6)
+
+
+def test_predict_batch_empty(fitted_predictor):
+    predictor, X = fitted_predictor
+    assert predictor.predict_batch(X[:0]) == []
+
+
+def test_native_forests_match_library_probabilities(fitted_predictor):
+    """Exported tree ensembles must reproduce the library probabilities"""
+    predictor, X = fitted_predictor
+    native = copy.deepcopy(predictor)
+    native.compile_forests()
+
+    assert set(native.native_forests) == {"Stage1", "XGBoost", "LightGBM", "CatBoost",
+                                          "ExtraTrees", "RandomForest"}
+
+    X_missing = X.copy()
+    X_missing[::5, 1] = np.nan
+    models = {"Stage1": predictor.stage1_model, **predictor.stage2_models}
+    for name, forest in native.native_forests.items():
+        inputs = X if name in ("ExtraTrees", "RandomForest") else X_missing
+        np.testing.assert_allclose(forest.predict_proba(inputs), models[name].predict_proba(inputs),
+                                   atol=1e-6, err_msg=name)
+
+    native.native_max_rows = X.shape[0]
+    for native_result, library_result in zip(native.predict_batch(X), predictor.predict_batch(X)):
+        assert native_result["prediction"] == library_result["prediction"]
+        assert native_result["stage_used"] == library_result["stage_used"]
+
+
+def test_thread_executor_matches_sequential_stage2(fitted_predictor):
+    predictor, X = fitted_predictor
+    expected = predictor.predict_arrays(X)
+
+    predictor.set_stage2_executor("thread")
+    try:
+        result = predictor.predict_arrays(X)
+    finally:
+        predictor.shutdown_stage2_executor()
+
+    np.testing.assert_array_equal(result["prediction"], expected["prediction"])
+    np.testing.assert_allclose(result["stage2_probability"], expected["stage2_probability"])
+
+
+def test_early_exit_keeps_decisions_and_skips_models(fitted_predictor):
+    predictor, X = fitted_predictor
+    expected = predictor.predict_arrays(X)
+
+    predictor.stage2_early_exit = True
+    try:
+        result = predictor.predict_arrays(X)
+        batch_results = predictor.predict_batch(X)
+    finally:
+        predictor.stage2_early_exit = False
+
+    np.testing.assert_array_equal(result["prediction"], expected["prediction"])
+    assert result["stage2_models_skipped"].sum() > 0
+
+    # Rows that ran every base model keep their exact probability
+    complete = ~np.isnan(result["stage2_probability"])
+    np.testing.assert_allclose(result["stage2_probability"][complete],
+                               expected["stage2_probability"][complete])
+
+    stage2_results = [r for r in batch_results if r["stage_used"] == "stage2"]
+    assert all("stage2_models_skipped" in r for r in stage2_results)
+
+
+def test_stage2_student_fast_mode(fitted_predictor, tmp_path):
+    """The distilled student serves escalated rows in fast mode and round-trips"""
+    predictor = copy.deepcopy(fitted_predictor[0])
+    X = fitted_predictor[1]
+    predictor.stage2_student = None
+    predictor.train_stage2_student(X)
+
+    report = predictor.evaluate_stage2_student(X)
+    assert report["rows"] == len(X)
+    assert 0.0 <= report["decision_agreement"] <= 1.0
+
+    predictor.set_stage2_scoring_mode("fast")
+    result = predictor.predict_arrays(X)
+    escalated = result["stage1_prediction"] == 1
+    np.testing.assert_allclose(result["stage2_probability"][escalated],
+                               predictor.stage2_student.predict(X[escalated]), rtol=1e-6)
+
+    predictor.compile_forests()
+    assert "Stage2Student" in predictor.native_forests
+    np.testing.assert_allclose(predictor.native_forests["Stage2Student"].predict_proba(X)[:, 1],
+                               predictor.stage2_student.predict(X), atol=1e-6)
+
+    predictor.save_models(str(tmp_path))
+    loaded = TwoStagePredictor()
+    loaded.load_models(str(tmp_path))
+    np.testing.assert_allclose(loaded.stage2_student.predict(X), predictor.stage2_student.predict(X))
+
+
+def test_model_bundle_matches_library_models(fitted_predictor, tmp_path):
+    """Models mapped from a bundle score like the library models"""
+    predictor, X = fitted_predictor
+    predictor.save_bundle(str(tmp_path))
+
+    bundled = TwoStagePredictor()
+    bundled.load_models(str(tmp_path), bundle=True)
+
+    expected = predictor.predict_arrays(X)
+    result = bundled.predict_arrays(X)
+    np.testing.assert_array_equal(result["prediction"], expected["prediction"])
+    np.testing.assert_allclose(result["stage2_probability"], expected["stage2_probability"], atol=1e-6)
+    assert set(bundled.native_forests) == {"Stage1", "XGBoost", "LightGBM", "CatBoost",
+                                           "ExtraTrees", "RandomForest"}
+
+
+def test_bundle_without_student_falls_back_to_full_scoring(fitted_predictor, tmp_path):
+    """Fast mode cannot survive loading a bundle that holds no student"""
+    predictor, X = fitted_predictor
+    without_student = copy.copy(predictor)
+    without_student.stage2_student = None
+    without_student.save_bundle(str(tmp_path))
+
+    bundled = TwoStagePredictor()
+    bundled.stage2_scoring_mode = "fast"
+    bundled.load_models(str(tmp_path), bundle=True)
+
+    assert bundled.stage2_student is None
+    assert bundled.stage2_scoring_mode == "full"
+    result = bundled.predict_arrays(X)
+    assert (result["stage1_prediction"] == 1).any()
+    np.testing.assert_array_equal(result["prediction"], predictor.predict_arrays(X)["prediction"])
+
+
+def test_float32_inference_bounds_probability_drift(fitted_predictor):
+    predictor, X = fitted_predictor
+    expected = predictor.predict_arrays(X)
+
+    predictor.set_inference_dtype("float32")
+    try:
+        result = predictor.predict_arrays(X)
+    finally:
+        predictor.set_inference_dtype("float64")
+
+    assert result["stage2_probability"].dtype == np.float32
+    np.testing.assert_allclose(result["stage1_probability"], expected["stage1_probability"], atol=1e-5)
+    escalated = (result["stage1_prediction"] == 1) & (expected["stage1_prediction"] == 1)
+    np.testing.assert_allclose(result["stage2_probability"][escalated],
+                               expected["stage2_probability"][escalated], atol=1e-5)
+
+
+def test_parallel_stage2_training_matches_sequential(fitted_predictor):
+    """Fitting the base models in worker processes must give the same ensemble"""
+    predictor, X = fitted_predictor
+    rng = np.random.default_rng(0)
+    X_train = rng.standard_normal((300, 8))
+    y_train = (X_train[:, 0] + 0.5 * X_train[:, 1] + 0.3 * rng.standard_normal(300) > 0).astype(int)
+
+    parallel = TwoStagePredictor()
+    parallel.create_stage2_models()
+    parallel.stage2_models['CatBoost'].set_params(iterations=100, allow_writing_files=False)
+    parallel.train_stage2(X_train, y_train, n_jobs=2, thread_budgets={'CatBoost': 1})
+
+    report = parallel.stage2_fit_report
+    assert report["workers"] == 2
+    assert set(report["models"]) == set(parallel.stage2_models)
+    assert report["models"]["CatBoost"]["threads"] == 1
+    assert all(stats["fit_seconds"] > 0 and stats["peak_rss_mb"] > 0 for stats in report["models"].values())
+    # Fits sharing this process have no peak RSS of their own
+    assert all(stats["peak_rss_mb"] is None for stats in predictor.stage2_fit_report["models"].values())
+    # The training thread budget is not kept on the fitted models
+    assert parallel.stage2_models['XGBoost'].get_params()["n_jobs"] is None
+
+    np.testing.assert_allclose(parallel._predict_stage2_proba(X), predictor._predict_stage2_proba(X), atol=1e-6)
+
+
+def test_stage2_out_of_fold_proba_scores_unseen_rows():
+    """Student targets come from ensembles that did not train on the scored row"""
+    rng = np.random.default_rng(1)
+    X = rng.standard_normal((200, 4))
+    y = (X[:, 0] + rng.standard_normal(200) > 0).astype(int)
+
+    predictor = TwoStagePredictor()
+    predictor.create_stage2_models()
+    predictor.stage2_models = {name: predictor.stage2_models[name] for name in ['ExtraTrees', 'LogisticRegression']}
+    predictor.train_stage2(X, y)
+
+    in_sample = predictor._predict_stage2_proba(X)
+    out_of_fold = predictor.stage2_out_of_fold_proba(X, y, n_splits=4)
+
+    assert out_of_fold.shape == (200,) and np.all((out_of_fold >= 0) & (out_of_fold <= 1))
+    # The fully grown trees memorize their training rows, which OOF scoring exposes
+    assert np.abs(in_sample - y).mean() < 0.5 * np.abs(out_of_fold - y).mean()
+
+
+def test_lightgbm_zero_as_missing_keeps_library_inference():
+    """Splits sending zeros the default way are not exported, so scoring stays exact"""
+    from lightgbm import LGBMClassifier
+    from tree_engine import export_lightgbm
+
+    rng = np.random.default_rng(2)
+    X = rng.standard_normal((400, 3))
+    X[rng.random(400) < 0.3, 0] = 0.0
+    y = ((X[:, 0] == 0) | (X[:, 1] > 0.5)).astype(int)
+    model = LGBMClassifier(n_estimators=20, zero_as_missing=True, verbose=-1, random_state=0).fit(X, y)
+
+    with pytest.raises(ValueError, match="zero as missing"):
+        export_lightgbm(model)
+
+    predictor = TwoStagePredictor()
+    predictor.stage2_models = {'LightGBM': model}
+    predictor.compile_forests()
+    assert 'LightGBM' not in predictor.native_forests
+
+    X_test = rng.standard_normal((50, 3))
+    X_test[::3, 0] = 0.0
+    X_test[1::7, 0] = np.nan
+    np.testing.assert_allclose(predictor._predict_model_proba('LightGBM', model, X_test),
+                               model.booster_.predict(X_test))
@@ -0,0 +1,175 @@
+"""
+Tests for DataPreprocessor on a small synthetic dataset
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessing import DataPreprocessor
+
+
+def make_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic frame with numeric, categorical and missing values"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "LIMIT": rng.normal(1e6, 2e5, n_rows),
+        "AGE": rng.normal(40, 10, n_rows),
+        "NO_LONS": rng.integers(0, 5, n_rows),
+        "SI_FLG": rng.choice(["Y", "N"], n_rows),
+        "AVERAGE_ACCT_AGE1": rng.choice(["0yrs 3mon", "1yrs 2mon", "2yrs 0mon", np.nan], n_rows),
+        "TIME_PERIOD": rng.choice(["DEC24", "JAN25", "NOV24"], n_rows),
+        "BRANCH_CODE": rng.choice(["1", "2", "10", np.nan], n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.1, "LIMIT"] = np.nan
+    df.loc[rng.random(n_rows) < 0.1, "AGE"] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def fitted_preprocessor():
+    preprocessor = DataPreprocessor()
+    X = make_frame(200)
+    preprocessor.fit_stage1(X)
+    preprocessor.fit_stage2(X.iloc[:120])
+    return preprocessor
+
+
+@pytest.mark.parametrize("stage", ["stage1", "stage2"])
+def test_compiled_plan_matches_sklearn_path(fitted_preprocessor, stage):
+    """The compiled plan must reproduce the imputer/scaler pipeline"""
+    X = make_frame(50, seed=1)
+    expected = fitted_preprocessor.preprocess(X, stage)
+
+    fitted_preprocessor.compile()
+    try:
+        np.testing.assert_allclose(fitted_preprocessor.preprocess(X, stage), expected)
+        records = X.to_dict(orient="records")
+        np.testing.assert_allclose(fitted_preprocessor.preprocess(records, stage), expected)
+    finally:
+        fitted_preprocessor.compiled = False
+
+
+def test_compiled_plan_matches_sklearn_path_on_nulls_and_numeric_categoricals(fitted_preprocessor):
+    """JSON/Arrow nulls and numbers in categorical columns encode as in training"""
+    records = [
+        {"LIMIT": 9e5, "SI_FLG": None, "AVERAGE_ACCT_AGE1": "1yrs 2mon", "TIME_PERIOD": "JAN25", "BRANCH_CODE": 1},
+        {"LIMIT": None, "SI_FLG": "Y", "AVERAGE_ACCT_AGE1": None, "TIME_PERIOD": None, "BRANCH_CODE": 2.0},
+        {"LIMIT": 1e6, "SI_FLG": "N", "AVERAGE_ACCT_AGE1": float("nan"), "TIME_PERIOD": "NA", "BRANCH_CODE": "10"},
+        {"LIMIT": 8e5, "SI_FLG": "", "AVERAGE_ACCT_AGE1": "0yrs 3mon", "TIME_PERIOD": "DEC24", "BRANCH_CODE": None},
+    ]
+    # Arrow and CSV readers give a numeric-looking categorical a float dtype
+    frame = pd.DataFrame({"LIMIT": [9e5, 1e6], "SI_FLG": ["Y", None], "BRANCH_CODE": [10.0, np.nan]})
+
+    fitted_preprocessor.unseen_category_counts.clear()
+    expected_records = fitted_preprocessor.preprocess(records)
+    expected_frame = fitted_preprocessor.preprocess(frame)
+    fitted_preprocessor.compile()
+    try:
+        np.testing.assert_allclose(fitted_preprocessor.preprocess(records), expected_records)
+        np.testing.assert_allclose(fitted_preprocessor.preprocess(frame), expected_frame)
+    finally:
+        fitted_preprocessor.compiled = False
+    assert "BRANCH_CODE" not in fitted_preprocessor.unseen_category_counts
+
+    encoder = fitted_preprocessor.label_encoders["BRANCH_CODE"]
+    codes = fitted_preprocessor._encode_column("BRANCH_CODE", np.array([1, 2.0, "10", None, np.nan], dtype=object))
+    np.testing.assert_array_equal(codes, encoder.transform(["1", "2", "10", "nan", "nan"]))
+
+
+def test_compiled_plan_handles_placeholders_and_missing_columns(fitted_preprocessor):
+    fitted_preprocessor.compile()
+    try:
+        result = fitted_preprocessor.preprocess([{"LIMIT": "\\N", "SI_FLG": "Y", "NO_LONS": 2}])
+    finally:
+        fitted_preprocessor.compiled = False
+
+    assert result.shape == (1, len(fitted_preprocessor.expected_columns))
+    assert np.isfinite(result).all()
+
+
+def test_categorical_encoding_matches_label_encoder_and_counts_unseen(fitted_preprocessor):
+    encoder = fitted_preprocessor.label_encoders["TIME_PERIOD"]
+    values = np.array(["JAN25", "DEC24", "MAR25", "NOV24", "MAR25"], dtype=object)
+
+    fitted_preprocessor.unseen_category_counts.clear()
+    codes = fitted_preprocessor._encode_column("TIME_PERIOD", values)
+
+    np.testing.assert_array_equal(codes[[0, 1, 3]], encoder.transform(values[[0, 1, 3]]))
+    assert codes[2] == codes[4] == fitted_preprocessor.unseen_category_code
+    assert fitted_preprocessor.unseen_category_counts == {"TIME_PERIOD": 2}
+
+
+def test_bundle_round_trip_and_guards(fitted_preprocessor, tmp_path):
+    from bundle import MODELS_BUNDLE, PREPROCESSORS_BUNDLE, check_pair, read_bundle, write_bundle
+
+    X = make_frame(50, seed=2)
+    fitted_preprocessor.save_bundle(str(tmp_path))
+
+    bundled = DataPreprocessor()
+    bundled.load_preprocessors(str(tmp_path), bundle=True)
+    for stage in ["stage1", "stage2"]:
+        np.testing.assert_allclose(bundled.preprocess(X, stage), fitted_preprocessor.preprocess(X, stage))
+
+    # Models saved against other preprocessors are rejected
+    models_path = str(tmp_path / MODELS_BUNDLE)
+    write_bundle(models_path, "models", {}, {}, paired_with="0" * 32)
+    with pytest.raises(ValueError, match="built for preprocessors"):
+        check_pair(bundled.bundle, read_bundle(models_path))
+
+    # Corrupted data fails the checksum
+    path = tmp_path / PREPROCESSORS_BUNDLE
+    raw = bytearray(path.read_bytes())
+    raw[-1] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    with pytest.raises(ValueError, match="Checksum"):
+        read_bundle(str(path))
+
+
+def test_float32_output_matches_float64(fitted_preprocessor, monkeypatch):
+    import preprocessing
+    monkeypatch.setattr(preprocessing, "PREPROCESS_CHUNK_ROWS", 16)
+    X = make_frame(50, seed=3)
+    expected = fitted_preprocessor.preprocess(X, "stage1")
+
+    fitted_preprocessor.compile()
+    fitted_preprocessor.set_inference_dtype("float32")
+    try:
+        result = fitted_preprocessor.preprocess(X, "stage1")
+    finally:
+        fitted_preprocessor.set_inference_dtype("float64")
+        fitted_preprocessor.compiled = False
+
+    # Rounded once from the float64 result, so tree splits see the same values
+    np.testing.assert_array_equal(result, expected.astype(np.float32))
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_null_categorical_encoding_does_not_depend_on_batch(fitted_preprocessor, compiled):
+    """A record with a null categorical preprocesses the same alone and in a mixed batch"""
+    record = {"LIMIT": 9e5, "AGE": 35.0, "NO_LONS": 1, "SI_FLG": "Y",
+              "AVERAGE_ACCT_AGE1": None, "TIME_PERIOD": "JAN25"}
+    others = [dict(record, AVERAGE_ACCT_AGE1="1yrs 2mon", TIME_PERIOD=None),
+              dict(record, AVERAGE_ACCT_AGE1=float("nan"), SI_FLG="N")]
+    batch = [others[0], record, others[1]]
+    # Absent keys count as null too
+    without_key = {k: v for k, v in record.items() if k != "AVERAGE_ACCT_AGE1"}
+
+    if compiled:
+        fitted_preprocessor.compile()
+    try:
+        alone = fitted_preprocessor.preprocess([record])
+        in_batch = fitted_preprocessor.preprocess(batch)
+        absent = fitted_preprocessor.preprocess([without_key, others[0]])
+        nan_token = fitted_preprocessor.preprocess([dict(record, AVERAGE_ACCT_AGE1="nan")])
+    finally:
+        fitted_preprocessor.compiled = False
+
+    np.testing.assert_allclose(in_batch[1], alone[0])
+    np.testing.assert_allclose(absent[0], alone[0])
+    # Nulls encode as the class that missing training cells were given
+    np.testing.assert_allclose(nan_token[0], alone[0])
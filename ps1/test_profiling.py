@@ -0,0 +1,38 @@
+"""
+Tests for the per-request profiler
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+
+from profiling import RequestProfiler
+
+
+def busy_scoring(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return "scored"
+
+
+def test_profiler_writes_folded_stacks_within_its_caps(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), allow_header=True, max_per_minute=2, max_files=1)
+
+    assert not profiler.should_profile(None)
+    assert profiler.should_profile("1") and profiler.should_profile("true")
+    # The per-minute budget is spent
+    assert not profiler.should_profile("1")
+
+    result, path = profiler.profile(busy_scoring, 0.05, label="predict")
+    assert result == "scored"
+    with open(path) as f:
+        stacks = f.read().splitlines()
+    assert stacks and all(line.startswith("busy_scoring (test_profiling.py:") for line in stacks)
+
+    # Older profiles beyond max_files are deleted
+    _, newer = profiler.profile(busy_scoring, 0.01, label="predict")
+    assert os.listdir(tmp_path) == [os.path.basename(newer)]
+    assert profiler.stats()["profiles_written"] == 2
@@ -0,0 +1,24 @@
+"""
+Tests for the pre-forking server's worker supervision
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from serve import RestartPolicy
+
+
+def test_restart_policy_backs_off_per_slot_and_limits_restarts():
+    policy = RestartPolicy(max_restarts=6, window_seconds=60, base_delay=0.5, max_delay=2.0, stable_seconds=30)
+
+    # A worker crashing on startup waits longer each time, up to max_delay
+    assert [policy.record_exit(0, uptime=0.1, now=t) for t in (0, 1, 2, 3)] == [0.5, 1.0, 2.0, 2.0]
+    # Other slots keep their own delay, and a worker that ran a while resets it
+    assert policy.record_exit(1, uptime=0.1, now=4) == 0.5
+    assert policy.record_exit(0, uptime=100, now=5) == 0.5
+    # The seventh restart within the window exceeds the limit
+    assert policy.record_exit(0, uptime=0.1, now=6) is None
+
+    # Restarts older than the window no longer count
+    assert policy.record_exit(0, uptime=100, now=200) == 0.5
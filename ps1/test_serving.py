@@ -0,0 +1,274 @@
+"""
+Tests for the serving utilities
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import threading
+
+import pytest
+
+from serving import InferenceQueue, MicroBatcher, PredictionCache, QueueFullError
+
+
+def test_inference_queue_rejects_when_full_and_reports_timings():
+    queue = InferenceQueue(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(queue.run(release.wait, 5))
+        waiting = asyncio.ensure_future(queue.run(lambda: "done"))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(QueueFullError):
+            await queue.run(lambda: "rejected")
+        assert queue.stats()["pending"] == 2
+
+        release.set()
+        await running
+        return await waiting
+
+    try:
+        result, queue_time, compute_time = asyncio.run(scenario())
+    finally:
+        queue.shutdown()
+
+    assert result == "done"
+    assert queue_time > 0 and compute_time >= 0
+    assert queue.stats() == {"workers": 1, "max_queue_depth": 1, "pending": 0, "rejected": 1}
+
+
+def test_inference_queue_holds_slots_of_cancelled_requests_until_their_jobs_end():
+    queue = InferenceQueue(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        running = asyncio.ensure_future(queue.run(release.wait, 5))
+        waiting = asyncio.ensure_future(queue.run(ran.append, "waiting"))
+        await asyncio.sleep(0.05)
+        assert queue.stats()["pending"] == 2
+
+        # A queued job is dropped along with its request
+        waiting.cancel()
+        await asyncio.sleep(0.01)
+        assert queue.stats()["pending"] == 1
+
+        # A running job keeps its slot after its request is cancelled
+        running.cancel()
+        await asyncio.sleep(0.01)
+        assert queue.stats()["pending"] == 1
+        second = asyncio.ensure_future(queue.run(lambda: "second"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFullError):
+            await queue.run(lambda: "rejected")
+
+        release.set()
+        return await second
+
+    try:
+        result, _, _ = asyncio.run(scenario())
+    finally:
+        queue.shutdown()
+
+    assert result == "second"
+    assert ran == []
+    assert queue.stats()["pending"] == 0
+
+
+def test_micro_batcher_coalesces_concurrent_records():
+    queue = InferenceQueue(max_workers=1, max_queue_depth=8)
+    calls = []
+
+    def score(records):
+        calls.append(list(records))
+        return [record * 10 for record in records]
+
+    batcher = MicroBatcher(score, queue, max_wait_ms=20, max_batch_size=3)
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+
+    try:
+        outputs = asyncio.run(scenario())
+    finally:
+        queue.shutdown()
+
+    assert [result for result, _, _ in outputs] == [0, 10, 20, 30, 40]
+    assert calls == [[0, 1, 2], [3, 4]]
+    assert batcher.stats()["batches"] == 2
+
+
+def test_micro_batched_null_categorical_matches_unbatched():
+    """A record with a missing categorical scores the same whatever shares its batch"""
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+
+    from preprocessing import DataPreprocessor
+
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame({
+        "LIMIT": rng.normal(0, 1, 200),
+        "SI_FLG": rng.choice(["Y", "N", np.nan], 200),
+        "BRANCH_CODE": rng.choice(["1", "2", np.nan], 200)
+    })
+    y = (train["SI_FLG"] == "Y").astype(int)
+    preprocessor = DataPreprocessor()
+    preprocessor.fit_stage1(train, y)
+    preprocessor.compile()
+    model = LogisticRegression().fit(preprocessor.preprocess(train), y)
+
+    def score(records):
+        return model.predict_proba(preprocessor.preprocess(records))[:, 1].tolist()
+
+    record = {"LIMIT": 0.5, "SI_FLG": None, "BRANCH_CODE": 2.0}
+    neighbours = [{"LIMIT": 0.1, "SI_FLG": "Y", "BRANCH_CODE": "1"}, {"LIMIT": -1.0, "SI_FLG": "N"}]
+    queue = InferenceQueue(max_workers=1, max_queue_depth=8)
+    batcher = MicroBatcher(score, queue, max_wait_ms=50, max_batch_size=8)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit(neighbours[0]), batcher.submit(record),
+                                    batcher.submit(neighbours[1]))
+
+    try:
+        outputs = asyncio.run(scenario())
+    finally:
+        queue.shutdown()
+
+    assert batcher.stats()["batches"] == 1
+    assert outputs[1][0] == pytest.approx(score([record])[0], abs=1e-12)
+
+
+def test_micro_batcher_isolates_failing_record():
+    queue = InferenceQueue(max_workers=1, max_queue_depth=8)
+
+    def score(records):
+        if "bad" in records:
+            raise ValueError("bad record")
+        return records
+
+    batcher = MicroBatcher(score, queue, max_wait_ms=20, max_batch_size=8)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("bad"), batcher.submit("b"),
+                                    return_exceptions=True)
+
+    try:
+        first, failed, last = asyncio.run(scenario())
+    finally:
+        queue.shutdown()
+
+    assert first[0] == "a" and last[0] == "b"
+    assert isinstance(failed, ValueError)
+
+
+def test_prediction_cache_keys_lru_ttl_and_generation():
+    columns = ["LIMIT", "SI_FLG", "AGE"]
+    key = PredictionCache.make_key({"LIMIT": 100, "SI_FLG": "Y", "AGE": None, "EXTRA": 1}, columns)
+    assert key == PredictionCache.make_key({"AGE": "NA", "SI_FLG": "Y", "LIMIT": 100.0}, columns)
+    assert key != PredictionCache.make_key({"LIMIT": 101, "SI_FLG": "Y"}, columns)
+
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put("a", {"prediction": 0}, generation=1)
+    cache.put("b", {"prediction": 1}, generation=1)
+    assert cache.get("a", generation=1) == {"prediction": 0}
+    cache.put("c", {"prediction": 1}, generation=1)
+    assert cache.get("b", generation=1) is None
+    assert cache.get("a", generation=1) is not None
+
+    # Reloaded models invalidate everything
+    assert cache.get("a", generation=2) is None
+
+    expired = PredictionCache(max_size=2, ttl_seconds=-1)
+    expired.put("a", {"prediction": 0}, generation=1)
+    assert expired.get("a", generation=1) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["invalidations"]) == (2, 2, 1, 1)
+
+
+def test_prediction_cache_keys_follow_categorical_encoding():
+    """Categorical values share a key only when the encoder gives them the same code"""
+    import numpy as np
+
+    from preprocessing import category_string, category_strings
+
+    columns, categorical = ["LIMIT", "BRANCH_CODE"], {"BRANCH_CODE"}
+
+    def key(branch, limit=1):
+        return PredictionCache.make_key({"LIMIT": limit, "BRANCH_CODE": branch}, columns, categorical)
+
+    assert key(1) == key(1.0) == key("1")
+    assert key(True) != key(1)
+    assert key(1.5) != key("1.0")
+    assert key(None) == key(float("nan")) == key("NA")
+    # Numeric columns still compare as numbers
+    assert key("Y", limit=1) == key("Y", limit=1.0) == key("Y", limit=True)
+
+    values = [1, 1.0, True, "1", "1.0", 2.5, None, float("nan"), "NA", "", "Y", np.float64(3.0), -4.0]
+    assert [category_string(v) for v in values] == category_strings(np.array(values, dtype=object)).tolist()
+
+
+def test_iter_ndjson_parses_across_chunk_boundaries():
+    from serving import iter_ndjson
+
+    async def chunks():
+        for chunk in [b'{"a": 1}\n{"a"', b': 2}\n\nnot json\n', b'{"a": 3}']:
+            yield chunk
+
+    async def collect():
+        return [item async for item in iter_ndjson(chunks())]
+
+    items = asyncio.run(collect())
+    assert [(n, v) for n, v in items if not isinstance(v, ValueError)] == [(1, {"a": 1}), (2, {"a": 2}), (5, {"a": 3})]
+    assert isinstance(dict(items)[4], ValueError)
+
+    async def oversized():
+        yield b"x" * 64
+
+    with pytest.raises(ValueError, match="exceeds"):
+        asyncio.run(collect_from(iter_ndjson(oversized(), max_line_bytes=16)))
+
+
+async def collect_from(iterator):
+    return [item async for item in iterator]
+
+
+def test_prediction_cache_drops_results_when_thresholds_change(api, monkeypatch):
+    """Results cached under one threshold are not served after it changes"""
+    import app
+
+    monkeypatch.setattr(app, "prediction_cache", PredictionCache(max_size=10, ttl_seconds=60))
+    record = {"LIMIT": 0.2, "AGE": 1.0, "SI_FLG": "Y", "TIME_PERIOD": "JAN25"}
+
+    monkeypatch.setattr(app.predictor, "stage2_threshold", 1.0)
+    assert api.post("/predict", json={"data": record}).json()["prediction"] == 0
+    assert app.prediction_cache.stats()["size"] == 1
+
+    monkeypatch.setattr(app.predictor, "stage2_threshold", 0.0)
+    assert api.post("/predict", json={"data": record}).json()["prediction"] == 1
+
+
+def test_predict_stream_null_categorical_matches_predict(api):
+    """Null categoricals in an NDJSON upload score as they do through /predict"""
+    import json
+
+    records = [
+        {"LIMIT": 0.2, "AGE": 1.0, "SI_FLG": "Y", "TIME_PERIOD": "JAN25"},
+        {"LIMIT": 0.4, "AGE": -0.5, "SI_FLG": None},
+        {"LIMIT": -1.0, "AGE": 0.3, "SI_FLG": "N", "TIME_PERIOD": "DEC24"}
+    ]
+    body = "".join(json.dumps({"data": record}) + "\n" for record in records)
+    response = api.post("/predict_stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    for line, record in zip(lines, records):
+        single = api.post("/predict", json={"data": record}).json()
+        assert line["stage1_probability"] == pytest.approx(single["stage1_probability"], abs=1e-9)
+        assert line["stage2_probability"] == pytest.approx(single["stage2_probability"], abs=1e-9)
+        assert line["prediction"] == single["prediction"]
@@ -7,9 +7,11 @@ This script trains and saves both Stage 1 and Stage 2 models
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
+import json
 import logging
 import os
 import sys
+from typing import Optional
 
 # Add current directory to path
 sys.path.append('.')
@@ -21,13 +23,25 @@ from prediction import TwoStagePredictor
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def train_models(data_path: str, model_dir: str = "models"):
+# Held-out share and seed of the Stage 1 and Stage 2 train/test splits;
+# calibrate.py rebuilds the same splits to find the held-out records
+TEST_SIZE = 0.3
+SPLIT_RANDOM_STATE = 42
+# Folds of the out-of-fold ensemble probabilities the Stage 2 student is
+# distilled from
+STUDENT_TARGET_FOLDS = 5
+
+def train_models(data_path: str, model_dir: str = "models", bundle: bool = False,
+                 stage2_workers: Optional[int] = None):
     """
     Train both Stage 1 and Stage 2 models
 
     Args:
         data_path: Path to training data CSV
         model_dir: Directory to save models
+        bundle: Also write the memory-mapped preprocessors/models bundles
+        stage2_workers: Processes fitting the Stage 2 base models in
+            parallel (-1 for one per core; None fits them one by one)
     """
 
     # Load data
@@ -55,7 +69,7 @@ def train_models(data_path: str, model_dir: str = "models"):
 
     # Split data for Stage 1
     X_train_s1, X_test_s1, y_train_s1, y_test_s1 = train_test_split(
-        X_stage1, y, stratify=y, test_size=0.3, random_state=42
+        X_stage1, y, stratify=y, test_size=TEST_SIZE, random_state=SPLIT_RANDOM_STATE
     )
 
     # Train Stage 1 model
@@ -95,11 +109,21 @@ def train_models(data_path: str, model_dir: str = "models"):
 
     # Split Stage 2 data
     X_train_s2, X_test_s2, y_train_s2, y_test_s2 = train_test_split(
-        X_stage2, y_stage2, stratify=y_stage2, test_size=0.3, random_state=42
+        X_stage2, y_stage2, stratify=y_stage2, test_size=TEST_SIZE, random_state=SPLIT_RANDOM_STATE
     )
 
     # Train Stage 2 models
-    predictor.train_stage2(X_train_s2, y_train_s2)
+    predictor.train_stage2(X_train_s2, y_train_s2, n_jobs=stage2_workers)
+
+    # Distill the ensemble into the fast-mode student and measure how
+    # closely it follows the ensemble on held-out Stage 2 records. The
+    # targets are out-of-fold ensemble probabilities: on its own training
+    # rows the ensemble is more confident than it is in serving
+    soft_targets = predictor.stage2_out_of_fold_proba(X_train_s2, y_train_s2, n_splits=STUDENT_TARGET_FOLDS,
+                                                      n_jobs=stage2_workers)
+    predictor.train_stage2_student(X_train_s2, soft_targets)
+    student_report = predictor.evaluate_stage2_student(X_test_s2)
+    student_report["soft_targets"] = f"out-of-fold ensemble probabilities ({STUDENT_TARGET_FOLDS} folds)"
 
     # ================== SAVE MODELS ==================
     logger.info("Saving models...")
@@ -108,10 +132,18 @@ def train_models(data_path: str, model_dir: str = "models"):
     os.makedirs(model_dir, exist_ok=True)
 
     # Save preprocessors
-    preprocessor.save_preprocessors(model_dir)
+    preprocessor.save_preprocessors(model_dir, bundle=bundle)
 
     # Save predictors
-    predictor.save_models(model_dir)
+    predictor.save_models(model_dir, bundle=bundle)
+
+    # Save Stage 2 fit times and memory
+    with open(os.path.join(model_dir, "stage2_fit_report.json"), "w") as f:
+        json.dump(predictor.stage2_fit_report, f, indent=2)
+
+    # Save student agreement report
+    with open(os.path.join(model_dir, "stage2_student_report.json"), "w") as f:
+        json.dump(student_report, f, indent=2)
 
     logger.info(f"All models saved to {model_dir}")
 
@@ -155,11 +187,27 @@ def train_models(data_path: str, model_dir: str = "models"):
         tn, fp, fn, tp = confusion_matrix(y_test_s2, stage2_preds).ravel()
         print(f"\nConfusion Matrix: TN={tn}, FP={fp}, FN={fn}, TP={tp}")
 
+        # Stage 2 student evaluation
+        student_preds = (predictor.stage2_student.predict(X_test_s2) > predictor.stage2_threshold).astype(int)
+
+        print("\n" + "="*50)
+        print("STAGE 2 STUDENT (FAST MODE) EVALUATION")
+        print("="*50)
+        print(f"Agreement with ensemble: {student_report['decision_agreement']:.4f}")
+        print(f"Precision/recall vs ensemble: {student_report['precision_vs_ensemble']:.4f}"
+              f" / {student_report['recall_vs_ensemble']:.4f}")
+        print(f"Latency per row: ensemble {student_report['ensemble_ms_per_row']:.4f} ms,"
+              f" student {student_report['student_ms_per_row']:.4f} ms")
+        print("\nClassification Report:")
+        print(classification_report(y_test_s2, student_preds))
+
     logger.info("Training completed successfully!")
 
 if __name__ == "__main__":
     # Example usage
-    train_models("HACKATHON_TRAINING_DATA.csv")
+    # PS1_TRAIN_WORKERS: processes fitting the Stage 2 base models in parallel
+    workers = os.getenv("PS1_TRAIN_WORKERS")
+    train_models("HACKATHON_TRAINING_DATA.csv", stage2_workers=int(workers) if workers else None)
 
     print("Model training script created.")
     print("To use this script:")
@@ -0,0 +1,414 @@
+"""
+Native Tree Ensemble Evaluator
+Exports the XGBoost, LightGBM, CatBoost and sklearn forest models into one
+flat array representation and scores them with a single vectorized kernel
+"""
+
+import json
+import os
+import tempfile
+import logging
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on (rows x trees) node indices held in memory per traversal chunk
+TRAVERSAL_CHUNK_ELEMENTS = 1 << 20
+
+
+class FlatForest:
+    """
+    Tree ensemble flattened into node arrays
+
+    Every tree is stored in the same global node arrays. An internal node
+    sends a row left when x[feature] < threshold, or when x[feature] is NaN
+    and nan_left is set. Leaves point to themselves and hold their output in
+    value. Per-tree outputs are summed (boosting) or averaged (bagging),
+    scaled, shifted by base_score and passed through the link function.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, nan_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, aggregation: str = "sum",
+                 link: str = "logistic", base_score: float = 0.0, scale: float = 1.0,
+                 input_dtype: str = "float64", children: Optional[np.ndarray] = None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.nan_left = np.ascontiguousarray(nan_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation
+        self.link = link
+        self.base_score = float(base_score)
+        self.scale = float(scale)
+        self.input_dtype = np.dtype(input_dtype)
+
+        # Interleaved (left, right) pairs so one gather picks the next node
+        if children is None:
+            children = np.column_stack([self.left, self.right]).ravel()
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in [self.feature, self.threshold, self.left, self.right,
+                                      self.nan_left, self.value, self.roots])
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """
+        Raw ensemble output before the link function
+        """
+        X = np.asarray(X).astype(self.input_dtype, copy=False)
+        n_rows = X.shape[0]
+        output = np.empty(n_rows, dtype=np.float64)
+
+        chunk = max(1, TRAVERSAL_CHUNK_ELEMENTS // max(self.n_trees, 1))
+        for start in range(0, n_rows, chunk):
+            leaves = _traverse(self, X[start:start + chunk])
+            leaf_values = self.value[leaves]
+            if self.aggregation == "mean":
+                output[start:start + chunk] = leaf_values.mean(axis=1)
+            else:
+                output[start:start + chunk] = leaf_values.sum(axis=1)
+
+        return self.base_score + self.scale * output
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities in the same layout as the library models
+        """
+        raw = self.decision_function(X)
+        if self.link == "logistic":
+            positive = 1.0 / (1.0 + np.exp(-raw))
+        else:
+            positive = raw
+        return np.column_stack([1.0 - positive, positive])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Node arrays keyed by name
+        """
+        return {
+            "children": self.children,
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "nan_left": self.nan_left,
+            "value": self.value,
+            "roots": self.roots
+        }
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Scalar parameters needed to rebuild the forest from its arrays
+        """
+        return {
+            "max_depth": self.max_depth,
+            "aggregation": self.aggregation,
+            "link": self.link,
+            "base_score": self.base_score,
+            "scale": self.scale,
+            "input_dtype": self.input_dtype.name
+        }
+
+
+def _traverse(forest: FlatForest, X: np.ndarray) -> np.ndarray:
+    """
+    Walk every row down every tree at once and return the leaf node indices
+    """
+    n_rows, n_features = X.shape
+    X_flat = np.ascontiguousarray(X).ravel()
+    row_offset = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+    children = forest.children
+    has_missing = np.isnan(X_flat).any()
+
+    node = np.broadcast_to(forest.roots, (n_rows, forest.n_trees)).copy()
+    for _ in range(forest.max_depth):
+        x = X_flat[row_offset + forest.feature[node]]
+        go_right = ~(x < forest.threshold[node])
+        if has_missing:
+            missing = np.isnan(x)
+            go_right[missing] = ~forest.nan_left[node[missing]]
+        node = children[2 * node + go_right]
+
+    return node
+
+
+class _ForestBuilder:
+    """Accumulates trees into the global node arrays of a FlatForest"""
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.nan_left = []
+        self.value = []
+        self.roots = []
+        self.max_depth = 0
+
+    def add_node(self) -> int:
+        node = len(self.feature)
+        self.feature.append(0)
+        self.threshold.append(0.0)
+        self.left.append(node)
+        self.right.append(node)
+        self.nan_left.append(False)
+        self.value.append(0.0)
+        return node
+
+    def set_split(self, node: int, feature: int, threshold: float, left: int, right: int, nan_left: bool):
+        self.feature[node] = feature
+        self.threshold[node] = threshold
+        self.left[node] = left
+        self.right[node] = right
+        self.nan_left[node] = nan_left
+
+    def set_leaf(self, node: int, value: float):
+        self.value[node] = value
+
+    def add_tree(self, root: int, depth: int):
+        self.roots.append(root)
+        self.max_depth = max(self.max_depth, depth)
+
+    def build(self, **params) -> FlatForest:
+        return FlatForest(
+            feature=np.array(self.feature),
+            threshold=np.array(self.threshold),
+            left=np.array(self.left),
+            right=np.array(self.right),
+            nan_left=np.array(self.nan_left),
+            value=np.array(self.value),
+            roots=np.array(self.roots),
+            max_depth=self.max_depth,
+            **params
+        )
+
+
+def _inclusive(threshold: float) -> float:
+    """
+    Strict threshold equivalent to x <= threshold
+    """
+    return float(np.nextafter(threshold, np.inf))
+
+
+def export_xgboost(model) -> FlatForest:
+    """
+    Flatten an XGBoost model with a binary:logistic or reg:logistic
+    objective; both map the summed margin through the sigmoid
+    """
+    config = json.loads(model.get_booster().save_raw("json"))
+    learner = config["learner"]
+
+    if learner["objective"]["name"] not in ("binary:logistic", "reg:logistic"):
+        raise ValueError(f"Unsupported XGBoost objective: {learner['objective']['name']}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError(f"Unsupported XGBoost booster: {learner['gradient_booster']['name']}")
+
+    base_score = float(learner["learner_model_param"]["base_score"])
+    builder = _ForestBuilder()
+
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left_children = tree["left_children"]
+        right_children = tree["right_children"]
+        offset = len(builder.feature)
+        for _ in left_children:
+            builder.add_node()
+
+        max_depth = 0
+        stack = [(0, 0)]
+        while stack:
+            i, depth = stack.pop()
+            left = left_children[i]
+            if left == -1:
+                builder.set_leaf(offset + i, tree["split_conditions"][i])
+                max_depth = max(max_depth, depth)
+                continue
+            right = right_children[i]
+            # XGBoost compares float32 inputs against float32 split conditions
+            builder.set_split(offset + i, tree["split_indices"][i],
+                              float(np.float32(tree["split_conditions"][i])),
+                              offset + left, offset + right, bool(tree["default_left"][i]))
+            stack.extend([(left, depth + 1), (right, depth + 1)])
+
+        builder.add_tree(offset, max_depth)
+
+    return builder.build(
+        aggregation="sum",
+        link="logistic",
+        base_score=np.log(base_score / (1.0 - base_score)),
+        input_dtype="float32"
+    )
+
+
+def export_lightgbm(model) -> FlatForest:
+    """
+    Flatten an LGBMClassifier with a binary objective
+    """
+    dump = model.booster_.dump_model()
+
+    if not dump["objective"].startswith("binary"):
+        raise ValueError(f"Unsupported LightGBM objective: {dump['objective']}")
+    sigmoid = 1.0
+    for token in dump["objective"].split():
+        if token.startswith("sigmoid:"):
+            sigmoid = float(token.split(":")[1])
+
+    builder = _ForestBuilder()
+
+    def add_subtree(structure: Dict[str, Any], depth: int) -> int:
+        node = builder.add_node()
+        if "leaf_value" in structure:
+            builder.set_leaf(node, structure["leaf_value"])
+            builder.max_depth = max(builder.max_depth, depth)
+            return node
+
+        if structure["decision_type"] != "<=":
+            raise ValueError(f"Unsupported LightGBM split: {structure['decision_type']}")
+
+        threshold = structure["threshold"]
+        if structure["missing_type"] == "Zero":
+            # zero_as_missing sends values within kZeroThreshold of 0 the
+            # default way, which a NaN-only flag cannot express
+            raise ValueError("LightGBM splits that treat zero as missing are not supported")
+        if structure["missing_type"] == "None":
+            # NaN is converted to 0.0 before the comparison
+            nan_left = 0.0 <= threshold
+        else:
+            nan_left = bool(structure["default_left"])
+
+        left = add_subtree(structure["left_child"], depth + 1)
+        right = add_subtree(structure["right_child"], depth + 1)
+        builder.set_split(node, structure["split_feature"], _inclusive(threshold), left, right, nan_left)
+        return node
+
+    for tree in dump["tree_info"]:
+        builder.add_tree(add_subtree(tree["tree_structure"], 0), 0)
+
+    return builder.build(aggregation="sum", link="logistic", scale=sigmoid, input_dtype="float64")
+
+
+def export_catboost(model) -> FlatForest:
+    """
+    Flatten a CatBoostClassifier with numeric features only
+
+    Oblivious trees are expanded into full binary trees; the split at
+    position i of a tree sets bit i of the leaf index when x > border.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as f:
+            config = json.load(f)
+
+    float_features = {
+        info["feature_index"]: info for info in config["features_info"].get("float_features", [])
+    }
+    if config["features_info"].get("categorical_features"):
+        raise ValueError("CatBoost models with categorical features are not supported")
+
+    scale, bias = config["scale_and_bias"]
+    bias = bias[0] if isinstance(bias, list) else bias
+
+    builder = _ForestBuilder()
+
+    for tree in config["oblivious_trees"]:
+        splits = tree["splits"]
+        leaf_values = tree["leaf_values"]
+        depth = len(splits)
+
+        def add_level(level: int, leaf_index: int) -> int:
+            node = builder.add_node()
+            if level < 0:
+                builder.set_leaf(node, leaf_values[leaf_index])
+                return node
+
+            split = splits[level]
+            if split["split_type"] != "FloatFeature":
+                raise ValueError(f"Unsupported CatBoost split: {split['split_type']}")
+            info = float_features[split["float_feature_index"]]
+
+            left = add_level(level - 1, leaf_index)
+            right = add_level(level - 1, leaf_index | (1 << level))
+            builder.set_split(node, info["flat_feature_index"],
+                              _inclusive(float(np.float32(split["border"]))),
+                              left, right, info.get("nan_value_treatment") != "Max")
+            return node
+
+        builder.add_tree(add_level(depth - 1, 0), depth)
+
+    return builder.build(aggregation="sum", link="logistic", base_score=bias, scale=scale,
+                         input_dtype="float32")
+
+
+def export_sklearn_forest(model) -> FlatForest:
+    """
+    Flatten a fitted RandomForestClassifier or ExtraTreesClassifier
+    """
+    positive = list(model.classes_).index(1)
+    builder = _ForestBuilder()
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        offset = len(builder.feature)
+        for _ in range(tree.node_count):
+            builder.add_node()
+
+        counts = tree.value[:, 0, :]
+        probabilities = counts[:, positive] / counts.sum(axis=1)
+        missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+
+        for i in range(tree.node_count):
+            left = tree.children_left[i]
+            if left == -1:
+                builder.set_leaf(offset + i, probabilities[i])
+                continue
+            # sklearn compares float32 inputs with x <= threshold
+            builder.set_split(offset + i, tree.feature[i], _inclusive(tree.threshold[i]),
+                              offset + left, offset + tree.children_right[i],
+                              bool(missing_go_to_left[i]))
+
+        builder.add_tree(offset, tree.max_depth)
+
+    return builder.build(aggregation="mean", link="identity", input_dtype="float32")
+
+
+def export_forest(model) -> FlatForest:
+    """
+    Flatten any supported tree ensemble
+    """
+    module = type(model).__module__
+    name = type(model).__name__
+
+    if module.startswith("xgboost"):
+        return export_xgboost(model)
+    if module.startswith("lightgbm"):
+        return export_lightgbm(model)
+    if module.startswith("catboost"):
+        return export_catboost(model)
+    if name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        return export_sklearn_forest(model)
+
+    raise ValueError(f"Unsupported tree model: {name}")
+
+
+def is_tree_model(model) -> bool:
+    """
+    Check whether a model can be exported with export_forest
+    """
+    module = type(model).__module__
+    return (module.startswith(("xgboost", "lightgbm", "catboost")) or
+            type(model).__name__ in ("RandomForestClassifier", "ExtraTreesClassifier"))